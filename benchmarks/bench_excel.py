@@ -0,0 +1,128 @@
+"""
+Benchmarks the Excel writer engines.
+
+Generates a transformed chunk of sample records, converts it with every
+excel_engine, and prints seconds per 100k rows and peak memory for each.
+Every engine runs in its own process so peak memory is per engine. Each
+workbook is read back to check it has a header and one row per record.
+With --template the workbooks use that EIB template layout instead of one
+flat sheet. The last line is excel_output "audit" on the same chunk, for
+comparison.
+
+    python benchmarks/bench_excel.py --records 200000
+    python benchmarks/bench_excel.py --template config/eib_template.yaml
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from excel.writer_engine import ENGINES
+from utils.perf_utils import peak_rss_bytes
+
+WD_NS = "urn:com.workday/bsvc"
+
+
+def make_transformed(count):
+    """
+    A transformed chunk shaped like the output of transform.xslt.
+    """
+    records = "".join(
+        f"<wd:Record>"
+        f"<wd:Student_ID>S{i:07d}</wd:Student_ID>"
+        f'<wd:Institution><wd:ID wd:type="Institution_ID">I{i % 500:04d}</wd:ID>'
+        f"<wd:Name>Institution {i % 500}</wd:Name></wd:Institution>"
+        f'<wd:Degree><wd:ID wd:type="Degree_ID">AS</wd:ID>'
+        f"<wd:Date_Degree_Received>2019-05-{i % 28 + 1:02d}</wd:Date_Degree_Received></wd:Degree>"
+        f"<wd:GPA>{(i % 400) / 100:.2f}</wd:GPA>"
+        f"</wd:Record>"
+        for i in range(count)
+    )
+    return f'<wd:Records xmlns:wd="{WD_NS}">{records}</wd:Records>'.encode()
+
+
+def _run(settings, xml_path):
+    from excel.xml_to_excel import XMLToExcel
+    from excel.audit_summary import XMLAudit
+
+    if settings.get("excel_output") == "audit":
+        converter = XMLAudit(settings=settings)
+    else:
+        converter = XMLToExcel(settings=settings)
+    start = time.perf_counter()
+    excel_path = converter.convert(xml_path)
+    elapsed = time.perf_counter() - start
+    return excel_path, elapsed, peak_rss_bytes()
+
+
+def _peak(peak):
+    return f"{peak / (1024 * 1024):8.1f} MB peak" if peak else "peak n/a"
+
+
+def _check(excel_path, records, template):
+    """
+    Rows on the first sheet, read back with openpyxl: the header (and
+    title rows) plus one per record.
+    """
+    from openpyxl import load_workbook
+    from excel.eib_writer import EIBTemplate
+
+    header_rows = 1
+    if template:
+        header_rows += len(EIBTemplate.load(template).sheets[0]["title_rows"])
+
+    wb = load_workbook(excel_path, read_only=True)
+    rows = sum(1 for _ in wb.worksheets[0].iter_rows(values_only=True))
+    wb.close()
+    return rows == records + header_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--template", default="", help="EIB template YAML")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "chunk_1_transformed.xml")
+        with open(xml_path, "wb") as f:
+            f.write(make_transformed(args.records))
+
+        print(f"{args.records} records, {'EIB template' if args.template else 'flat sheet'}")
+        for engine in ENGINES:
+            settings = {"excel_engine": engine, "eib_template_path": args.template}
+            try:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    excel_path, elapsed, peak = pool.submit(_run, settings, xml_path).result()
+            except ImportError as e:
+                print(f"{engine:<12} skipped: {e}")
+                continue
+
+            per_100k = elapsed / args.records * 100000
+            valid = _check(excel_path, args.records, args.template)
+            print(
+                f"{engine:<12} {per_100k:8.2f} s/100k rows  {_peak(peak)}  "
+                f"{'valid' if valid else 'INVALID'}"
+            )
+            os.remove(excel_path)
+
+        settings = {"excel_output": "audit", "audit_group_by": ["Institution.Name"]}
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            audit_path, elapsed, peak = pool.submit(_run, settings, xml_path).result()
+        with open(audit_path, "r", encoding="utf-8") as f:
+            valid = json.load(f)["records"] == args.records
+        print(
+            f"{'audit':<12} {elapsed / args.records * 100000:8.2f} s/100k rows  "
+            f"{_peak(peak)}  {'valid' if valid else 'INVALID'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
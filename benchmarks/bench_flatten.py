@@ -0,0 +1,118 @@
+"""
+Benchmarks the record flattening engine against the old flatten_dict.
+
+Generates deeply nested academic records (degrees with courses and
+grades, several addresses), and times flattening all of them with
+flatten_dict, the recursive helper the Flattener replaced, and with the
+Flattener in every list_mode. flatten_dict gets each record as the nested
+dict xmltodict would have produced; building those dicts is not timed.
+flatten_dict leaves repeating elements as unflattened lists, so its
+column count is not comparable.
+
+    python benchmarks/bench_flatten.py --records 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), ROOT]
+
+from lxml import etree
+from excel.flatten import Flattener, LIST_MODES
+
+
+def flatten_dict(d, parent_key="", sep="."):
+    # The recursive helper the Flattener replaced, kept as the baseline
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(flatten_dict(v, new_key, sep=sep).items())
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+def make_record(i):
+    courses = "".join(
+        f"<Course><ID>C{i % 90 + c}</ID><Title>Course {c}</Title>"
+        f"<Credits>3</Credits><Grade><Letter>A</Letter><Points>4.0</Points></Grade></Course>"
+        for c in range(5)
+    )
+    degrees = "".join(
+        f'<Degree type="Degree_ID"><ID>D{d}</ID><Program><Name>Program {d}</Name>'
+        f"<Courses>{courses}</Courses></Program><Received>2019-05-{d + 1:02d}</Received></Degree>"
+        for d in range(3)
+    )
+    addresses = "".join(
+        f"<Address><Line>{a} Main St</Line><City>Buffalo</City><Region>NY</Region></Address>"
+        for a in range(2)
+    )
+    return etree.fromstring(
+        f"<Record><Student><ID>S{i:07d}</ID><Name><First>A</First><Last>B</Last></Name></Student>"
+        f"<Institution><ID>I1</ID><Name>ECC</Name></Institution>"
+        f"<Education>{degrees}</Education><Contact>{addresses}</Contact></Record>"
+    )
+
+
+def to_dict(elem):
+    """
+    The nested dict xmltodict gives for elem: repeated children as lists,
+    attributes as @name.
+    """
+    children = list(elem)
+    if not children and not elem.attrib:
+        return elem.text
+    d = {f"@{name}": value for name, value in elem.attrib.items()}
+    for child in children:
+        value = to_dict(child)
+        if child.tag in d:
+            if not isinstance(d[child.tag], list):
+                d[child.tag] = [d[child.tag]]
+            d[child.tag].append(value)
+        else:
+            d[child.tag] = value
+    return d
+
+
+def _time(function, items):
+    start = time.perf_counter()
+    rows = columns = 0
+    for item in items:
+        result = function(item)
+        rows += len(result)
+        columns = max(columns, max((len(row) for row in result), default=0))
+    return time.perf_counter() - start, rows, columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=10000)
+    args = parser.parse_args()
+
+    records = [make_record(i) for i in range(args.records)]
+    dicts = [{"Record": to_dict(record)} for record in records]
+
+    runs = [("flatten_dict", lambda d: [flatten_dict(d)], dicts)]
+    for mode in LIST_MODES:
+        flattener = Flattener(mode)
+        runs.append((
+            f"Flattener {mode}",
+            lambda record, flattener=flattener: flattener.flatten(record)[0],
+            records,
+        ))
+
+    print(f"{args.records} records")
+    for name, function, items in runs:
+        elapsed, rows, columns = _time(function, items)
+        print(
+            f"{name:<18} {elapsed:8.2f} s  {elapsed / len(items) * 1e6:8.1f} us/record  "
+            f"{rows:8} rows  {columns:5} columns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmarks the field mapping engine against XSLTTransformer.
+
+Generates a chunk of sample records, runs it through transform_engine "xslt"
+(document and record mode) and "mapping", and prints time and peak memory
+for each. Every engine runs in its own process so peak memory is per engine.
+
+    python benchmarks/bench_transform.py --records 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from utils.perf_utils import peak_rss_bytes
+
+WD_NS = "urn:com.workday/bsvc"
+
+XSLT = """<?xml version="1.0" encoding="UTF-8"?>
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:template match="/">
+    <Records>
+      <xsl:for-each select="//*[local-name()='Historical_Academic_Record']">
+        <Record>
+          <Student_ID>
+            <xsl:value-of select="*[local-name()='Student_ID']"/>
+          </Student_ID>
+          <Institution>
+            <xsl:value-of select="*[local-name()='Institution']"/>
+          </Institution>
+        </Record>
+      </xsl:for-each>
+    </Records>
+  </xsl:template>
+</xsl:stylesheet>
+"""
+
+# The field mapping equivalent of XSLT
+MAPPING = f"""
+namespaces:
+  wd: "{WD_NS}"
+root: "Records"
+record: "Record"
+fields:
+  - source: "wd:Student_ID"
+    target: "Student_ID"
+  - source: "wd:Institution"
+    target: "Institution"
+"""
+
+
+def make_records(count):
+    """
+    A Get_Historical_Academic_Records style chunk of count records.
+    """
+    records = "".join(
+        "<wd:Historical_Academic_Record>"
+        f"<wd:Student_ID>S{i:05d}</wd:Student_ID>"
+        f"<wd:Institution>INST_{i % 3}</wd:Institution>"
+        "</wd:Historical_Academic_Record>"
+        for i in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<wd:Get_Historical_Academic_Records_Response xmlns:wd="{WD_NS}">'
+        f"<wd:Response_Data>{records}</wd:Response_Data>"
+        "</wd:Get_Historical_Academic_Records_Response>"
+    ).encode("utf-8")
+
+
+def _run(settings, chunk_path):
+    from transform.xslt_transformer import XSLTTransformer
+
+    transformer = XSLTTransformer(settings)
+    start = time.perf_counter()
+    transformer.apply_xslt(chunk_path)
+    elapsed = time.perf_counter() - start
+    return elapsed, peak_rss_bytes()
+
+
+def _peak(peak):
+    return f"{peak / (1024 * 1024):8.1f} MB peak" if peak else "peak n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xslt_path = os.path.join(tmp, "transform.xslt")
+        mapping_path = os.path.join(tmp, "field_mapping.yaml")
+        with open(xslt_path, "w", encoding="utf-8") as f:
+            f.write(XSLT)
+        with open(mapping_path, "w", encoding="utf-8") as f:
+            f.write(MAPPING)
+
+        base = {
+            "split_element": "Historical_Academic_Record",
+            "xslt_path": xslt_path,
+            "field_mapping_path": mapping_path,
+        }
+        runs = {
+            "xslt (document)": {**base, "transform_engine": "xslt", "xslt_mode": "document"},
+            "xslt (record)": {**base, "transform_engine": "xslt", "xslt_mode": "record"},
+            "mapping": {**base, "transform_engine": "mapping"},
+        }
+
+        print(f"{args.records} records")
+        for idx, (name, settings) in enumerate(runs.items()):
+            chunk_path = os.path.join(tmp, f"chunk_{idx}.xml")
+            with open(chunk_path, "wb") as f:
+                f.write(make_records(args.records))
+
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, peak = pool.submit(_run, settings, chunk_path).result()
+
+            print(f"{name:<16} {elapsed:8.2f} s  {_peak(peak)}")
+            os.remove(chunk_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Audit summary of transformed records, in place of full workbooks.
+
+With excel_output "audit", each chunk is read once with iterparse and
+reduced to per-field aggregates instead of being written out row by row:
+
+- fill rate: the share of records with a value in the field
+- distinct values: exact up to audit_exact_distinct values, then
+  estimated with a HyperLogLog (about 1.6% standard error)
+- min and max of the values that are ISO dates (YYYY-MM-DD...)
+- record counts per value of each audit_group_by field, and per record
+  element name
+
+Fields are the flattened columns of the flat workbook, named by the
+run's list_mode (see flatten.py); each value of a repeated element counts
+on its own. Every chunk's
+aggregates are saved as a small <chunk>_transformed.audit.json. Once all
+chunks are done, summarize() merges them into audit_summary.xlsx and
+audit_summary.json in output_dir.
+
+With column_store set, the aggregates come from the chunk's columnar
+store (see column_store.py), built on first use. Fill rates are then
+computed on the validity masks, and a repeated value the flattener
+joined (list_mode "join") counts as one value.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import re
+from datetime import datetime
+import numpy as np
+from lxml import etree
+from utils.logger import get_logger
+from utils.file_utils import ensure_dir, open_data, open_input, strip_compression_suffix
+from utils.xml_utils import get_settings
+from utils.checkpoint import chunk_id
+from .flatten import Flattener
+from .writer_engine import open_workbook
+from .xml_to_excel import iter_records
+from .column_store import BATCH_ROWS, MAIN, open_or_build
+
+logger = get_logger(__name__)
+
+SUMMARY_NAME = "audit_summary"
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter in 2**p one-byte registers.
+    """
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.registers = bytearray(registers) if registers else bytearray(1 << p)
+
+    def add(self, value):
+        x = int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = 64 - self.p - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small counts: linear counting is more accurate
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_json(self):
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["p"], base64.b64decode(data["registers"]))
+
+
+class FieldStats:
+    def __init__(self):
+        self.filled = 0
+        self.values = set()
+        # Replaces values once they pass the exact limit
+        self.hll = None
+        self.min_date = None
+        self.max_date = None
+
+    def add(self, value, exact_limit):
+        if self.hll is not None:
+            self.hll.add(value)
+        else:
+            self.values.add(value)
+            if len(self.values) > exact_limit:
+                self._to_hll()
+
+        if DATE_RE.match(value):
+            date = value[:10]
+            if self.min_date is None or date < self.min_date:
+                self.min_date = date
+            if self.max_date is None or date > self.max_date:
+                self.max_date = date
+
+    def _to_hll(self):
+        self.hll = HyperLogLog()
+        for value in self.values:
+            self.hll.add(value)
+        self.values = set()
+
+    def merge(self, other, exact_limit):
+        self.filled += other.filled
+        if other.hll is not None:
+            if self.hll is None:
+                self._to_hll()
+            self.hll.merge(other.hll)
+        for value in other.values:
+            self.add(value, exact_limit)
+
+        for date in (other.min_date, other.max_date):
+            if date is not None:
+                self.min_date = min(self.min_date or date, date)
+                self.max_date = max(self.max_date or date, date)
+
+    @property
+    def distinct(self):
+        return self.hll.count() if self.hll is not None else len(self.values)
+
+    def to_json(self):
+        return {
+            "filled": self.filled,
+            "values": sorted(self.values),
+            "hll": self.hll.to_json() if self.hll is not None else None,
+            "min_date": self.min_date,
+            "max_date": self.max_date,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        stats.filled = data["filled"]
+        stats.values = set(data["values"])
+        stats.hll = HyperLogLog.from_json(data["hll"]) if data["hll"] else None
+        stats.min_date = data["min_date"]
+        stats.max_date = data["max_date"]
+        return stats
+
+
+class AuditSummary:
+    def __init__(self, group_by=(), exact_limit=1000, flattener=None):
+        self.group_by = list(group_by or ())
+        self.exact_limit = exact_limit
+        self.records = 0
+        self.chunks = 0
+        # column -> FieldStats, in first-seen order
+        self.fields = {}
+        # group field -> value -> records; record element -> records
+        self.groups = {field: {} for field in self.group_by}
+        self.record_types = {}
+        self._flattener = flattener or Flattener()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            settings.get("audit_group_by"),
+            settings.get("audit_exact_distinct", 1000),
+            Flattener.from_settings(settings)
+        )
+
+    def add(self, record):
+        self.records += 1
+        name = etree.QName(record).localname
+        self.record_types[name] = self.record_types.get(name, 0) + 1
+
+        filled = set()
+        for column, value in self._flattener.values(record):
+            if value is None or not value.strip():
+                continue
+            stats = self.fields.get(column)
+            if stats is None:
+                stats = self.fields[column] = FieldStats()
+            stats.add(value, self.exact_limit)
+            if column not in filled:
+                filled.add(column)
+                stats.filled += 1
+                if column in self.groups:
+                    counts = self.groups[column]
+                    counts[value] = counts.get(value, 0) + 1
+
+        # Records without the field are grouped under ""
+        for field in self.group_by:
+            if field not in filled:
+                self.groups[field][""] = self.groups[field].get("", 0) + 1
+
+    def add_store(self, store):
+        """
+        Adds the records of a column store, one column at a time. Child
+        table columns are named by their group path, as in join mode.
+        """
+        self.records += store.records
+        for name, count in store.record_types.items():
+            self.record_types[name] = self.record_types.get(name, 0) + count
+
+        sep = store.manifest["flatten"]["sep"]
+        grouped = dict.fromkeys(self.group_by, 0)
+        for table in store.tables():
+            records = np.asarray(store.record_numbers(table))
+            rows = store.rows(table)
+            for name in store.columns(table):
+                column = store.column(name, table)
+                if table != MAIN:
+                    if name == table.rsplit(sep, 1)[-1]:
+                        # The text of an occurrence without children
+                        name = table
+                    elif name.startswith("@"):
+                        name = f"{table}{name}"
+                    else:
+                        name = f"{table}{sep}{name}"
+
+                filled_records = records[np.asarray(column.valid)]
+                if not len(filled_records):
+                    continue
+                stats = self.fields.get(name)
+                if stats is None:
+                    stats = self.fields[name] = FieldStats()
+                stats.filled += int(np.unique(filled_records).size)
+
+                counts = self.groups.get(name)
+                last_record = None
+                for start in range(0, rows, BATCH_ROWS):
+                    stop = min(start + BATCH_ROWS, rows)
+                    for record, value in zip(records[start:stop].tolist(), column.values(start, stop)):
+                        if value is None or not value.strip():
+                            continue
+                        stats.add(value, self.exact_limit)
+                        # A record is grouped by its first value
+                        if counts is not None and record != last_record:
+                            counts[value] = counts.get(value, 0) + 1
+                            grouped[name] += 1
+                            last_record = record
+
+        # Records without the field are grouped under ""
+        for field, count in grouped.items():
+            if count < store.records:
+                self.groups[field][""] = self.groups[field].get("", 0) + store.records - count
+
+    def merge(self, other):
+        self.records += other.records
+        self.chunks += other.chunks
+        for column, stats in other.fields.items():
+            if column not in self.fields:
+                self.fields[column] = FieldStats()
+            self.fields[column].merge(stats, self.exact_limit)
+        for field, counts in other.groups.items():
+            mine = self.groups.setdefault(field, {})
+            for value, count in counts.items():
+                mine[value] = mine.get(value, 0) + count
+        for name, count in other.record_types.items():
+            self.record_types[name] = self.record_types.get(name, 0) + count
+
+    def field_rows(self):
+        """
+        (field, filled, fill rate, distinct, approximate, min date,
+        max date) per field.
+        """
+        return [
+            (
+                column, stats.filled,
+                stats.filled / self.records if self.records else 0.0,
+                stats.distinct, stats.hll is not None,
+                stats.min_date, stats.max_date,
+            )
+            for column, stats in self.fields.items()
+        ]
+
+    def to_json(self):
+        return {
+            "records": self.records,
+            "chunks": self.chunks,
+            "exact_limit": self.exact_limit,
+            "fields": {column: stats.to_json() for column, stats in self.fields.items()},
+            "groups": self.groups,
+            "record_types": self.record_types,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        summary = cls(list(data["groups"]), data["exact_limit"])
+        summary.records = data["records"]
+        summary.chunks = data["chunks"]
+        summary.fields = {
+            column: FieldStats.from_json(stats) for column, stats in data["fields"].items()
+        }
+        summary.groups = data["groups"]
+        summary.record_types = data["record_types"]
+        return summary
+
+    def write(self, output_dir, engine="openpyxl"):
+        """
+        Writes audit_summary.xlsx and audit_summary.json to output_dir and
+        returns their paths.
+        """
+        ensure_dir(output_dir)
+        excel_path = os.path.join(output_dir, SUMMARY_NAME + ".xlsx")
+        json_path = os.path.join(output_dir, SUMMARY_NAME + ".json")
+        generated = datetime.now().isoformat(timespec="seconds")
+        fields = self.field_rows()
+
+        book = open_workbook(excel_path, engine)
+        ws = book.add_sheet("Summary")
+        for row in (
+            ["Generated", generated],
+            ["Records", self.records],
+            ["Chunks", self.chunks],
+            ["Fields", len(fields)],
+        ):
+            ws.append(row)
+
+        ws = book.add_sheet("Fields")
+        ws.append([
+            "Field", "Filled", "Fill Rate", "Distinct", "Distinct Approximate",
+            "Min Date", "Max Date",
+        ])
+        for row in fields:
+            ws.append(list(row))
+
+        ws = book.add_sheet("Groups")
+        ws.append(["Group", "Value", "Records"])
+        for name, count in sorted(self.record_types.items()):
+            ws.append(["Record Type", name, count])
+        for field, counts in self.groups.items():
+            for value, count in sorted(counts.items(), key=lambda item: -item[1]):
+                ws.append([field, value, count])
+        book.close()
+
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated": generated,
+                "records": self.records,
+                "chunks": self.chunks,
+                "fields": {
+                    row[0]: {
+                        "filled": row[1], "fill_rate": row[2], "distinct": row[3],
+                        "distinct_approximate": row[4], "min_date": row[5], "max_date": row[6],
+                    }
+                    for row in fields
+                },
+                "record_types": self.record_types,
+                "groups": self.groups,
+            }, f, indent=2)
+
+        return excel_path, json_path
+
+
+class XMLAudit:
+    """
+    Stands in for XMLToExcel with excel_output "audit": convert() writes
+    the aggregates of one transformed file instead of its workbook.
+    """
+
+    def __init__(self, journal=None, settings=None):
+        self.journal = journal
+        self.settings = settings or get_settings()
+
+    def convert(self, xml_path, data=None):
+        """
+        Aggregates xml_path, or data when the transformed XML is handed
+        over in memory, into <chunk>_transformed.audit.json beside it.
+        """
+        summary = AuditSummary.from_settings(self.settings)
+        summary.chunks = 1
+        if self.settings.get("column_store"):
+            summary.add_store(open_or_build(xml_path, data, summary._flattener, iter_records))
+        else:
+            with (open_data(data) if data is not None else open_input(xml_path)) as f:
+                for record in iter_records(f):
+                    summary.add(record)
+
+        audit_path = strip_compression_suffix(xml_path).replace(".xml", ".audit.json")
+        with open(audit_path, "w", encoding="utf-8") as f:
+            json.dump(summary.to_json(), f)
+
+        if self.journal is not None and os.path.exists(xml_path):
+            self.journal.record("excel", chunk_id(xml_path), audit_path, xml_path)
+
+        logger.info(f"Audited {summary.records} records of {xml_path}")
+        return audit_path
+
+
+def summarize(settings, audit_paths, output_dir=None):
+    """
+    Merges the per-chunk audit files of a run and writes the summary
+    workbook and JSON. Returns their paths.
+    """
+    total = AuditSummary.from_settings(settings)
+    for path in audit_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            total.merge(AuditSummary.from_json(json.load(f)))
+
+    paths = total.write(output_dir or settings["output_dir"], settings.get("excel_engine", "openpyxl"))
+    logger.info(
+        f"Audit summary of {total.records} records in {total.chunks} chunks "
+        f"written to {paths[0]}"
+    )
+    return paths
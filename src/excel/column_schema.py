@@ -0,0 +1,184 @@
+"""
+Run-wide column layout for the flat Excel sheet.
+
+Without it, every chunk's workbook gets the columns its own records happen
+to have, in the order they first appear, so workbooks of one run differ.
+A ColumnSchema fixes the flattened column list and its index map once per
+run, and every record is flattened straight into a row list by index (see
+flatten_row). column_schema picks where the columns come from:
+
+- "scan": a sample of the run's records is transformed, and the columns
+  of the sample are the layout. Columns outside the sample are dropped
+  with a warning, so column_schema_sample should cover the rare ones.
+- "xsd": every leaf element and attribute path the schema in xsd_path
+  allows under the element column_schema_element, in schema order.
+
+The schema is saved as JSON under output_dir/column_schemas, named by
+schema_key(), so a rerun of the same input and stylesheet reuses it.
+"""
+
+import hashlib
+import json
+import os
+from lxml import etree
+from utils.file_utils import ensure_dir
+from .flatten import Flattener, flatten_row
+
+XS = "{http://www.w3.org/2001/XMLSchema}"
+# Content models and wrappers whose children are walked in order
+MODEL_TAGS = tuple(
+    XS + tag for tag in ("sequence", "choice", "all", "complexContent", "simpleContent")
+)
+
+
+def _local(name):
+    return name.rsplit(":", 1)[-1]
+
+
+def schema_key(identity):
+    """
+    Name of the cached schema for identity, a JSON-serializable dict of
+    what decides the columns (input, stylesheet hash, settings).
+    """
+    text = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class _XSDColumns:
+    """
+    Walks the declarations of one element of an XSD into column paths.
+    Named types, groups and refs are looked up by local name; a type
+    that contains itself is not expanded again.
+    """
+
+    def __init__(self, xsd_path, sep):
+        self.sep = sep
+        root = etree.parse(xsd_path).getroot()
+        self.globals = {}
+        for kind in ("element", "complexType", "group", "attributeGroup", "attribute"):
+            self.globals[kind] = {
+                node.get("name"): node for node in root.findall(XS + kind)
+            }
+
+    def columns(self, element):
+        decl = self.globals["element"].get(element)
+        if decl is None:
+            raise ValueError(f"No global element {element} in the schema")
+
+        columns = []
+        attributes, particles = self._content(decl, ())
+        columns.extend("@" + name for name in attributes)
+        for child in particles:
+            self._element(child, "", (), columns)
+        return columns
+
+    def _element(self, decl, parent, types, columns):
+        if decl.get("ref"):
+            decl = self.globals["element"].get(_local(decl.get("ref")))
+            if decl is None:
+                return
+        path = f"{parent}{self.sep}{decl.get('name')}" if parent else decl.get("name")
+
+        if decl.get("type"):
+            type_name = _local(decl.get("type"))
+            if type_name in types:
+                return
+            types = types + (type_name,)
+        attributes, particles = self._content(decl, types)
+
+        columns.extend(f"{path}@{name}" for name in attributes)
+        if particles:
+            for child in particles:
+                self._element(child, path, types, columns)
+        else:
+            columns.append(path)
+
+    def _content(self, decl, types):
+        """
+        (attribute names, child element declarations) of an element,
+        through its complex type, groups and base types, in order.
+        """
+        if decl.tag == XS + "complexType":
+            complex_type = decl
+        else:
+            complex_type = decl.find(XS + "complexType")
+            if complex_type is None and decl.get("type"):
+                complex_type = self.globals["complexType"].get(_local(decl.get("type")))
+
+        attributes, particles = [], []
+        if complex_type is None:
+            return attributes, particles
+
+        stack = [iter(complex_type)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+
+            tag = child.tag
+            if tag == XS + "element":
+                particles.append(child)
+            elif tag == XS + "attribute":
+                name = child.get("name") or _local(child.get("ref", ""))
+                if name and child.get("use") != "prohibited":
+                    attributes.append(name)
+            elif tag in MODEL_TAGS:
+                stack.append(iter(child))
+            elif tag in (XS + "group", XS + "attributeGroup") and child.get("ref"):
+                kind = etree.QName(tag).localname
+                group = self.globals[kind].get(_local(child.get("ref")))
+                if group is not None:
+                    stack.append(iter(group))
+            elif tag in (XS + "extension", XS + "restriction"):
+                stack.append(iter(child))
+                # The base type's content comes first
+                base = self.globals["complexType"].get(_local(child.get("base", "")))
+                if base is not None and base.get("name") not in types:
+                    types = types + (base.get("name"),)
+                    stack.append(iter(base))
+
+        return list(dict.fromkeys(attributes)), particles
+
+
+class ColumnSchema:
+    def __init__(self, columns, sep="."):
+        self.columns = list(columns)
+        self.sep = sep
+        self.index = {column: i for i, column in enumerate(self.columns)}
+
+    @classmethod
+    def from_records(cls, records, flattener=None):
+        """
+        The union of the main sheet columns of records, flattened by
+        flattener (list_mode "join" by default), in first-seen order.
+        """
+        flattener = flattener or Flattener()
+        columns = {}
+        for record in records:
+            for row in flattener.flatten(record)[0]:
+                columns.update(dict.fromkeys(row))
+        return cls(columns, flattener.sep)
+
+    @classmethod
+    def from_xsd(cls, xsd_path, element, sep="."):
+        return cls(_XSDColumns(xsd_path, sep).columns(element), sep)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["columns"], data.get("sep", "."))
+
+    def save(self, path):
+        ensure_dir(os.path.dirname(path))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sep": self.sep, "columns": self.columns}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def row(self, record):
+        """
+        (row list, set of columns of record outside the schema).
+        """
+        return flatten_row(record, self.index, self.sep)
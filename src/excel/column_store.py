@@ -0,0 +1,346 @@
+"""
+Columnar on-disk store of flattened records, one per chunk.
+
+With column_store set, the Excel stage flattens each transformed chunk
+once into a directory beside it, and the workbook or audit summary is
+then written from there. A later run of the Excel stage or an audit
+reads the store instead of parsing the XML again, and only the columns
+it needs:
+
+    chunk_3_transformed.columns/
+        manifest.json        tables, columns, row counts, dtypes, source
+        main/                the main sheet rows
+            record.bin       record number of each row (int64)
+            c0000.valid.bin  whether the row has a value (bool)
+            c0000.offsets.bin  value i is data[offsets[i]:offsets[i + 1]]
+            c0000.data.bin   the UTF-8 values, back to back
+        t0001/               with list_mode "child", a table per group
+
+The files are raw arrays, with their dtypes in the manifest. A store is
+built by appending to them every BATCH_ROWS rows, so building it takes
+about as little memory as the streaming workbook writer; they are read
+back as NumPy memmaps, in batches of rows. Records are flattened with the
+run's list_mode (see flatten.py). A store is rebuilt when its chunk file,
+list_mode settings or format no longer match.
+"""
+
+import json
+import os
+import shutil
+from array import array
+import numpy as np
+from lxml import etree
+from utils.file_utils import ensure_dir, open_data, open_input, strip_compression_suffix
+
+MANIFEST = "manifest.json"
+MAIN = "main"
+BATCH_ROWS = 10000
+# Bumped when the file layout changes, so older stores are rebuilt
+FORMAT = 2
+
+RECORD_FILE = "record.bin"
+VALID = ".valid.bin"
+OFFSETS = ".offsets.bin"
+DATA = ".data.bin"
+DTYPES = {
+    "record": np.dtype(np.int64).str,
+    "valid": np.dtype(np.bool_).str,
+    "offsets": np.dtype(np.int64).str,
+}
+
+
+def column_store_path(xml_path):
+    return strip_compression_suffix(xml_path).replace(".xml", ".columns")
+
+
+def file_source(xml_path):
+    """
+    What a store built from xml_path records about it, to detect changes.
+    """
+    stat = os.stat(xml_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _append(path, buffer):
+    with open(path, "ab") as f:
+        f.write(buffer)
+
+
+def _map(path, dtype):
+    """
+    The raw array in path as a read-only memmap.
+    """
+    if not os.path.getsize(path):
+        # A zero-length file cannot be mapped
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class _ColumnBuilder:
+    """
+    One column being written to the files at stem. Rows without a value
+    are filled in as nulls; at most BATCH_ROWS rows are held in memory.
+    """
+
+    def __init__(self, stem):
+        self.stem = stem
+        self.rows = 0
+        # Data bytes so far, where the next value starts
+        self.end = 0
+        self.offsets = array("q", [0])
+        self.valid = bytearray()
+        self.data = bytearray()
+
+    def pad(self, rows):
+        while self.rows < rows:
+            step = min(rows - self.rows, BATCH_ROWS - len(self.valid))
+            self.offsets.extend(array("q", [self.end]) * step)
+            self.valid.extend(bytes(step))
+            self.rows += step
+            if len(self.valid) >= BATCH_ROWS:
+                self.flush()
+
+    def add(self, row, value):
+        self.pad(row)
+        if value is not None:
+            encoded = value.encode("utf-8")
+            self.data += encoded
+            self.end += len(encoded)
+        self.offsets.append(self.end)
+        self.valid.append(value is not None)
+        self.rows += 1
+        if len(self.valid) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        # Opened per flush, so a wide table does not hold a file per column
+        _append(self.stem + OFFSETS, self.offsets)
+        _append(self.stem + VALID, self.valid)
+        _append(self.stem + DATA, self.data)
+        self.offsets = array("q")
+        self.valid = bytearray()
+        self.data = bytearray()
+
+    def close(self, rows):
+        self.pad(rows)
+        self.flush()
+
+
+class _TableBuilder:
+    def __init__(self, directory):
+        ensure_dir(directory)
+        self.directory = directory
+        self.rows = 0
+        self.records = array("q")
+        # column -> _ColumnBuilder, in first-seen order
+        self.columns = {}
+
+    def add(self, record, row):
+        for column, value in row.items():
+            builder = self.columns.get(column)
+            if builder is None:
+                stem = os.path.join(self.directory, f"c{len(self.columns):04d}")
+                builder = self.columns[column] = _ColumnBuilder(stem)
+            builder.add(self.rows, value)
+        self.records.append(record)
+        self.rows += 1
+        if len(self.records) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        _append(os.path.join(self.directory, RECORD_FILE), self.records)
+        self.records = array("q")
+
+    def close(self):
+        self.flush()
+        for builder in self.columns.values():
+            builder.close(self.rows)
+        return {"rows": self.rows, "columns": list(self.columns)}
+
+
+class Column:
+    """
+    One stored column, memory-mapped.
+    """
+
+    def __init__(self, stem, dtypes=DTYPES):
+        self.valid = _map(stem + VALID, dtypes["valid"])
+        self.offsets = _map(stem + OFFSETS, dtypes["offsets"])
+        self.data = _map(stem + DATA, np.uint8)
+
+    def values(self, start, stop):
+        """
+        The values of rows start to stop, None where a row has none.
+        """
+        offsets = self.offsets[start:stop + 1]
+        base = int(offsets[0])
+        blob = self.data[base:int(offsets[-1])].tobytes()
+        bounds = (offsets - base).tolist()
+        valid = self.valid[start:stop].tolist()
+        return [
+            blob[bounds[i]:bounds[i + 1]].decode("utf-8") if valid[i] else None
+            for i in range(len(valid))
+        ]
+
+    def has_control_characters(self, start, stop):
+        """
+        Whether rows start to stop hold any control character other than
+        tab, newline and carriage return, checked on the raw bytes.
+        """
+        data = self.data[int(self.offsets[start]):int(self.offsets[stop])]
+        return bool(np.any((data < 32) & (data != 9) & (data != 10) & (data != 13)))
+
+
+class ColumnStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._columns = {}
+
+    @classmethod
+    def build(cls, records, path, flattener, source=None):
+        """
+        Flattens records (an iterable of record elements) into a new store
+        at path, replacing any old one, and returns it.
+        """
+        # Built beside the old store, which is only replaced when complete
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+
+        tables = {MAIN: _TableBuilder(os.path.join(tmp_path, MAIN))}
+        directories = {MAIN: MAIN}
+        record_types = {}
+        count = 0
+
+        for count, record in enumerate(records, 1):
+            name = etree.QName(record).localname
+            record_types[name] = record_types.get(name, 0) + 1
+            rows, children = flattener.flatten(record)
+            for row in rows:
+                tables[MAIN].add(count, row)
+            for group, child_rows in children.items():
+                table = tables.get(group)
+                if table is None:
+                    directory = directories[group] = f"t{len(tables):04d}"
+                    table = tables[group] = _TableBuilder(os.path.join(tmp_path, directory))
+                for row in child_rows:
+                    table.add(count, row)
+
+        manifest = {
+            "format": FORMAT,
+            "records": count,
+            "record_types": record_types,
+            "source": source,
+            "flatten": flatten_settings(flattener),
+            "dtypes": DTYPES,
+            "tables": {
+                name: dict(table.close(), dir=directories[name])
+                for name, table in tables.items()
+            },
+        }
+        with open(os.path.join(tmp_path, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    @property
+    def records(self):
+        return self.manifest["records"]
+
+    @property
+    def record_types(self):
+        return self.manifest["record_types"]
+
+    def tables(self):
+        """
+        Table names: "main" first, then the child groups.
+        """
+        return list(self.manifest["tables"])
+
+    def columns(self, table=MAIN):
+        return self.manifest["tables"][table]["columns"]
+
+    def rows(self, table=MAIN):
+        return self.manifest["tables"][table]["rows"]
+
+    def record_numbers(self, table=MAIN):
+        info = self.manifest["tables"][table]
+        return _map(os.path.join(self.path, info["dir"], RECORD_FILE), self.manifest["dtypes"]["record"])
+
+    def column(self, name, table=MAIN):
+        key = (table, name)
+        if key not in self._columns:
+            info = self.manifest["tables"][table]
+            stem = os.path.join(self.path, info["dir"], f"c{info['columns'].index(name):04d}")
+            self._columns[key] = Column(stem, self.manifest["dtypes"])
+        return self._columns[key]
+
+    def batches(self, columns, table=MAIN, size=BATCH_ROWS):
+        """
+        Yields (start, stop, {column: values}) for every size rows of
+        table. Columns the table does not have come back as all None.
+        """
+        stored = set(self.columns(table))
+        rows = self.rows(table)
+        for start in range(0, rows, size):
+            stop = min(start + size, rows)
+            yield start, stop, {
+                name: self.column(name, table).values(start, stop) if name in stored
+                else [None] * (stop - start)
+                for name in columns
+            }
+
+    def matches(self, source, flattener):
+        return (
+            self.manifest.get("format") == FORMAT and
+            self.manifest["source"] == source and
+            self.manifest["flatten"] == flatten_settings(flattener)
+        )
+
+
+def flatten_settings(flattener):
+    return {
+        "list_mode": flattener.list_mode,
+        "list_elements": sorted(flattener.list_elements),
+        "sep": flattener.sep,
+    }
+
+
+def open_or_build(xml_path, data, flattener, parse):
+    """
+    The store of xml_path. Built from data when given (the transformed
+    XML handed over in memory), else reused if it matches the file, else
+    built from the file. A store whose file is gone is used as it is.
+    parse(source) yields the records of a binary file.
+    """
+    path = column_store_path(xml_path)
+
+    if data is not None:
+        with open_data(data) as f:
+            return ColumnStore.build(parse(f), path, flattener)
+
+    if not os.path.exists(xml_path):
+        store = ColumnStore(path)
+        if (
+            store.manifest.get("format") != FORMAT or
+            store.manifest["flatten"] != flatten_settings(flattener)
+        ):
+            raise ValueError(
+                f"Column store {path} was built with other list_mode settings "
+                f"or an older format, and {xml_path} is not there to rebuild it"
+            )
+        return store
+
+    source = file_source(xml_path)
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        store = ColumnStore(path)
+        if store.matches(source, flattener):
+            return store
+
+    with open_input(xml_path) as f:
+        return ColumnStore.build(parse(f), path, flattener, source)
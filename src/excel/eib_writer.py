@@ -0,0 +1,144 @@
+"""
+Writes transformed records as an EIB upload workbook.
+
+The Put Historical Academic Record EIB expects one sheet per element
+group: a parent sheet with one row per record, and a child sheet for each
+repeating element, linked to the parent row by its Spreadsheet Key and
+numbered by Row ID. Every sheet starts with the template's title rows and
+a row of column headers. The layout comes from a YAML template
+(eib_template_path):
+
+    key_header: "Spreadsheet Key*"
+    row_id_header: "Row ID*"
+    sheets:
+      - name: "Put Historical Academic Record"
+        title_rows:
+          - ["Put Historical Academic Record"]
+        columns:
+          - header: "Student*"
+            path: "Student_ID"
+      - name: "Degrees"
+        group: "Degree"          # repeating element under the record
+        columns:
+          - header: "Degree*"
+            path: "ID"
+          - header: "Degree Type"
+            path: "ID/@type"
+
+Paths are local element names separated by "/", relative to the record
+(or to the group element), with an optional trailing @attribute. Sheets
+are appended to as each record is parsed, through a streaming workbook
+writer (see writer_engine.py), so memory holds one record at a time.
+"""
+
+import yaml
+from lxml import etree
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from utils.logger import get_logger
+from .writer_engine import open_workbook
+
+logger = get_logger(__name__)
+
+
+def _local(tag):
+    return etree.QName(tag).localname
+
+
+def _compile_path(path):
+    """
+    "A/B/@c" -> (("A", "B"), "c"). An empty path is the element itself.
+    """
+    steps = [step for step in path.split("/") if step and step != "."]
+    attribute = steps.pop()[1:] if steps and steps[-1].startswith("@") else None
+    return tuple(steps), attribute
+
+
+def _find_all(elem, steps):
+    """
+    Elements under elem at the local-name path steps, in document order.
+    """
+    nodes = [elem]
+    for step in steps:
+        nodes = [
+            child for node in nodes for child in node
+            if isinstance(child.tag, str) and _local(child.tag) == step
+        ]
+    return nodes
+
+
+def _value(elem, steps, attribute):
+    nodes = _find_all(elem, steps)
+    if not nodes:
+        return None
+    node = nodes[0]
+    if attribute is not None:
+        value = next(
+            (v for name, v in node.attrib.items() if _local(name) == attribute), None
+        )
+    else:
+        value = ("".join(node.itertext())).strip() or None
+    # openpyxl refuses control characters that XML 1.0 allows
+    return ILLEGAL_CHARACTERS_RE.sub("", value) if value else value
+
+
+class EIBTemplate:
+    def __init__(self, template):
+        self.key_header = template.get("key_header", "Spreadsheet Key*")
+        self.row_id_header = template.get("row_id_header", "Row ID*")
+        self.sheets = []
+
+        for sheet in template["sheets"]:
+            group = sheet.get("group")
+            self.sheets.append({
+                "name": sheet["name"],
+                "title_rows": sheet.get("title_rows") or [],
+                "group": _compile_path(group)[0] if group else None,
+                "headers": [column["header"] for column in sheet["columns"]],
+                "columns": [_compile_path(column["path"]) for column in sheet["columns"]],
+            })
+
+        if not self.sheets or self.sheets[0]["group"] is not None:
+            raise ValueError("The first EIB template sheet must be the parent sheet, without a group")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            template = yaml.safe_load(f)
+
+        logger.info(f"Loaded EIB template {path}")
+        return cls(template)
+
+    def write(self, records, excel_path, engine="openpyxl"):
+        """
+        Writes records (an iterable of record elements) to excel_path with
+        the given writer engine. Returns the number of parent rows.
+        """
+        book = open_workbook(excel_path, engine)
+        sheets = []
+
+        for sheet in self.sheets:
+            ws = book.add_sheet(sheet["name"][:31])
+            for row in sheet["title_rows"]:
+                ws.append(row)
+            if sheet["group"] is None:
+                ws.append([self.key_header, *sheet["headers"]])
+            else:
+                ws.append([self.key_header, self.row_id_header, *sheet["headers"]])
+            sheets.append((ws, sheet))
+
+        key = 0
+        for record in records:
+            key += 1
+            for ws, sheet in sheets:
+                if sheet["group"] is None:
+                    ws.append([key, *(_value(record, *column) for column in sheet["columns"])])
+                    continue
+
+                for row_id, elem in enumerate(_find_all(record, sheet["group"]), 1):
+                    ws.append([
+                        key, row_id,
+                        *(_value(elem, *column) for column in sheet["columns"])
+                    ])
+
+        book.close()
+        return key
@@ -1,15 +1,205 @@
 """
-Helper for flattening nested XML structures into rows.
+Flattens transformed XML records into rows.
+
+The leaf elements of a record become columns named by their path of local
+names (e.g. Institution.ID), and attributes become path@attribute.
+Repeating elements, such as several Degree or Course entries in one
+record, are handled by list_mode:
+
+- "join": one row per record; the values of a repeated path are joined
+  with "; ".
+- "explode": one row per combination of the record's repeating groups,
+  with the record's other fields repeated on each.
+- "index": one row per record and a numbered column per occurrence,
+  e.g. Degree[2].ID.
+- "child": one row per record; each repeating group goes to a child
+  sheet of its own, one row per occurrence.
+
+An element repeats when its parent has more than one child of that name,
+or when its name is in list_elements, so a group that happens to occur
+once still goes the same way. Repeats nested inside an exploded or child
+occurrence are joined.
+
+Nothing recurses: elements are walked with an explicit stack, and the
+column key of every (parent path, tag) pair is built once and cached.
 """
 
-import pandas as pd
-
-def flatten_dict(d, parent_key="", sep="."):
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        else:
-            items.append((new_key, v))
-    return dict(items)
+from lxml import etree
+
+LIST_MODES = ("join", "explode", "index", "child")
+
+
+class Flattener:
+    def __init__(self, list_mode="join", sep=".", list_elements=()):
+        if list_mode not in LIST_MODES:
+            raise ValueError(f"Unknown list_mode: {list_mode}")
+        self.list_mode = list_mode
+        self.sep = sep
+        self.list_elements = frozenset(list_elements or ())
+        # tag -> local name, and (parent path, tag, kind) -> column key
+        self._names = {}
+        self._keys = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get("list_mode", "join"), list_elements=settings.get("list_elements"))
+
+    def _name(self, tag):
+        name = self._names.get(tag)
+        if name is None:
+            name = self._names[tag] = etree.QName(tag).localname
+        return name
+
+    def _key(self, path, tag, kind=None):
+        """
+        Column of tag under path: an element (kind None), an attribute
+        (kind "@") or the kind-th occurrence of a repeating element.
+        """
+        key = self._keys.get((path, tag, kind))
+        if key is None:
+            name = self._name(tag)
+            if kind == "@":
+                key = f"{path}@{name}"
+            else:
+                key = f"{path}{self.sep}{name}" if path else name
+                if kind is not None:
+                    key = f"{key}[{kind}]"
+            self._keys[(path, tag, kind)] = key
+        return key
+
+    def _repeats(self, children):
+        counts = {}
+        for child in children:
+            counts[child.tag] = counts.get(child.tag, 0) + 1
+        return {
+            tag for tag, count in counts.items()
+            if count > 1 or self._name(tag) in self.list_elements
+        }
+
+    def values(self, record, base="", groups=None):
+        """
+        Yields (column, value) for the attributes and leaves under record,
+        in document order, with columns relative to base. With groups (a
+        dict), repeating children are collected there as column ->
+        [elements] instead of being walked.
+        """
+        split = groups is not None or self.list_mode == "index"
+        keys = self._keys
+        stack = [(record, base)]
+
+        while stack:
+            elem, path = stack.pop()
+            if elem.attrib:
+                for name, value in elem.attrib.items():
+                    yield self._key(path, name, "@"), value
+
+            children = [child for child in elem if isinstance(child.tag, str)]
+            if not children:
+                # A record without children has no value column of its own
+                if elem is not record or base:
+                    yield path, (elem.text or "").strip() or None
+                continue
+
+            repeats = self._repeats(children) if split else ()
+            if not repeats:
+                for child in reversed(children):
+                    key = keys.get((path, child.tag, None)) or self._key(path, child.tag)
+                    stack.append((child, key))
+                continue
+
+            walk = []
+            seen = {}
+            for child in children:
+                if child.tag not in repeats:
+                    walk.append((child, self._key(path, child.tag)))
+                elif groups is not None:
+                    groups.setdefault(self._key(path, child.tag), []).append(child)
+                else:
+                    seen[child.tag] = seen.get(child.tag, 0) + 1
+                    walk.append((child, self._key(path, child.tag, seen[child.tag])))
+            stack.extend(reversed(walk))
+
+    @staticmethod
+    def join(pairs):
+        """
+        Row dict of (column, value) pairs; a repeated column's values are
+        joined with "; ".
+        """
+        row = {}
+        for key, value in pairs:
+            current = row.get(key)
+            if current is None:
+                row[key] = value
+            elif value is not None:
+                row[key] = f"{current}; {value}"
+        return row
+
+    def flatten(self, record):
+        """
+        Returns (rows, children): the main sheet rows of record, and with
+        list_mode "child" the rows of each repeating group by its column
+        path, for the child sheets.
+        """
+        if self.list_mode in ("join", "index"):
+            return [self.join(self.values(record))], {}
+
+        groups = {}
+        row = self.join(self.values(record, groups=groups))
+
+        if self.list_mode == "child":
+            return [row], {
+                path: [self._occurrence(elem) for elem in elems]
+                for path, elems in groups.items()
+            }
+
+        rows = [row]
+        for path, elems in groups.items():
+            occurrences = [self.join(self.values(elem, base=path)) for elem in elems]
+            rows = [{**base, **occurrence} for base in rows for occurrence in occurrences]
+        return rows, {}
+
+    def _occurrence(self, elem):
+        """
+        Child sheet row of one occurrence, with columns relative to it.
+        """
+        row = self.join(self.values(elem))
+        if not any(isinstance(child.tag, str) for child in elem):
+            row[self._name(elem.tag)] = (elem.text or "").strip() or None
+        return row
+
+
+# sep -> Flattener in "join" mode, shared by the helpers below
+_JOINERS = {}
+
+
+def _joiner(sep):
+    if sep not in _JOINERS:
+        _JOINERS[sep] = Flattener(sep=sep)
+    return _JOINERS[sep]
+
+
+def flatten_element(record, sep="."):
+    """
+    Flattens one record element into a row dict, list_mode "join".
+    """
+    joiner = _joiner(sep)
+    return joiner.join(joiner.values(record))
+
+
+def flatten_row(record, index, sep="."):
+    """
+    Flattens one record like flatten_element, straight into a list laid
+    out by index (column -> position). Returns the list and the set of
+    columns the record has that index does not.
+    """
+    row = [None] * len(index)
+    unknown = set()
+    for key, value in _joiner(sep).values(record):
+        i = index.get(key)
+        if i is None:
+            unknown.add(key)
+        elif row[i] is not None and value is not None:
+            row[i] = f"{row[i]}; {value}"
+        elif row[i] is None:
+            row[i] = value
+    return row, unknown
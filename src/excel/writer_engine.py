@@ -0,0 +1,82 @@
+"""
+Workbook writer engines for the Excel stage.
+
+Both engines write rows as they come and keep only a few in memory:
+
+- "openpyxl": an openpyxl write-only workbook.
+- "xlsxwriter": an XlsxWriter workbook in constant_memory mode, which
+  flushes each row to a temporary file as soon as the next one starts.
+  Needs the xlsxwriter package.
+
+open_workbook() returns a writer with the same small interface for either:
+
+    book = open_workbook(path, "xlsxwriter")
+    sheet = book.add_sheet("Records")
+    sheet.append(["Student_ID", "Institution"])
+    book.close()
+"""
+
+from openpyxl import Workbook
+
+ENGINES = ("openpyxl", "xlsxwriter")
+
+
+def _xlsxwriter():
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ImportError(
+            'excel_engine "xlsxwriter" requires the xlsxwriter package'
+        ) from None
+    return xlsxwriter
+
+
+class OpenpyxlBook:
+    def __init__(self, path):
+        self.path = path
+        self.wb = Workbook(write_only=True)
+
+    def add_sheet(self, name=None):
+        # A write-only worksheet already has append()
+        return self.wb.create_sheet(name)
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class _XlsxWriterSheet:
+    def __init__(self, ws):
+        self.ws = ws
+        self.row = 0
+
+    def append(self, values):
+        self.ws.write_row(self.row, 0, values)
+        self.row += 1
+
+
+class XlsxWriterBook:
+    def __init__(self, path):
+        self.wb = _xlsxwriter().Workbook(path, {
+            "constant_memory": True,
+            # Cell values are data; never turn them into formulas or links
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        })
+
+    def add_sheet(self, name=None):
+        return _XlsxWriterSheet(self.wb.add_worksheet(name))
+
+    def close(self):
+        self.wb.close()
+
+
+def open_workbook(path, engine="openpyxl"):
+    """
+    Returns a new workbook writer for path using engine (see ENGINES).
+    Nothing is written to path until close().
+    """
+    if engine == "openpyxl":
+        return OpenpyxlBook(path)
+    if engine == "xlsxwriter":
+        return XlsxWriterBook(path)
+    raise ValueError(f"Unknown excel_engine: {engine}")
@@ -1,22 +1,325 @@
 """
 Converts XML to Excel for auditing.
+
+Each child of the root element (one transformed record) becomes one row.
+The records are streamed with iterparse and the rows written by a
+constant-memory writer engine (excel_engine, see writer_engine.py), so
+memory holds a few rows, not the chunk.
+The columns are collected in a first pass over the records, since a
+write-only sheet needs its header first, unless the run fixed them in a
+column schema (column_schema_file, see column_schema.py): then every
+workbook of the run has the same columns in the same order, and the
+records are read once.
+
+With eib_template_path set, the records are written as a multi-sheet EIB
+upload workbook instead, in a single pass (see eib_writer.py).
+
+Repeating elements in a record follow list_mode (see flatten.py). With
+"child", each repeating group gets a sheet of its own after the main
+one; the main sheet then starts with a Spreadsheet Key column, and each
+child row carries the key of its record and a Row ID within it.
+
+With column_store set, each file is flattened once into a columnar store
+beside it (see column_store.py) and the workbook is written from the
+store in batches of rows; converting the same file again reads only the
+store.
+
+convert_many() converts a list of transformed files in a process pool.
+transform_many(convert=True) already converts each chunk in the worker
+that transformed it; convert_many is for transformed files on disk, e.g.
+with keep_intermediate, to rebuild the workbooks with another engine or
+template.
 """
 
-import pandas as pd
-import xmltodict
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from lxml import etree
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 from utils.logger import get_logger
+from utils.file_utils import open_data, open_input, strip_compression_suffix
+from utils.xml_utils import get_settings, prune_element
+from utils.checkpoint import chunk_id
+from .flatten import Flattener
+from .eib_writer import EIBTemplate
+from .column_schema import ColumnSchema
+from .writer_engine import ENGINES, open_workbook
+from .column_store import MAIN, open_or_build
 
 logger = get_logger(__name__)
 
+# Per-process converter, built once by _init_worker
+_worker = None
+
+
+def _init_worker(settings):
+    global _worker
+    _worker = XMLToExcel(settings=settings)
+
+
+def _convert_in_worker(xml_path):
+    return _worker.convert(xml_path)
+
+
+def iter_records(source):
+    """
+    Yields every child of the root element of source (a binary file) as
+    iterparse completes it, and prunes it once the caller is done.
+    """
+    depth = 0
+    for event, elem in etree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield elem
+            prune_element(elem)
+
+
+KEY_HEADER = "Spreadsheet Key"
+ROW_ID_HEADER = "Row ID"
+
+
+def _cell(value):
+    # openpyxl refuses control characters that XML 1.0 allows
+    if value is None:
+        return None
+    return ILLEGAL_CHARACTERS_RE.sub("", value)
+
+
 class XMLToExcel:
-    def convert(self, xml_path):
+    def __init__(self, journal=None, settings=None):
+        self.journal = journal
+        self.settings = settings or get_settings()
+        self.engine = self.settings.get("excel_engine", "openpyxl")
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown excel_engine: {self.engine}")
+        template_path = self.settings.get("eib_template_path")
+        self.template = EIBTemplate.load(template_path) if template_path else None
+        schema_file = self.settings.get("column_schema_file")
+        self.schema = ColumnSchema.load(schema_file) if schema_file else None
+        self.flattener = Flattener.from_settings(self.settings)
+
+    def convert(self, xml_path, data=None):
+        """
+        Converts xml_path to a workbook beside it. With data (the XML as
+        bytes or a memoryview, handed over in memory by the transform
+        stage) xml_path only names the workbook and need not exist; the
+        caller journals it.
+        """
+        if data is None:
+            done = self.journal and self.journal.completed("excel", chunk_id(xml_path), xml_path)
+            if done:
+                logger.info(f"Already converted, skipping {xml_path}")
+                return done["path"]
+
         logger.info(f"Converting XML to Excel: {xml_path}")
 
-        with open(xml_path, "r", encoding="utf-8") as f:
-            data = xmltodict.parse(f.read())
+        def open_source():
+            return open_data(data) if data is not None else open_input(xml_path)
+
+        excel_path = strip_compression_suffix(xml_path).replace(".xml", ".xlsx")
+
+        if self.template is not None:
+            with open_source() as f:
+                rows = self.template.write(iter_records(f), excel_path, self.engine)
+            logger.info(f"Wrote {rows} records to EIB workbook {excel_path}")
+        elif self.settings.get("column_store"):
+            store = open_or_build(xml_path, data, self.flattener, iter_records)
+            self._write_store(store, excel_path)
+        else:
+            self._write_flat(open_source, excel_path)
 
-        df = pd.json_normalize(data)
-        excel_path = xml_path.replace(".xml", ".xlsx")
-        df.to_excel(excel_path, index=False)
+        if self.journal is not None and os.path.exists(xml_path):
+            self.journal.record("excel", chunk_id(xml_path), excel_path, xml_path)
 
         return excel_path
+
+    def convert_many(self, paths):
+        """
+        Converts the transformed files in paths on excel_workers processes
+        and returns the workbook paths in input order. Only this process
+        writes the checkpoint journal.
+        """
+        workers = self.settings.get("excel_workers") or os.cpu_count()
+        started = time.perf_counter()
+        results = {}
+        todo = []
+
+        for xml_path in paths:
+            done = self.journal and self.journal.completed("excel", chunk_id(xml_path), xml_path)
+            if done:
+                logger.info(f"Already converted, skipping {xml_path}")
+                results[xml_path] = done["path"]
+            else:
+                todo.append(xml_path)
+
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(todo)),
+                initializer=_init_worker,
+                initargs=(self.settings,)
+            ) as pool:
+                converted = list(pool.map(_convert_in_worker, todo))
+            # The workers have no journal
+            if self.journal is not None:
+                for xml_path, excel_path in zip(todo, converted):
+                    self.journal.record("excel", chunk_id(xml_path), excel_path, xml_path)
+        else:
+            converted = [self.convert(xml_path) for xml_path in todo]
+
+        results.update(zip(todo, converted))
+
+        logger.info(
+            f"Converted {len(todo)} of {len(paths)} files with {self.engine} in "
+            f"{time.perf_counter() - started:.2f}s on {min(workers, max(len(todo), 1))} processes"
+        )
+        return [results[xml_path] for xml_path in paths]
+
+    def _write_flat(self, open_source, excel_path):
+        """
+        A main sheet with a column per element path, and with list_mode
+        "child" a sheet per repeating group.
+        """
+        flattener = self.flattener
+        child_mode = flattener.list_mode == "child"
+        if self.schema is not None and flattener.list_mode == "join":
+            return self._write_schema(open_source, excel_path)
+
+        # Pass 1: the union of the columns of every sheet, in first-seen
+        # order. A column schema fixes the main sheet's.
+        columns = None if self.schema is None else dict.fromkeys(self.schema.columns)
+        child_columns = {}
+        if columns is None or child_mode:
+            scanned = {}
+            with open_source() as f:
+                for record in iter_records(f):
+                    rows, children = flattener.flatten(record)
+                    for row in rows:
+                        scanned.update(dict.fromkeys(row))
+                    for path, child_rows in children.items():
+                        group = child_columns.setdefault(path, {})
+                        for row in child_rows:
+                            group.update(dict.fromkeys(row))
+            if columns is None:
+                columns = scanned
+
+        # Pass 2: the rows
+        book = open_workbook(excel_path, self.engine)
+        ws = book.add_sheet()
+        sheets = {}
+        if columns or child_mode:
+            ws.append([KEY_HEADER, *columns] if child_mode else list(columns))
+        for path, group in child_columns.items():
+            sheets[path] = book.add_sheet(path[-31:])
+            sheets[path].append([KEY_HEADER, ROW_ID_HEADER, *group])
+
+        rows_written = 0
+        dropped = set()
+        with open_source() as f:
+            for key, record in enumerate(iter_records(f), 1):
+                rows, children = flattener.flatten(record)
+                for row in rows:
+                    values = [_cell(row.get(column)) for column in columns]
+                    ws.append([key, *values] if child_mode else values)
+                    rows_written += 1
+                    if self.schema is not None:
+                        dropped.update(column for column in row if column not in columns)
+
+                for path, child_rows in children.items():
+                    group = child_columns[path]
+                    for row_id, row in enumerate(child_rows, 1):
+                        sheets[path].append([key, row_id, *(_cell(row.get(column)) for column in group)])
+
+        book.close()
+        self._log_dropped(dropped, excel_path)
+        logger.info(
+            f"Wrote {rows_written} rows, {len(columns)} columns"
+            f"{f', {len(sheets)} child sheets' if sheets else ''} to {excel_path}"
+        )
+
+    def _write_schema(self, open_source, excel_path):
+        """
+        The flat sheet with the run's column schema, in one pass.
+        """
+        book = open_workbook(excel_path, self.engine)
+        ws = book.add_sheet()
+        ws.append(self.schema.columns)
+        rows = 0
+        dropped = set()
+
+        with open_source() as f:
+            for record in iter_records(f):
+                row, unknown = self.schema.row(record)
+                ws.append([_cell(value) for value in row])
+                dropped |= unknown
+                rows += 1
+
+        book.close()
+        self._log_dropped(dropped, excel_path)
+        logger.info(f"Wrote {rows} rows, {len(self.schema.columns)} columns to {excel_path}")
+
+    def _write_store(self, store, excel_path):
+        """
+        The flat workbook from a column store. The columns are known up
+        front, so every sheet is written in one pass over its table.
+        """
+        child_mode = self.flattener.list_mode == "child"
+        stored = store.columns()
+        columns = self.schema.columns if self.schema is not None else stored
+
+        book = open_workbook(excel_path, self.engine)
+        ws = book.add_sheet()
+        if columns or child_mode:
+            ws.append([KEY_HEADER, *columns] if child_mode else list(columns))
+        self._append_table(ws, store, MAIN, columns, child_mode, False)
+
+        children = store.tables()[1:]
+        for table in children:
+            sheet = book.add_sheet(table[-31:])
+            sheet.append([KEY_HEADER, ROW_ID_HEADER, *store.columns(table)])
+            self._append_table(sheet, store, table, store.columns(table), True, True)
+
+        book.close()
+        if self.schema is not None:
+            self._log_dropped(set(stored) - set(columns), excel_path)
+        logger.info(
+            f"Wrote {store.rows()} rows, {len(columns)} columns"
+            f"{f', {len(children)} child sheets' if children else ''} to {excel_path} "
+            f"from {store.path}"
+        )
+
+    def _append_table(self, ws, store, table, columns, with_key, with_row_id):
+        """
+        Appends the rows of one store table, optionally led by the record
+        key and the Row ID within it.
+        """
+        stored = set(store.columns(table))
+        records = np.asarray(store.record_numbers(table))
+        leading = []
+        if with_key:
+            leading.append(records)
+        if with_row_id:
+            # Position of each row after the first row of its record
+            index = np.arange(len(records))
+            first = np.r_[True, records[1:] != records[:-1]] if len(records) else np.zeros(0, bool)
+            leading.append(index - np.maximum.accumulate(np.where(first, index, 0)) + 1)
+
+        for start, stop, batch in store.batches(columns, table):
+            values = [batch[name] for name in columns]
+            for i, name in enumerate(columns):
+                # openpyxl refuses control characters; only clean the
+                # batches whose raw bytes have any
+                if name in stored and store.column(name, table).has_control_characters(start, stop):
+                    values[i] = [_cell(value) for value in values[i]]
+            for row in zip(*(array[start:stop].tolist() for array in leading), *values):
+                ws.append(row)
+
+    def _log_dropped(self, dropped, excel_path):
+        if dropped:
+            logger.warning(
+                f"Columns not in the column schema, left out of {excel_path}: "
+                f"{', '.join(sorted(dropped))}"
+            )
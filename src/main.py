@@ -2,35 +2,76 @@
 Main pipeline orchestrator.
 """
 
-# from splitting.splitter import XMLSplitter
-# from transform.xslt_transformer import XSLTTransformer
-# from excel.xml_to_excel import XMLToExcel
+from splitting.splitter import XMLSplitter
+from splitting.size_model import record_outputs
+from excel.audit_summary import summarize
+from transform.xslt_transformer import XSLTTransformer
+from pipeline.overlapped import run_overlapped
+from pipeline.batch import run_batch
 from utils.logger import get_logger, kill_terminal
+from utils.checkpoint import CheckpointJournal
 import utils.xml_utils as xml_mod
+import argparse
 
 main_logger = get_logger()
 
-def run_pipeline():
+def run_pipeline(resume=False):
     main_logger.info("Starting Workday XML pipeline")
     
-    # Test XML functions
-    print(str(xml_mod.get_settings()))
+    settings = xml_mod.get_settings()
+    mode = settings.get("pipeline_mode", "serial")
 
-    # 1. Split XML
-    # splitter = XMLSplitter()
-    # chunk_files = splitter.split()
+    # Finished work is journaled; with resume, it is skipped. Batch mode
+    # keeps a journal per input in its subfolder instead.
+    journal = None
+    if mode != "batch":
+        journal = CheckpointJournal.for_output(settings["output_dir"], resume)
 
-    # 2. Transform each chunk
-    # transformer = XSLTTransformer()
-    # transformed_files = [transformer.apply_xslt(f) for f in chunk_files]
+    if mode == "batch":
+        # Every input in the input directory, each into its own subfolder
+        summary = run_batch(settings, resume)
+        excel_files = [f for job in summary for f in job.get("excel_files", [])]
 
-    # 3. Convert to Excel (optional)
-    # converter = XMLToExcel()
-    # for f in transformed_files:
-    #     converter.convert(f)
+    elif mode == "overlapped":
+        # Split in this process, transform and convert in a worker pool
+        excel_files = run_overlapped(settings, journal=journal)
+
+    else:
+        # 1. Split XML
+        splitter = XMLSplitter(settings, journal)
+        chunk_files = splitter.split()
+
+        # 2. Transform the chunks in parallel and 3. convert each to Excel,
+        # in memory unless keep_intermediate is set. Failed chunks are
+        # quarantined.
+        transformer = XSLTTransformer(settings, journal)
+        # Same workbook columns for every chunk, if column_schema is set
+        transformer.prepare_columns(splitter.input_path, chunk_files)
+        excel_files = transformer.transform_many(chunk_files, convert=True)
+        chunk_files = [f for f in chunk_files if f not in transformer.quarantined]
+
+        if settings.get("excel_output") == "audit":
+            # One audit summary for the run instead of a workbook per chunk
+            excel_files = list(summarize(settings, excel_files))
+        else:
+            # Keep output stats for the EIB size model
+            record_outputs(settings, chunk_files, excel_files)
+
+        # Delta mode: this run becomes the baseline for the next one,
+        # unless a chunk was quarantined or had invalid records
+        splitter.commit_fingerprints(transformer.incomplete)
 
     main_logger.info("Pipeline complete")
+    return excel_files
 
 if __name__ == "__main__":
-    run_pipeline()
-    kill_terminal()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the checkpoint journal of an interrupted run"
+    )
+    args = parser.parse_args()
+
+    run_pipeline(resume=args.resume)
+    kill_terminal()
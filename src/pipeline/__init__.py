@@ -0,0 +1 @@
+# Makes the pipeline package importable.
\ No newline at end of file
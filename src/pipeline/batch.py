@@ -0,0 +1,203 @@
+"""
+Batch mode: runs the pipeline for every XML file in the input directory.
+
+Inputs are processed concurrently, each into its own subfolder of the
+output directory. The scheduler caps both the number of running inputs and
+their combined memory estimate, and a combined run summary is written at
+the end.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from splitting.splitter import XMLSplitter, find_xml_inputs
+from splitting.size_model import record_outputs
+from excel.audit_summary import summarize
+from transform.xslt_transformer import XSLTTransformer
+from transform.stylesheet_cache import get_stylesheet
+from utils.file_utils import ensure_dir, strip_compression_suffix
+from utils.checkpoint import CheckpointJournal
+from utils.xml_utils import get_settings
+from utils.perf_utils import peak_rss_bytes
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_FILE = "run_summary.json"
+
+
+def _input_name(input_path):
+    name = strip_compression_suffix(os.path.basename(input_path))
+    return os.path.splitext(name)[0]
+
+
+def _init_worker(settings):
+    """
+    Compiles the stylesheet once per worker process, before any input. The
+    mapping engine has no stylesheet.
+    """
+    if settings.get("transform_engine", "xslt") == "mapping":
+        return
+
+    xslt_path = settings["xslt_path"]
+    try:
+        get_stylesheet(xslt_path)
+    except Exception as e:
+        # The input that needs it will fail and be reported in the summary
+        logger.warning(f"Could not compile stylesheet {xslt_path}: {e}")
+
+
+def _run_input(input_path, settings, resume=False):
+    """
+    Worker: split, transform and convert one input, serially. Each input
+    keeps its own checkpoint journal in its output folder.
+    """
+    started = time.perf_counter()
+    journal = CheckpointJournal.for_output(settings["output_dir"], resume)
+
+    try:
+        splitter = XMLSplitter(settings, journal)
+        chunk_files = splitter.split(input_path)
+
+        # Inputs already run in parallel, so chunks are transformed and
+        # converted in this worker; failed chunks are still quarantined
+        transformer = XSLTTransformer(dict(settings, transform_workers=1), journal)
+        transformer.prepare_columns(input_path, chunk_files)
+        excel_files = transformer.transform_many(chunk_files, convert=True)
+        chunk_files = [f for f in chunk_files if f not in transformer.quarantined]
+        if settings.get("excel_output") == "audit":
+            excel_files = list(summarize(settings, excel_files))
+        else:
+            record_outputs(settings, chunk_files, excel_files)
+        splitter.commit_fingerprints(transformer.incomplete)
+
+    except Exception as e:
+        # lxml errors carry an error log that cannot be pickled back to
+        # the parent process, so send the message instead
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+    peak = peak_rss_bytes()
+    return {
+        "records": splitter.stats.get("records"),
+        "chunks": len(chunk_files),
+        "quarantined": list(transformer.quarantined.values()),
+        "invalid": list(transformer.invalid.values()),
+        "excel_files": excel_files,
+        "seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": round(peak / (1024 * 1024), 1) if peak else None,
+    }
+
+
+def run_batch(settings=None, resume=False):
+    """
+    Processes every XML input concurrently and returns the run summary, one
+    entry per input in input order.
+
+    A failed input is recorded in the summary and does not stop the others.
+    With resume, each input continues from its checkpoint journal. Inputs
+    that only differ in their compression suffix are refused up front,
+    since they would share an output folder.
+    """
+    settings = settings or get_settings()
+    output_dir = settings["output_dir"]
+    ensure_dir(output_dir)
+
+    inputs = find_xml_inputs(settings["input_dir"])
+    if not inputs:
+        raise FileNotFoundError("No XML file found in input directory")
+
+    # a.xml and a.xml.gz would share one output folder and journal
+    folders = {}
+    for path in inputs:
+        other = folders.setdefault(_input_name(path), path)
+        if other != path:
+            raise ValueError(
+                f"Batch inputs {other} and {path} would share the output folder "
+                f"{_input_name(path)}; rename or move one of them"
+            )
+
+    max_workers = settings.get("batch_max_workers") or os.cpu_count()
+    max_memory = settings.get("batch_max_memory_mb", 4096)
+    job_memory = settings.get("batch_job_memory_mb", 1024)
+
+    summary = [
+        {
+            "input": path,
+            "output_dir": os.path.join(output_dir, _input_name(path)),
+            "status": "pending",
+        }
+        for path in inputs
+    ]
+
+    logger.info(
+        f"Batch run of {len(inputs)} inputs, at most {max_workers} at once "
+        f"within {max_memory} MB"
+    )
+    started = time.perf_counter()
+
+    queue = list(range(len(inputs)))
+    running = {}
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(settings,)
+    ) as pool:
+        while queue or running:
+            # Admit inputs while the worker and memory caps allow; one input
+            # always runs even if its estimate alone exceeds the cap
+            while queue and len(running) < max_workers and (
+                not running or (len(running) + 1) * job_memory <= max_memory
+            ):
+                job = queue.pop(0)
+                job_settings = dict(settings, output_dir=summary[job]["output_dir"])
+                summary[job]["status"] = "running"
+                running[pool.submit(_run_input, inputs[job], job_settings, resume)] = job
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job = running.pop(future)
+                try:
+                    summary[job].update(future.result(), status="complete")
+                    logger.info(f"Finished {inputs[job]}")
+                except Exception as e:
+                    summary[job].update(status="failed", error=str(e))
+                    logger.exception(f"ERROR: Batch input failed: {inputs[job]}")
+
+    _write_summary(output_dir, summary, time.perf_counter() - started)
+    return summary
+
+
+def _write_summary(output_dir, summary, seconds):
+    """
+    Logs the combined run summary and writes it as JSON to the output
+    directory.
+    """
+    complete = [job for job in summary if job["status"] == "complete"]
+    failed = [job for job in summary if job["status"] == "failed"]
+
+    report = {
+        "inputs": len(summary),
+        "complete": len(complete),
+        "failed": len(failed),
+        "records": sum(job.get("records") or 0 for job in complete),
+        "chunks": sum(job.get("chunks") or 0 for job in complete),
+        "seconds": round(seconds, 3),
+        "jobs": summary,
+    }
+
+    summary_path = os.path.join(output_dir, SUMMARY_FILE)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(
+        f"Batch complete: {report['complete']} of {report['inputs']} inputs, "
+        f"{report['records']} records in {report['chunks']} chunks, "
+        f"{report['seconds']}s. Summary: {summary_path}"
+    )
+    for job in failed:
+        logger.error(f"Failed input {job['input']}: {job['error']}")
+
+    return summary_path
@@ -0,0 +1,103 @@
+"""
+Overlapped split -> transform -> Excel pipeline.
+
+The splitter runs in the main process and hands every closed chunk to a
+process pool, which applies the XSLT and writes the Excel file while the
+rest of the input is still being split. A chunk that fails is quarantined
+and the run carries on.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from splitting.splitter import XMLSplitter
+from splitting.size_model import record_outputs
+from excel.audit_summary import summarize
+from transform.xslt_transformer import XSLTTransformer
+from utils.xml_utils import get_settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-process transformer, built once by _init_worker
+_transformer = None
+
+
+def _init_worker(settings):
+    global _transformer
+    _transformer = XSLTTransformer(settings)
+
+
+def _process_chunk(chunk_path):
+    return _transformer.transform_chunk(chunk_path, convert=True)
+
+
+def run_overlapped(settings=None, input_path=None, journal=None):
+    """
+    Runs the pipeline with the transform and Excel stages in a worker pool.
+
+    At most pipeline_queue_depth chunks are in flight; the splitter waits
+    for a worker to finish before closing more chunks. Returns the Excel
+    paths in chunk order, the same as the serial path.
+
+    Only this process writes the checkpoint journal: workers return their
+    output paths and the results are recorded here.
+    """
+    settings = settings or get_settings()
+    workers = settings.get("pipeline_workers") or None
+    queue_depth = max(1, settings.get("pipeline_queue_depth", 8))
+
+    splitter = XMLSplitter(settings, journal)
+    # Journals and quarantines what the workers return
+    transformer = XSLTTransformer(settings, journal)
+    # Chunks are converted as they are split, so only an XSD column
+    # schema can be fixed up front
+    transformer.prepare_columns(input_path)
+    settings = transformer.settings
+    chunks = []
+    results = {}
+    pending = {}
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(settings,)
+    ) as pool:
+        try:
+            for index, chunk_path in enumerate(splitter.iter_chunks(input_path)):
+                chunks.append(chunk_path)
+
+                finished = transformer.finished(chunk_path, convert=True)
+                if finished:
+                    results[index] = finished
+                    continue
+
+                if len(pending) >= queue_depth:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        done_index = pending.pop(future)
+                        results[done_index] = transformer.finish(chunks[done_index], future.result())
+
+                pending[pool.submit(_process_chunk, chunk_path)] = index
+
+            for future, done_index in pending.items():
+                results[done_index] = transformer.finish(chunks[done_index], future.result())
+
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    converted = [i for i in sorted(results) if results[i] is not None]
+    excel_files = [results[i] for i in converted]
+    logger.info(
+        f"Overlapped pipeline converted {len(excel_files)} chunks, "
+        f"{len(transformer.quarantined)} quarantined"
+    )
+
+    if transformer.profile is not None:
+        transformer.write_profile()
+
+    if settings.get("excel_output") == "audit":
+        excel_files = list(summarize(settings, excel_files))
+    else:
+        record_outputs(settings, [chunks[i] for i in converted], excel_files)
+    splitter.commit_fingerprints(transformer.incomplete)
+    return excel_files
@@ -0,0 +1,101 @@
+"""
+Incremental chunk writer built on lxml's etree.xmlfile.
+
+Each chunk gets the XML declaration and a root envelope carrying the
+Workday namespace declarations, written once when the chunk is opened.
+Records are serialized straight into the file, and the byte count comes
+from the stream instead of from a bytes copy of every record. A writer
+that has to know a record's size before it commits to a chunk serializes
+it first and hands over the bytes (see write_serialized).
+"""
+
+from lxml import etree
+from utils.file_utils import output_stream
+
+
+class _CountingWriter:
+    """
+    File wrapper that counts the bytes lxml writes through it.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.file.write(data)
+
+
+def _closing_tag(root_tag, nsmap):
+    """
+    The end tag lxml writes for the root envelope when the chunk closes.
+    """
+    qname = etree.QName(root_tag)
+    prefix = ""
+    if qname.namespace:
+        # lxml makes up ns0 for a namespace nsmap does not declare
+        prefix = next(
+            (p for p, uri in (nsmap or {}).items() if uri == qname.namespace), "ns0"
+        )
+    return f"</{prefix + ':' if prefix else ''}{qname.localname}>".encode("utf-8")
+
+
+class ChunkWriter:
+    def __init__(self, path, root_tag, nsmap=None):
+        self.path = path
+        self.records = 0
+        self._closed = False
+
+        # Compressed when the path ends in .gz or .zst. path may also be an
+        # open binary file, which is left open on close.
+        self._stream = output_stream(path)
+        self._file = self._stream.__enter__()
+        self._counter = _CountingWriter(self._file)
+
+        # Unbuffered on the lxml side, so every record reaches the counter
+        # as soon as it is written. The file object does the buffering.
+        self._xmlfile = etree.xmlfile(self._counter, encoding="UTF-8", buffered=False)
+        self._xf = self._xmlfile.__enter__()
+        self._xf.write_declaration()
+        self._root = self._xf.element(root_tag, nsmap=nsmap)
+        self._root.__enter__()
+        # Bytes the envelope still takes when the chunk is closed
+        self.closing_bytes = len(_closing_tag(root_tag, nsmap))
+
+    @property
+    def bytes_written(self):
+        return self._counter.count
+
+    def write(self, elem):
+        """
+        Writes one record and returns the number of bytes it took.
+        """
+        before = self._counter.count
+        self._xf.write(elem)
+        self.records += 1
+        return self._counter.count - before
+
+    def write_serialized(self, data):
+        """
+        Writes one record already serialized with etree.tostring() and
+        returns the number of bytes it took.
+        """
+        # lxml is unbuffered, so this lands after everything it wrote
+        self._counter.write(data)
+        self.records += 1
+        return len(data)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._root.__exit__(None, None, None)
+        self._xmlfile.__exit__(None, None, None)
+        self._stream.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
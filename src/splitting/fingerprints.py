@@ -0,0 +1,168 @@
+"""
+Record fingerprints for delta splitting between nightly extracts.
+
+A SQLite store maps each record key to a hash of the record's canonical
+XML as of the last successful run. In split_mode "delta" the splitter only
+writes records that are new or changed since then, plus a list of keys
+that disappeared. The run's fingerprints are staged and only replace the
+stored ones when the pipeline commits them after a successful run.
+"""
+
+import hashlib
+import os
+import sqlite3
+from lxml import etree
+from utils.logger import get_logger
+from utils.file_utils import ensure_dir
+from .partitioner import compile_key
+
+logger = get_logger(__name__)
+
+REMOVED_KEYS_FILE = "removed_keys.txt"
+
+# Staged rows are committed to disk every this many records
+BATCH_SIZE = 10000
+
+
+class FingerprintStore:
+    def __init__(self, path, scope):
+        ensure_dir(os.path.dirname(path) or ".")
+        self.path = path
+        self.scope = scope
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                scope TEXT, key TEXT, digest BLOB, PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS pending (
+                scope TEXT, key TEXT, digest BLOB, PRIMARY KEY (scope, key)
+            );
+        """)
+
+    def begin(self):
+        """
+        Starts staging a new run for this scope.
+        """
+        with self._db:
+            self._db.execute("DELETE FROM pending WHERE scope = ?", (self.scope,))
+
+    def previous(self, key):
+        """
+        Returns the digest of key from the last committed run, or None.
+        """
+        row = self._db.execute(
+            "SELECT digest FROM fingerprints WHERE scope = ? AND key = ?",
+            (self.scope, key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stage(self, key, digest):
+        """
+        Stages one key of the current run. Returns False if the key is
+        already staged. Staged rows are committed to disk in batches by
+        flush().
+        """
+        return self._db.execute(
+            "INSERT OR IGNORE INTO pending VALUES (?, ?, ?)",
+            (self.scope, key, digest)
+        ).rowcount == 1
+
+    def flush(self):
+        self._db.commit()
+
+    def removed_keys(self):
+        """
+        Keys of the last committed run that the current run did not see.
+        """
+        return [row[0] for row in self._db.execute(
+            """SELECT key FROM fingerprints f WHERE scope = ? AND NOT EXISTS (
+                   SELECT 1 FROM pending p WHERE p.scope = f.scope AND p.key = f.key
+               ) ORDER BY key""",
+            (self.scope,)
+        )]
+
+    def commit(self):
+        """
+        Makes the staged run the new baseline.
+        """
+        with self._db:
+            self._db.execute("DELETE FROM fingerprints WHERE scope = ?", (self.scope,))
+            self._db.execute(
+                "INSERT INTO fingerprints SELECT * FROM pending WHERE scope = ?",
+                (self.scope,)
+            )
+            self._db.execute("DELETE FROM pending WHERE scope = ?", (self.scope,))
+        logger.info(f"Committed record fingerprints for {self.scope}")
+
+    def close(self):
+        self._db.close()
+
+
+class DeltaFilter:
+    """
+    Decides per record whether it is new or changed since the last run.
+    """
+
+    def __init__(self, store, key_expression):
+        self.store = store
+        self.key_expression = key_expression
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0}
+        self._key = None
+        self._staged = 0
+        self.store.begin()
+
+    def keep(self, elem):
+        """
+        Returns True if the record is new or changed since the last run.
+        """
+        if self._key is None:
+            self._key = compile_key(self.key_expression, elem)
+
+        key = self._key(elem)
+        if key is None:
+            raise ValueError(
+                f"Record has no {self.key_expression}; delta mode needs a key "
+                "for every record"
+            )
+
+        digest = hashlib.blake2b(
+            etree.tostring(elem, method="c14n"), digest_size=16
+        ).digest()
+
+        # Numbering repeats would tie each key to record order
+        if not self.store.stage(key, digest):
+            raise ValueError(
+                f"{self.key_expression} value {key} occurs on more than one "
+                "record; delta_key must be unique per record"
+            )
+
+        previous = self.store.previous(key)
+
+        self._staged += 1
+        if self._staged % BATCH_SIZE == 0:
+            self.store.flush()
+
+        if previous is None:
+            status = "new"
+        elif previous != digest:
+            status = "changed"
+        else:
+            status = "unchanged"
+
+        self.counts[status] += 1
+        return status != "unchanged"
+
+    def finish(self, output_dir):
+        """
+        Writes the removed keys next to the chunks and logs the delta.
+        """
+        self.store.flush()
+        removed = self.store.removed_keys()
+        removed_path = os.path.join(output_dir, REMOVED_KEYS_FILE)
+
+        with open(removed_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in removed)
+
+        self.counts["removed"] = len(removed)
+        logger.info(f"Delta against last run: {self.counts}")
+        return removed_path
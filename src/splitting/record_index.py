@@ -0,0 +1,184 @@
+"""
+Byte offset index of the split element in a large XML file.
+
+A single mmap pass finds the start and end tag of every record. The
+offsets are saved in a sidecar file next to the input, so re-runs, re-splits
+at a different max_file_size_mb and random access to record N skip the scan.
+"""
+
+import json
+import mmap
+import os
+import re
+from array import array
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_SUFFIX = ".recidx"
+INDEX_VERSION = 1
+
+# A tag name may carry a namespace prefix, e.g. <wd:Historical_Academic_Record>
+_PREFIX = re.compile(rb"[A-Za-z_][\w.-]*:")
+
+
+class RecordIndex:
+    def __init__(self, input_path, split_element, starts, ends, contiguous):
+        self.input_path = input_path
+        self.split_element = split_element
+        self.starts = starts
+        self.ends = ends
+        self.contiguous = contiguous
+
+    def __len__(self):
+        return len(self.starts)
+
+    def span(self, n):
+        """
+        Returns the (start, end) byte range of record n, end exclusive.
+        """
+        return self.starts[n], self.ends[n]
+
+    def read_record(self, n):
+        """
+        Reads the raw bytes of record n without parsing the file.
+        """
+        start, end = self.span(n)
+        with open(self.input_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def header(self):
+        """
+        Bytes before the first record: declaration and open ancestor tags.
+        """
+        with open(self.input_path, "rb") as f:
+            return f.read(self.starts[0]) if len(self) else f.read()
+
+    def trailer(self):
+        """
+        Bytes after the last record: the closing ancestor tags.
+        """
+        with open(self.input_path, "rb") as f:
+            if len(self):
+                f.seek(self.ends[-1])
+            return f.read()
+
+    @staticmethod
+    def sidecar_path(input_path):
+        return f"{input_path}{INDEX_SUFFIX}"
+
+    @classmethod
+    def load_or_build(cls, input_path, split_element):
+        """
+        Loads the sidecar index if it still matches the input, otherwise
+        scans the input and saves a new one.
+        """
+        index = cls.load(input_path, split_element)
+        if index is None:
+            index = cls.build(input_path, split_element)
+            index.save()
+        return index
+
+    @classmethod
+    def load(cls, input_path, split_element):
+        path = cls.sidecar_path(input_path)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+
+            if header != cls._identity(input_path, split_element, header["count"], header["contiguous"]):
+                logger.info(f"Record index is stale, rebuilding: {path}")
+                return None
+
+            starts = array("q")
+            ends = array("q")
+            starts.fromfile(f, header["count"])
+            ends.fromfile(f, header["count"])
+
+        logger.info(f"Loaded record index of {len(starts)} records: {path}")
+        return cls(input_path, split_element, starts, ends, header["contiguous"])
+
+    @classmethod
+    def build(cls, input_path, split_element):
+        """
+        Scans the input once for record boundaries.
+
+        The search runs on the literal element name, which the regex engine
+        finds quickly, and only then checks the bytes before it for "<" or
+        "</" and an optional namespace prefix. Records of the split element
+        are not expected to nest.
+        """
+        logger.info(f"Building record index: {input_path}")
+
+        # Namespace-qualified settings ("{uri}name") are matched by local name
+        name = split_element.rsplit("}", 1)[-1].encode("utf-8")
+        pattern = re.compile(re.escape(name) + rb"(?=[\s/>])")
+        starts = array("q")
+        ends = array("q")
+        contiguous = True
+
+        with open(input_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            depth = 0
+
+            for match in pattern.finditer(mm):
+                lt = mm.rfind(b"<", max(0, match.start() - 256), match.start())
+                if lt < 0:
+                    continue
+
+                closing = mm[lt + 1:lt + 2] == b"/"
+                prefix = mm[lt + 1 + closing:match.start()]
+                if prefix and not _PREFIX.fullmatch(prefix):
+                    continue
+
+                if closing:
+                    if depth:
+                        depth -= 1
+                        if depth == 0:
+                            ends.append(mm.find(b">", match.end()) + 1)
+                    continue
+
+                tag_end = mm.find(b">", match.end())
+                if depth == 0:
+                    if ends and mm[ends[-1]:lt].strip():
+                        contiguous = False
+                    starts.append(lt)
+
+                if mm[tag_end - 1:tag_end] == b"/":
+                    # Self-closing record
+                    if depth == 0:
+                        ends.append(tag_end + 1)
+                else:
+                    depth += 1
+
+        logger.info(f"Indexed {len(starts)} records in {input_path}")
+        return cls(input_path, split_element, starts, ends, contiguous)
+
+    def save(self):
+        path = self.sidecar_path(self.input_path)
+        header = self._identity(self.input_path, self.split_element, len(self), self.contiguous)
+
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            self.starts.tofile(f)
+            self.ends.tofile(f)
+
+        return path
+
+    @staticmethod
+    def _identity(input_path, split_element, count, contiguous):
+        """
+        Header fields that tie a sidecar to one version of one input.
+        """
+        stat = os.stat(input_path)
+        return {
+            "version": INDEX_VERSION,
+            "split_element": split_element,
+            "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "count": count,
+            "contiguous": contiguous,
+        }
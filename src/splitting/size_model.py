@@ -0,0 +1,224 @@
+"""
+Predicts the EIB workbook a chunk will produce from its XML size.
+
+What limits an upload is the row count and file size of the final xlsx
+after XSLT expansion and packaging, not the raw XML bytes of the chunk.
+The model keeps running totals of chunk XML bytes against workbook rows
+and xlsx bytes, saved by earlier runs or calibrated from a sample of the
+input, and turns an EIB target ("max N rows / M MB per workbook") into the
+chunk byte limit the splitter cuts at.
+
+Batch inputs share temp_dir, so the saved model is updated under a lock
+file and replaced atomically.
+"""
+
+import json
+import os
+import tempfile
+from lxml import etree
+from openpyxl import load_workbook
+from utils.logger import get_logger
+from utils.file_utils import ensure_dir, open_input, compression_of, file_lock
+
+logger = get_logger(__name__)
+
+MODEL_FILE = "size_model.json"
+
+
+def xml_size(path):
+    """
+    Uncompressed size of an XML file in bytes.
+    """
+    if not compression_of(path):
+        return os.path.getsize(path)
+
+    size = 0
+    with open_input(path) as f:
+        while data := f.read(1 << 20):
+            size += len(data)
+    return size
+
+
+def header_rows(settings):
+    """
+    Rows above the data on the main sheet: the column headers, plus the
+    title rows of the EIB template if there is one.
+    """
+    template_path = settings.get("eib_template_path")
+    if not template_path:
+        return 1
+
+    # Imported here: only template runs need it
+    from excel.eib_writer import EIBTemplate
+    return len(EIBTemplate.load(template_path).sheets[0]["title_rows"]) + 1
+
+
+def workbook_rows(path, headers=1):
+    """
+    Data rows on the first (main) sheet of a workbook, below its header
+    rows. Child sheets are left out: the EIB row limit applies per sheet,
+    and the main sheet is the one that grows with the records.
+    """
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # Write-only workbooks store no dimensions, so count the rows
+        count = ws.max_row if ws.max_row is not None else sum(1 for _ in ws.rows)
+        return max(count - headers, 0)
+    finally:
+        wb.close()
+
+
+class SizeModel:
+    def __init__(self, xml_bytes=0, rows=0, xlsx_bytes=0, chunks=0):
+        self.xml_bytes = xml_bytes
+        self.rows = rows
+        self.xlsx_bytes = xlsx_bytes
+        self.chunks = chunks
+
+    @property
+    def calibrated(self):
+        return self.xml_bytes > 0 and self.chunks > 0
+
+    def predict(self, xml_bytes):
+        """
+        Returns the predicted (rows, xlsx_bytes) for xml_bytes of records.
+        """
+        if not self.calibrated:
+            return None, None
+        return (
+            xml_bytes * self.rows / self.xml_bytes,
+            xml_bytes * self.xlsx_bytes / self.xml_bytes,
+        )
+
+    def observe(self, chunk_path, excel_path, headers=1):
+        """
+        Adds one converted chunk to the running totals. headers is the
+        number of rows above the data (see header_rows).
+        """
+        self.xml_bytes += xml_size(chunk_path)
+        self.rows += workbook_rows(excel_path, headers)
+        self.xlsx_bytes += os.path.getsize(excel_path)
+        self.chunks += 1
+
+    def merge(self, other):
+        self.xml_bytes += other.xml_bytes
+        self.rows += other.rows
+        self.xlsx_bytes += other.xlsx_bytes
+        self.chunks += other.chunks
+
+    def max_chunk_bytes(self, max_bytes, max_rows=None, max_xlsx_bytes=None):
+        """
+        Largest chunk, in XML bytes, whose predicted workbook stays within
+        max_rows and max_xlsx_bytes. max_bytes stays a hard cap.
+        """
+        if not self.calibrated or not (max_rows or max_xlsx_bytes):
+            return max_bytes
+
+        limit = max_bytes
+        if max_rows and self.rows:
+            limit = min(limit, max_rows * self.xml_bytes / self.rows)
+        if max_xlsx_bytes and self.xlsx_bytes:
+            limit = min(limit, max_xlsx_bytes * self.xml_bytes / self.xlsx_bytes)
+        return int(limit)
+
+    @staticmethod
+    def model_path(settings):
+        return os.path.join(settings["temp_dir"], MODEL_FILE)
+
+    @classmethod
+    def load(cls, settings):
+        path = cls.model_path(settings)
+        if not os.path.exists(path):
+            return cls()
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, settings):
+        path = self.model_path(settings)
+        ensure_dir(os.path.dirname(path))
+
+        # Readers see the old model or the new one, never half of it
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(vars(self), f, indent=2)
+        os.replace(tmp_path, path)
+
+        return path
+
+    @classmethod
+    def calibrate(cls, settings, input_path, match_tag):
+        """
+        Runs the first size_model_sample_records records of the input through
+        the transform and Excel stages and measures the result.
+        """
+        # Imported here: the stages are only needed to calibrate
+        from transform.xslt_transformer import XSLTTransformer
+        from excel.xml_to_excel import XMLToExcel
+        from .chunk_writer import ChunkWriter
+
+        sample_size = settings.get("size_model_sample_records", 500)
+        ensure_dir(settings["temp_dir"])
+        # A name of its own, as batch inputs calibrate at the same time
+        fd, sample_path = tempfile.mkstemp(
+            prefix="size_model_sample_", suffix=".xml", dir=settings["temp_dir"]
+        )
+        os.close(fd)
+        writer = None
+
+        with open_input(input_path) as source:
+            for _, elem in etree.iterparse(source, events=("end",), tag=match_tag):
+                if writer is None:
+                    parent = elem.getparent()
+                    root_tag = parent.tag if parent is not None else elem.tag
+                    writer = ChunkWriter(sample_path, root_tag, elem.nsmap)
+                writer.write(elem)
+                if writer.records >= sample_size:
+                    break
+
+        model = cls()
+        if writer is None:
+            os.remove(sample_path)
+            return model
+        writer.close()
+
+        transformed_path = XSLTTransformer(settings).apply_xslt(sample_path)
+        excel_path = XMLToExcel(settings=settings).convert(transformed_path)
+        model.observe(sample_path, excel_path, header_rows(settings))
+
+        for path in (sample_path, transformed_path, excel_path):
+            os.remove(path)
+
+        logger.info(
+            f"Calibrated size model on {writer.records} records: "
+            f"{model.rows} rows, {model.xlsx_bytes} xlsx bytes "
+            f"from {model.xml_bytes} XML bytes"
+        )
+        return model
+
+
+def has_eib_targets(settings):
+    return bool(settings.get("eib_max_rows") or settings.get("eib_max_workbook_mb"))
+
+
+def record_outputs(settings, chunk_files, excel_files):
+    """
+    Adds the chunks and workbooks of a finished run to the saved model, so
+    the next run predicts from real output. Only runs with an EIB target
+    set keep stats.
+    """
+    if not has_eib_targets(settings):
+        return None
+
+    run = SizeModel()
+    headers = header_rows(settings)
+    for chunk_path, excel_path in zip(chunk_files, excel_files):
+        run.observe(chunk_path, excel_path, headers)
+
+    # Other batch inputs may be recording their runs too
+    with file_lock(SizeModel.model_path(settings) + ".lock"):
+        model = SizeModel.load(settings)
+        model.merge(run)
+        model.save(settings)
+    return model
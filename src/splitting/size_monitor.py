@@ -8,10 +8,14 @@ class SizeMonitor:
         self.current = 0
 
     def add(self, data):
-        self.current += len(data)
+        self.current += self._size(data)
 
     def would_exceed(self, data):
-        return self.current + len(data) > self.max_bytes
+        return self.current + self._size(data) > self.max_bytes
 
-    def reset(self):
-        self.current = 0
+    def reset(self, start=0):
+        self.current = start
+
+    @staticmethod
+    def _size(data):
+        return data if isinstance(data, int) else len(data)
@@ -2,60 +2,567 @@
 Splits large XML files into smaller chunks based on:
 - Repeating XML element (e.g., <Worker>)
 - Maximum file size
+
+Processed records are pruned from the parse tree as the split goes, so
+memory stays flat regardless of the input size.
+
+split_mode "indexed" uses a record offset index (see record_index.py) to
+cut the input into byte ranges that are split in parallel. split_mode
+"partition" hashes records by a key into a fixed number of balanced
+partitions (see partitioner.py). split_mode "delta" only writes records
+that changed since the last successful run (see fingerprints.py).
 """
 
+import io
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from lxml import etree
 from utils.logger import get_logger
-from utils.file_utils import ensure_dir
-from utils.xml_utils import get_settings
+from utils.file_utils import (
+    ensure_dir, open_input, compression_of, strip_compression_suffix, with_compression
+)
+from utils.xml_utils import get_settings, prune_element
+from utils.perf_utils import peak_rss_bytes
+from utils.checkpoint import run_identity, chunk_id
 from .size_monitor import SizeMonitor
+from .chunk_writer import ChunkWriter
+from .record_index import RecordIndex
+from .size_model import SizeModel, has_eib_targets
+from .partitioner import HashPartitioner, compile_key
+from .fingerprints import FingerprintStore, DeltaFilter
+from transform.xml_cleaner import XMLCleaner
 
 logger = get_logger(__name__)
 
+# Bytes kept free in each chunk for the declaration and root envelope
+ENVELOPE_ALLOWANCE = 1024
+
+
+class _RangeReader:
+    """
+    File-like reader over header bytes, one byte range of the input and
+    trailer bytes, so a slice of records parses as a complete document.
+    """
+
+    def __init__(self, input_path, start, end, header, trailer):
+        self._file = open(input_path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+        self._header = io.BytesIO(header)
+        self._trailer = io.BytesIO(trailer)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 20
+
+        data = self._header.read(size)
+        if data:
+            return data
+
+        if self._remaining:
+            data = self._file.read(min(size, self._remaining))
+            self._remaining -= len(data)
+            return data
+
+        return self._trailer.read(size)
+
+    def close(self):
+        self._file.close()
+
+
+def find_xml_inputs(input_dir):
+    """
+    Returns every XML file in input_dir, sorted by name. Compressed inputs
+    (.xml.gz, .xml.zst and .zip) are included.
+    """
+    return [
+        os.path.join(input_dir, f)
+        for f in sorted(os.listdir(input_dir))
+        if compression_of(f) == "zip"
+        or strip_compression_suffix(f).lower().endswith(".xml")
+    ]
+
+
+def _match_tag(split_element):
+    """
+    Matches the split element in any namespace unless the setting already
+    names one, since Workday output uses the wd: prefix.
+    """
+    if split_element.startswith("{"):
+        return split_element
+    return "{*}" + split_element
+
+
+def _open_chunk(chunk_path, elem, cleaner=None):
+    """
+    Opens a chunk wrapped in the same parent element and namespace
+    declarations the records have in the input, cleaned the same way as
+    the records.
+    """
+    parent = elem.getparent()
+    root_tag = parent.tag if parent is not None else elem.tag
+    nsmap = elem.nsmap
+    if cleaner is not None:
+        root_tag, nsmap = cleaner.envelope(root_tag, nsmap)
+    return ChunkWriter(chunk_path, root_tag, nsmap)
+
+
+def _split_range(input_path, start, end, header, trailer, chunk_path, tag, cleaner=None):
+    """
+    Worker for the indexed mode: writes the records in one byte range of the
+    input to one chunk.
+    """
+    reader = _RangeReader(input_path, start, end, header, trailer)
+    writer = None
+
+    try:
+        for _, elem in etree.iterparse(reader, events=("end",), tag=tag):
+            if writer is None:
+                writer = _open_chunk(chunk_path, elem, cleaner)
+            writer.write(cleaner.clean(elem) if cleaner else elem)
+            prune_element(elem)
+
+    finally:
+        reader.close()
+        if writer is not None:
+            writer.close()
+
+    return chunk_path
+
+
 class XMLSplitter:
-    def __init__(self):
-        self.settings = get_settings()
+    def __init__(self, settings=None, journal=None):
+        self.settings = settings or get_settings()
         self.split_element = self.settings["split_element"]
         self.max_size = self.settings["max_file_size_mb"] * 1024 * 1024
+        self.journal = journal
+        self.delta = None
+        self.stats = {}
+        # Empty element removal and namespace cleanup, in the split pass
+        self.cleaner = XMLCleaner.from_settings(self.settings)
+        # The input being split, once iter_chunks has started
+        self.input_path = None
+
+    def split(self, input_path=None, output_dir=None):
+        return list(self.iter_chunks(input_path, output_dir))
+
+    def iter_chunks(self, input_path=None, output_dir=None):
+        """
+        Yields each chunk path as soon as the chunk file is closed, so later
+        stages can start on it while the rest of the input is still split.
 
-    def split(self):
-        input_dir = self.settings["input_dir"]
-        output_dir = self.settings["output_dir"]
+        Without an input_path, the first XML file in input_dir is split.
+        """
+        output_dir = output_dir or self.settings["output_dir"]
         ensure_dir(output_dir)
 
-        input_file = next(iter(os.listdir(input_dir)), None)
-        if not input_file:
-            raise FileNotFoundError("No XML file found in input directory")
+        if input_path is None:
+            input_files = find_xml_inputs(self.settings["input_dir"])
+            if not input_files:
+                raise FileNotFoundError("No XML file found in input directory")
+            input_path = input_files[0]
 
-        input_path = os.path.join(input_dir, input_file)
+        self.input_path = input_path
         logger.info(f"Splitting XML: {input_path}")
+        self.max_size = self._target_size(input_path)
+
+        if self.journal is not None:
+            identity = run_identity(self.settings, input_path)
+            identity["chunk_bytes"] = self.max_size
+            if self.journal.start(identity):
+                logger.info(f"Resuming from checkpoint journal {self.journal.path}")
+
+        split_mode = self.settings.get("split_mode", "stream")
+
+        if split_mode == "indexed":
+            yield from self._iter_indexed(input_path, output_dir)
+        elif split_mode == "partition":
+            yield from self._iter_partitioned(input_path, output_dir)
+        elif split_mode == "delta":
+            self.delta = self._open_delta(input_path)
+            yield from self._iter_stream(input_path, output_dir)
+            self.delta.finish(output_dir)
+        else:
+            yield from self._iter_stream(input_path, output_dir)
+
+    def commit_fingerprints(self, incomplete=()):
+        """
+        After a successful delta run, makes this run's records the baseline
+        for the next one. If any chunk is incomplete (quarantined, or with
+        records that failed validation), the old baseline is kept, so the
+        next run emits this run's new and changed records again.
+        """
+        if self.delta is None:
+            return
+        if incomplete:
+            logger.warning(
+                f"{len(incomplete)} chunks did not fully reach the output, so "
+                "the delta baseline is not moved; the next run repeats this delta"
+            )
+            return
+        self.delta.store.commit()
+
+    def _open_delta(self, input_path):
+        """
+        Opens the fingerprint store for delta mode. Each input name is its
+        own scope unless delta_scope is set (e.g. for dated file names).
+        """
+        name = os.path.basename(strip_compression_suffix(input_path))
+        scope = self.settings.get("delta_scope") or os.path.splitext(name)[0]
+        db_path = self.settings.get("fingerprint_db") or os.path.join(
+            self.settings["temp_dir"], "fingerprints.sqlite"
+        )
+        key_expression = self.settings.get("delta_key")
+        if not key_expression:
+            # partition_key groups records (e.g. by student), so it cannot
+            # stand in for a record's own ID
+            raise ValueError(
+                "split_mode delta needs delta_key, an XPath to a value that "
+                "is unique per record"
+            )
+        return DeltaFilter(FingerprintStore(db_path, scope), key_expression)
 
-        context = etree.iterparse(input_path, events=("end",), tag=self.split_element)
-        chunk_files = []
+    def _iter_stream(self, input_path, output_dir):
+        """
+        Single iterparse pass over the whole input. In delta mode only new
+        and changed records are written.
+        """
+        committed = self._committed_chunks()
+        skip = committed[-1]["input_records"] if committed else 0
+        for entry in committed:
+            yield entry["path"]
+
+        source = open_input(input_path)
+        context = etree.iterparse(source, events=("end",), tag=_match_tag(self.split_element))
+        chunk_count = len(committed)
+        record_count = 0
+        started = time.perf_counter()
         monitor = SizeMonitor(self.max_size)
+        writer = None
+
+        try:
+            for _, elem in context:
+                # Every record is fingerprinted, even one a resumed run skips
+                keep = self.delta is None or self.delta.keep(elem)
+
+                if record_count < skip or not keep:
+                    # Already in a committed chunk, or unchanged
+                    record_count += 1
+                    prune_element(elem)
+                    continue
+
+                # Serialized up front, so a record that does not fit starts
+                # the next chunk instead of overrunning this one
+                record = etree.tostring(self._clean(elem))
+
+                if writer is not None and monitor.would_exceed(record):
+                    writer.close()
+                    chunk_count += 1
+                    self._commit(writer, record_count)
+                    yield writer.path
+                    writer = None
+
+                if writer is None:
+                    writer = _open_chunk(
+                        self._chunk_path(output_dir, chunk_count + 1), elem, self.cleaner
+                    )
+                    # The declaration and root start tag are written; the
+                    # root end tag is kept free
+                    monitor.reset(writer.bytes_written + writer.closing_bytes)
+
+                monitor.add(writer.write_serialized(record))
+                record_count += 1
+
+                prune_element(elem)
+
+        finally:
+            source.close()
+            if writer is not None:
+                writer.close()
+
+        if writer is not None:
+            chunk_count += 1
+            self._commit(writer, record_count)
+        elif not committed:
+            logger.warning(f"No {self.split_element} records written from {input_path}")
+
+        logger.info(f"Created {chunk_count} chunk files")
+        self._report(input_path, record_count, chunk_count, started)
+
+        if writer is not None:
+            yield writer.path
+
+    def _iter_partitioned(self, input_path, output_dir):
+        """
+        Hashes every record by partition_key into one of a fixed number of
+        partitions. The partitions are only complete at the end of the
+        input, so they are yielded together.
+        """
+        done = self.journal and self.journal.completed("split", "partitions")
+        if done:
+            parts = [self.journal.completed("split", part) for part in done["parts"]]
+            if all(parts):
+                logger.info("Partitions already complete in the checkpoint journal")
+                for entry in parts:
+                    yield entry["path"]
+                return
+
+        partitioner = HashPartitioner(self.settings.get("partitions", 8))
+        key_expression = self.settings["partition_key"]
+        key = None
+        writers = {}
+        record_count = 0
+        started = time.perf_counter()
+
+        source = open_input(input_path)
+        context = etree.iterparse(source, events=("end",), tag=_match_tag(self.split_element))
+
+        try:
+            for _, elem in context:
+                if key is None:
+                    key = compile_key(key_expression, elem)
+
+                partition = partitioner.assign(key(elem))
+                writer = writers.get(partition)
+                if writer is None:
+                    chunk_path = self._chunk_path(output_dir, partition + 1, "part")
+                    writer = writers[partition] = _open_chunk(chunk_path, elem, self.cleaner)
+
+                partitioner.add(partition, writer.write(self._clean(elem)))
+                record_count += 1
+
+                prune_element(elem)
+
+        finally:
+            source.close()
+            for writer in writers.values():
+                writer.close()
+
+        if partitioner.missing_keys:
+            logger.warning(
+                f"{partitioner.missing_keys} records had no {key_expression} "
+                "and were placed by size only"
+            )
+
+        logger.info(
+            f"Created {len(writers)} partitions, bytes per partition: "
+            f"{partitioner.loads}"
+        )
+        self._report(input_path, record_count, len(writers), started)
+
+        if self.journal is not None:
+            for partition in sorted(writers):
+                self._commit(writers[partition])
+            self.journal.record(
+                "split", "partitions",
+                parts=[chunk_id(writers[p].path) for p in sorted(writers)]
+            )
+
+        for partition in sorted(writers):
+            yield writers[partition].path
+
+    def _iter_indexed(self, input_path, output_dir):
+        """
+        Cuts the input into byte ranges from the record index and splits the
+        ranges in parallel. Chunks are yielded in order.
+        """
+        if compression_of(input_path):
+            logger.warning(
+                f"Compressed input {input_path} cannot be indexed; "
+                "using the streaming split"
+            )
+            yield from self._iter_stream(input_path, output_dir)
+            return
+
+        started = time.perf_counter()
+        index = RecordIndex.load_or_build(input_path, self.split_element)
+
+        if not index.contiguous:
+            logger.warning(
+                f"Records in {input_path} are not contiguous siblings; "
+                "using the streaming split"
+            )
+            yield from self._iter_stream(input_path, output_dir)
+            return
+
+        header = index.header()
+        trailer = index.trailer()
+        tag = _match_tag(self.split_element)
+        ranges = self._plan_ranges(index, header, trailer, tag)
+        workers = self.settings.get("split_workers") or None
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for chunk_index, (first, last) in enumerate(ranges, 1):
+                chunk_path = self._chunk_path(output_dir, chunk_index)
+                if self.journal and self.journal.completed("split", chunk_id(chunk_path)):
+                    futures.append(None)
+                    continue
+
+                futures.append(pool.submit(
+                    _split_range,
+                    input_path,
+                    index.starts[first],
+                    index.ends[last],
+                    header,
+                    trailer,
+                    chunk_path,
+                    tag,
+                    self.cleaner
+                ))
+
+            for chunk_index, future in enumerate(futures, 1):
+                if future is None:
+                    yield self._chunk_path(output_dir, chunk_index)
+                    continue
+
+                chunk_path = future.result()
+                if self.journal is not None:
+                    first, last = ranges[chunk_index - 1]
+                    self.journal.record(
+                        "split", chunk_id(chunk_path), chunk_path,
+                        records=last - first + 1,
+                        input_records=last + 1
+                    )
+                yield chunk_path
+
+        logger.info(f"Created {len(ranges)} chunk files")
+        self._report(input_path, len(index), len(ranges), started)
+
+    def _clean(self, elem):
+        return self.cleaner.clean(elem) if self.cleaner else elem
+
+    def _committed_chunks(self):
+        """
+        Chunks chunk_1, chunk_2, ... already committed to the journal, up to
+        the first one that is missing or changed on disk.
+        """
+        committed = []
+        if self.journal is None:
+            return committed
+
+        while entry := self.journal.completed("split", f"chunk_{len(committed) + 1}"):
+            committed.append(entry)
+
+        if committed:
+            logger.info(
+                f"Skipping {len(committed)} committed chunks "
+                f"({committed[-1]['input_records']} records)"
+            )
+        return committed
+
+    def _commit(self, writer, input_records=None):
+        """
+        Records a closed chunk in the checkpoint journal, with the number of
+        input records consumed so far. A resumed run parses the input again
+        and skips that many records: lxml reads ahead, compressed inputs
+        cannot seek, and delta mode has to fingerprint every record anyway.
+        """
+        if self.journal is None:
+            return
+
+        self.journal.record(
+            "split", chunk_id(writer.path), writer.path,
+            records=writer.records,
+            input_records=input_records
+        )
+
+    def _target_size(self, input_path):
+        """
+        Chunk byte limit for this input. With an EIB row or workbook size
+        target set, the size model turns it into XML bytes; otherwise this
+        is max_file_size_mb.
+        """
+        max_bytes = self.settings["max_file_size_mb"] * 1024 * 1024
+        max_rows = self.settings.get("eib_max_rows")
+        max_workbook_mb = self.settings.get("eib_max_workbook_mb")
+
+        if not has_eib_targets(self.settings):
+            return max_bytes
+
+        model = SizeModel.load(self.settings)
+        if not model.calibrated:
+            try:
+                model = SizeModel.calibrate(
+                    self.settings, input_path, _match_tag(self.split_element)
+                )
+            except Exception as e:
+                logger.warning(f"Could not calibrate the size model: {e}")
+                return max_bytes
+
+        target = model.max_chunk_bytes(
+            max_bytes,
+            max_rows,
+            max_workbook_mb * 1024 * 1024 if max_workbook_mb else None
+        )
+        logger.info(f"Chunk target from the EIB limits: {target} XML bytes")
+        return target
+
+    def _chunk_path(self, output_dir, chunk_index, prefix="chunk"):
+        """
+        Chunk file name, with a .gz or .zst suffix when temp_compression is
+        set.
+        """
+        return with_compression(
+            os.path.join(output_dir, f"{prefix}_{chunk_index}.xml"),
+            self.settings.get("temp_compression")
+        )
+
+    def _plan_ranges(self, index, header, trailer, tag):
+        """
+        Groups consecutive records into (first, last) ranges that fit
+        max_file_size_mb once written.
+
+        Written records are a little larger than their input span because
+        each one repeats its namespace declarations, so that overhead is
+        measured on the first record and added to every span.
+        """
+        if not len(index):
+            return []
+
+        reader = _RangeReader(index.input_path, *index.span(0), header, trailer)
+        try:
+            _, first = next(etree.iterparse(reader, events=("end",), tag=tag))
+            overhead = max(0, len(etree.tostring(first)) - (index.ends[0] - index.starts[0]))
+        finally:
+            reader.close()
 
-        chunk_index = 1
-        chunk_path = os.path.join(output_dir, f"chunk_{chunk_index}.xml")
-        chunk_files.append(chunk_path)
-        chunk = open(chunk_path, "wb")
+        budget = self.max_size - ENVELOPE_ALLOWANCE
+        ranges = []
+        first = 0
+        size = 0
 
-        for _, elem in context:
-            xml_bytes = etree.tostring(elem)
+        for n in range(len(index)):
+            record_size = index.ends[n] - index.starts[n] + overhead
+            if n > first and size + record_size > budget:
+                ranges.append((first, n - 1))
+                first = n
+                size = 0
+            size += record_size
 
-            if monitor.would_exceed(xml_bytes):
-                chunk.close()
-                chunk_index += 1
-                chunk_path = os.path.join(output_dir, f"chunk_{chunk_index}.xml")
-                chunk_files.append(chunk_path)
-                chunk = open(chunk_path, "wb")
-                monitor.reset()
+        ranges.append((first, len(index) - 1))
+        return ranges
 
-            chunk.write(xml_bytes)
-            monitor.add(xml_bytes)
+    def _report(self, input_path, record_count, chunk_count, started):
+        """
+        Logs the split throughput and the memory high-water mark.
+        """
+        seconds = time.perf_counter() - started
+        peak = peak_rss_bytes()
 
-            elem.clear()
+        self.stats = {
+            "input": input_path,
+            "input_bytes": os.path.getsize(input_path),
+            "records": record_count,
+            "chunks": chunk_count,
+            "seconds": round(seconds, 3),
+            "records_per_second": round(record_count / seconds) if seconds else None,
+            "peak_rss_mb": round(peak / (1024 * 1024), 1) if peak else None,
+        }
 
-        chunk.close()
-        logger.info(f"Created {len(chunk_files)} chunk files")
-        return chunk_files
+        logger.info(
+            f"Split {record_count} records in {seconds:.1f}s "
+            f"({self.stats['records_per_second']} records/s), "
+            f"peak RSS {self.stats['peak_rss_mb']} MB"
+        )
@@ -0,0 +1,95 @@
+"""
+Streaming XSD validation of transformed records.
+
+The schema (e.g. the Put_Historical_Academic_Record XSD) is compiled once
+per process. Every record of a transformed chunk, i.e. every child of its
+root element, is validated on its own as iterparse yields it, so the schema
+must declare the record element globally. Valid records are written on to
+the next stage; invalid records go to a quarantine file together with their
+validation errors:
+
+    <Invalid_Records>
+      <Invalid_Record>
+        <Errors><Error path="...">message</Error></Errors>
+        <Record>...</Record>
+      </Invalid_Record>
+    </Invalid_Records>
+"""
+
+import copy
+from lxml import etree
+from utils.logger import get_logger
+from utils.xml_utils import prune_element
+from splitting.chunk_writer import ChunkWriter
+
+logger = get_logger(__name__)
+
+# path -> compiled XMLSchema, per process
+_SCHEMAS = {}
+
+
+def get_schema(path):
+    if path not in _SCHEMAS:
+        logger.info(f"Compiling schema {path}")
+        _SCHEMAS[path] = etree.XMLSchema(etree.parse(path))
+    return _SCHEMAS[path]
+
+
+class SchemaValidator:
+    def __init__(self, xsd_path):
+        self.xsd_path = xsd_path
+        self.schema = get_schema(xsd_path)
+
+    def _invalid_record(self, record):
+        wrapper = etree.Element("Invalid_Record")
+        errors = etree.SubElement(wrapper, "Errors")
+        for entry in self.schema.error_log:
+            error = etree.SubElement(errors, "Error", path=entry.path or "")
+            error.text = entry.message
+        wrapper.append(record)
+        return wrapper
+
+    def filter(self, source, out, quarantine_path):
+        """
+        Validates each record in source (a path or binary file) and writes
+        the valid ones to out (a path or binary file) in the same envelope.
+        Invalid records are written to quarantine_path, which is only
+        created if there are any. Returns (valid, invalid) record counts.
+        """
+        writer = None
+        quarantine = None
+        valid = invalid = 0
+        depth = 0
+
+        try:
+            for event, elem in etree.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if depth == 0:
+                        writer = ChunkWriter(out, elem.tag, elem.nsmap)
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth != 1:
+                    continue
+
+                # A record: validated as a document of its own
+                record = copy.deepcopy(elem)
+                if self.schema.validate(etree.ElementTree(record)):
+                    writer.write(record)
+                    valid += 1
+                else:
+                    if quarantine is None:
+                        quarantine = ChunkWriter(quarantine_path, "Invalid_Records")
+                    quarantine.write(self._invalid_record(record))
+                    invalid += 1
+
+                prune_element(elem)
+
+        finally:
+            if writer is not None:
+                writer.close()
+            if quarantine is not None:
+                quarantine.close()
+
+        return valid, invalid
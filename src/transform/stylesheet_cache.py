@@ -0,0 +1,77 @@
+"""
+Per-process cache of compiled XSLT stylesheets.
+
+Stylesheets are keyed by path and content hash. A stat check on every
+lookup notices edits: a changed file is hashed again and recompiled only if
+its content really changed. Worker processes call get_stylesheet() once at
+startup, so every chunk they transform reuses the same compiled XSLT.
+
+libxslt keeps profile counters on a compiled stylesheet across runs, so
+the totals profiled so far are kept beside it (see profile_baseline).
+"""
+
+import hashlib
+import os
+from threading import Lock
+from lxml import etree
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# (path, sha256) -> compiled XSLT
+_COMPILED = {}
+# path -> ((mtime_ns, size), sha256) of the last lookup
+_SEEN = {}
+# compiled XSLT -> profile totals libxslt has counted on it so far
+_BASELINES = {}
+_LOCK = Lock()
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def get_stylesheet(path):
+    """
+    Returns the compiled stylesheet at path, compiling it only the first
+    time this content is seen in this process.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+
+    with _LOCK:
+        seen = _SEEN.get(path)
+        if seen and seen[0] == stat_key:
+            return _COMPILED[(path, seen[1])]
+
+        digest = _sha256(path)
+        _SEEN[path] = (stat_key, digest)
+
+        xslt = _COMPILED.get((path, digest))
+        if xslt is None:
+            if seen:
+                logger.info(f"Stylesheet changed, recompiling: {path}")
+            xslt = _COMPILED[(path, digest)] = etree.XSLT(etree.parse(path))
+
+        return xslt
+
+
+def profile_baseline(xslt):
+    """
+    The profile totals seen so far for a compiled stylesheet, shared by
+    every transformer in this process that profiles it.
+    """
+    with _LOCK:
+        return _BASELINES.setdefault(xslt, {})
+
+
+def clear():
+    """
+    Drops every compiled stylesheet.
+    """
+    with _LOCK:
+        _COMPILED.clear()
+        _SEEN.clear()
+        _BASELINES.clear()
@@ -2,12 +2,138 @@
 Optional cleanup utilities for XML:
 - Remove empty nodes
 - Normalize namespaces
+
+Both work on one record at a time without recursion, so the splitter can
+clean every record in the same iterparse pass that writes the chunks (see
+remove_empty_elements and namespace_mode in settings.yaml).
 """
 
 from lxml import etree
 
+WORKDAY_NS = "urn:com.workday/bsvc"
+
+
 def remove_empty_elements(root):
-    for elem in list(root):
-        remove_empty_elements(elem)
-        if (elem.text is None or not elem.text.strip()) and len(elem) == 0:
-            root.remove(elem)
+    """
+    Removes descendants of root with no children and no text. Elements
+    left empty by the removal are removed too.
+    """
+    # Reverse document order visits every element after its descendants
+    for elem in reversed(list(root.iter(etree.Element))):
+        if elem is root:
+            continue
+        if len(elem) == 0 and (elem.text is None or not elem.text.strip()):
+            parent = elem.getparent()
+            # Keep the text that followed the element
+            if elem.tail and elem.tail.strip():
+                previous = elem.getprevious()
+                if previous is not None:
+                    previous.tail = (previous.tail or "") + elem.tail
+                else:
+                    parent.text = (parent.text or "") + elem.tail
+            parent.remove(elem)
+
+
+def _local(name):
+    return name.rsplit("}", 1)[-1]
+
+
+def _canonical_nsmap(nsmap, prefixes):
+    """
+    nsmap with the prefixes from prefixes, and one prefix per namespace.
+    """
+    canonical = {uri: prefix for prefix, uri in prefixes.items()}
+    normalized = {}
+    for prefix, uri in nsmap.items():
+        normalized.setdefault(canonical.get(uri, prefix), uri)
+    return normalized
+
+
+def _detach(elem, nsmap):
+    """
+    Moves the content of elem under a new root element declaring nsmap.
+    lxml rebinds every moved node to the new declarations by URI, which
+    also drops the declarations the record inherited or repeated.
+    """
+    root = etree.Element(elem.tag, elem.attrib, nsmap=nsmap)
+    root.text = elem.text
+    root.extend(list(elem))
+    return root
+
+
+def normalize_namespaces(elem, prefixes=None):
+    """
+    Returns elem as a standalone element that declares each namespace it
+    uses once, with the prefix from prefixes (wd for Workday by default).
+    """
+    prefixes = prefixes or {"wd": WORKDAY_NS}
+    root = _detach(elem, _canonical_nsmap(elem.nsmap, prefixes))
+    etree.cleanup_namespaces(root)
+    return root
+
+
+def strip_namespaces(elem):
+    """
+    Returns elem as a standalone element with every tag and attribute name
+    reduced to its local name.
+    """
+    root = _detach(elem, None)
+
+    for node in root.iter(etree.Element):
+        node.tag = _local(node.tag)
+        if any(name.startswith("{") for name in node.attrib):
+            attrib = {_local(name): value for name, value in node.attrib.items()}
+            node.attrib.clear()
+            node.attrib.update(attrib)
+
+    etree.cleanup_namespaces(root)
+    return root
+
+
+class XMLCleaner:
+    """
+    Per-record cleanup for the split pass, configured from settings.
+    """
+
+    def __init__(self, settings):
+        self.remove_empty = settings.get("remove_empty_elements", False)
+        self.namespace_mode = settings.get("namespace_mode", "keep")
+        self.prefixes = settings.get("namespace_prefixes") or {"wd": WORKDAY_NS}
+
+        if self.namespace_mode not in ("keep", "normalize", "strip"):
+            raise ValueError(f"Unknown namespace_mode: {self.namespace_mode}")
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Returns a cleaner, or None when the settings ask for no cleanup.
+        """
+        cleaner = cls(settings)
+        if not cleaner.remove_empty and cleaner.namespace_mode == "keep":
+            return None
+        return cleaner
+
+    def clean(self, elem):
+        """
+        Cleans one record. Returns the element to write, which is a new
+        element unless namespace_mode is "keep"; elem itself is left empty
+        then and can be pruned as usual.
+        """
+        if self.remove_empty:
+            remove_empty_elements(elem)
+
+        if self.namespace_mode == "normalize":
+            return normalize_namespaces(elem, self.prefixes)
+        if self.namespace_mode == "strip":
+            return strip_namespaces(elem)
+        return elem
+
+    def envelope(self, tag, nsmap):
+        """
+        Chunk root tag and namespace declarations to match cleaned records.
+        """
+        if self.namespace_mode == "strip":
+            return _local(tag), None
+        if self.namespace_mode == "normalize":
+            return tag, _canonical_nsmap(nsmap, self.prefixes)
+        return tag, nsmap
@@ -0,0 +1,95 @@
+"""
+Per-template XSLT profile, combined across every chunk of a run.
+
+With xslt_profile set, XSLTTransformer runs the stylesheet with lxml's
+profile_run and adds each result's xslt_profile here. The report lists
+every template by total time, so the slow ones in transform.xslt show up
+first.
+"""
+
+import os
+from utils.file_utils import ensure_dir
+
+PROFILE_FILE = "xslt_profile.txt"
+
+# libxslt reports profile times in 1/100 ms
+TICKS_PER_MS = 100
+
+
+class XSLTProfile:
+    def __init__(self):
+        # (match, name, mode) -> [calls, ticks]
+        self.templates = {}
+        self.runs = 0
+
+    def add(self, profile, baseline):
+        """
+        Adds the xslt_profile document of one profiled transform.
+
+        libxslt keeps counting on the compiled stylesheet, so every profile
+        is a running total of all profiled runs of that stylesheet. baseline
+        holds the totals seen so far for it and is updated here; only the
+        difference is added.
+        """
+        self.runs += 1
+        for template in profile.getroot():
+            key = (template.get("match"), template.get("name"), template.get("mode"))
+            calls = int(template.get("calls"))
+            ticks = int(template.get("time"))
+            seen_calls, seen_ticks = baseline.get(key, (0, 0))
+            baseline[key] = (calls, ticks)
+
+            totals = self.templates.setdefault(key, [0, 0])
+            totals[0] += calls - seen_calls
+            totals[1] += ticks - seen_ticks
+
+    def merge(self, other):
+        """
+        Adds the totals of another profile, e.g. one from a worker process.
+        """
+        self.runs += other.runs
+        for key, (calls, ticks) in other.templates.items():
+            totals = self.templates.setdefault(key, [0, 0])
+            totals[0] += calls
+            totals[1] += ticks
+
+    def rows(self):
+        """
+        (match, name, mode, calls, total ms, average ms) per template,
+        slowest first.
+        """
+        rows = [
+            (*key, calls, ticks / TICKS_PER_MS, ticks / TICKS_PER_MS / calls if calls else 0.0)
+            for key, (calls, ticks) in self.templates.items()
+        ]
+        return sorted(rows, key=lambda row: row[4], reverse=True)
+
+    def write(self, output_dir):
+        """
+        Writes the report to output_dir and returns its path.
+        """
+        ensure_dir(output_dir)
+        path = os.path.join(output_dir, PROFILE_FILE)
+        rows = self.rows()
+        total_ms = sum(row[4] for row in rows)
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                f"XSLT profile: {self.runs} transforms, {len(rows)} templates, "
+                f"{total_ms:.1f} ms in templates\n\n"
+            )
+            f.write(f"{'rank':>4}  {'calls':>10}  {'total ms':>10}  {'avg ms':>9}  {'share':>6}  template\n")
+
+            for rank, (match, name, mode, calls, ms, average) in enumerate(rows, 1):
+                template = " ".join(
+                    f'{label}="{value}"'
+                    for label, value in (("match", match), ("name", name), ("mode", mode))
+                    if value
+                )
+                share = ms / total_ms if total_ms else 0.0
+                f.write(
+                    f"{rank:>4}  {calls:>10}  {ms:>10.1f}  {average:>9.3f}  "
+                    f"{share:>6.1%}  {template}\n"
+                )
+
+        return path
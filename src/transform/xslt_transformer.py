@@ -1,29 +1,538 @@
 """
 Applies XSLT transformations to XML chunks.
+
+xslt_mode "document" parses the whole chunk and runs the stylesheet once.
+xslt_mode "record" is for stylesheets that handle one record at a time: the
+stylesheet runs on each split_element subtree as iterparse yields it, and
+the records in each result are appended to one output envelope, so memory
+stays flat however large the chunk is.
+
+transform_engine "mapping" skips XSLT and streams each chunk through the
+YAML field mapping in field_mapping_path (see field_mapper.py).
+
+transform_many() transforms a list of chunks in a process pool, optionally
+handing each result to the Excel stage in memory. A chunk that fails is
+copied to quarantine_dir with its error log, and the rest of the run
+carries on.
+
+xslt_profile runs the stylesheet with lxml's profile_run and writes the
+per-template totals of the run to output_dir (see xslt_profile.py).
+
+With xsd_path set, every transformed record is validated against the
+schema; invalid records are quarantined with their errors and the valid
+ones go on to the Excel stage (see schema_validator.py).
+
+prepare_columns() fixes the flat workbook columns for the whole run from
+a transformed sample or from the XSD, before the first chunk is
+converted (column_schema, see excel/column_schema.py).
+
+With excel_output "audit", chunks are reduced to audit aggregates instead
+of workbooks (see excel/audit_summary.py).
 """
 
 from lxml import etree
-from utils.xml_utils import get_settings
+from utils.xml_utils import get_settings, prune_element
 from utils.logger import get_logger
+from utils.file_utils import ensure_dir, open_input, output_stream, strip_compression_suffix
+from utils.checkpoint import chunk_id, file_sha256, run_identity
+from splitting.chunk_writer import ChunkWriter
+from .stylesheet_cache import get_stylesheet, profile_baseline
+from .field_mapper import FieldMapper
+from .xslt_profile import XSLTProfile
+from .schema_validator import SchemaValidator
+from excel.xml_to_excel import XMLToExcel, iter_records
+from excel.column_schema import ColumnSchema, schema_key
+from excel.flatten import Flattener
+from excel.audit_summary import XMLAudit
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import copy
+import io
 import os
+import shutil
+import tempfile
+import time
 
 logger = get_logger(__name__)
 
+# Per-process transformer, built once by _init_worker
+_worker = None
+
+
+def _init_worker(settings):
+    global _worker
+    _worker = XSLTTransformer(settings)
+
+
+def _transform_in_worker(xml_path, convert):
+    return _worker.transform_chunk(xml_path, convert)
+
+
+def _error_log(error, transform):
+    """
+    The error and any libxml2/libxslt messages behind it, as text.
+    """
+    lines = [f"{type(error).__name__}: {error}"]
+    for log in (getattr(error, "error_log", None), getattr(transform, "error_log", None)):
+        lines.extend(str(entry) for entry in log or [])
+    return "\n".join(lines) + "\n"
+
+
 class XSLTTransformer:
-    def __init__(self):
-        self.settings = get_settings()
+    def __init__(self, settings=None, journal=None):
+        self.settings = settings or get_settings()
+        self.journal = journal
         self.xslt_path = self.settings["xslt_path"]
+        self.engine = self.settings.get("transform_engine", "xslt")
+        self.mode = self.settings.get("xslt_mode", "document")
+        self.record_tag = "{*}" + self.settings["split_element"]
+        self.transform = None
+        self.mapper = None
+        # Filled in by transform_many
+        self.quarantined = {}
+        self.invalid = {}
+        self.timings = {}
+        self._converter = None
+        # Run totals, and the profile of the chunk being transformed
+        self.profile = XSLTProfile() if self.settings.get("xslt_profile") else None
+        self._chunk_profile = None
+        # Quarantine file of the invalid records of the chunk being transformed
+        self._chunk_invalid = None
+        # Compiled once per process, like the stylesheet
+        xsd_path = self.settings.get("xsd_path")
+        self.validator = SchemaValidator(xsd_path) if xsd_path else None
+
+        if self.engine == "mapping":
+            self.mapper = FieldMapper.load(
+                self.settings["field_mapping_path"], self.settings["split_element"]
+            )
+        elif self.engine == "xslt":
+            self.transform = get_stylesheet(self.xslt_path)
+        else:
+            raise ValueError(f"Unknown transform_engine: {self.engine}")
 
-        xslt_doc = etree.parse(self.xslt_path)
-        self.transform = etree.XSLT(xslt_doc)
+        if self.mode not in ("document", "record"):
+            raise ValueError(f"Unknown xslt_mode: {self.mode}")
 
     def apply_xslt(self, xml_path):
+        done = self.journal and self.journal.completed("transform", chunk_id(xml_path), xml_path)
+        if done:
+            logger.info(f"Already transformed, skipping {xml_path}")
+            return done["path"]
+
         logger.info(f"Transforming {xml_path}")
 
-        doc = etree.parse(xml_path)
-        result = self.transform(doc)
+        self._start_chunk()
+        out_path = self._transform_chunk(xml_path, self.output_path(xml_path))
+        if self.profile is not None:
+            self.profile.merge(self._chunk_profile)
+        if self._chunk_invalid is not None:
+            self.invalid[xml_path] = self._chunk_invalid
 
-        out_path = xml_path.replace(".xml", "_transformed.xml")
-        result.write(out_path, pretty_print=True, xml_declaration=True, encoding="UTF-8")
+        if self.journal is not None:
+            self.journal.record("transform", chunk_id(xml_path), out_path, xml_path)
 
         return out_path
+
+    def output_path(self, xml_path):
+        # A compressed chunk gives a compressed result, e.g. _transformed.xml.gz
+        return xml_path.replace(".xml", "_transformed.xml")
+
+    def transform_many(self, paths, convert=False):
+        """
+        Transforms the chunks in paths on transform_workers processes and
+        returns the transformed paths in input order. With convert, each
+        chunk also goes on to the Excel stage in the same worker, and the
+        workbook paths are returned instead.
+
+        A chunk that fails is copied to quarantine_dir next to an error log
+        and left out of the result; self.quarantined maps it to its copy.
+        self.invalid maps a chunk with records that failed xsd_path to
+        the quarantine file of those records. self.timings holds the
+        seconds each chunk took. Only this process writes the checkpoint
+        journal.
+        """
+        workers = self.settings.get("transform_workers") or os.cpu_count()
+        started = time.perf_counter()
+        self.quarantined = {}
+        self.invalid = {}
+        self.timings = {}
+        results = {}
+        todo = []
+
+        for xml_path in paths:
+            done = self.finished(xml_path, convert)
+            if done:
+                logger.info(f"Already processed, skipping {xml_path}")
+                results[xml_path] = done
+            else:
+                todo.append(xml_path)
+
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(todo)),
+                initializer=_init_worker,
+                initargs=(self.settings,)
+            ) as pool:
+                outcomes = list(pool.map(_transform_in_worker, todo, repeat(convert)))
+        else:
+            outcomes = [self.transform_chunk(xml_path, convert) for xml_path in todo]
+
+        for xml_path, outcome in zip(todo, outcomes):
+            result = self.finish(xml_path, outcome)
+            if result is not None:
+                results[xml_path] = result
+
+        logger.info(
+            f"Transformed {len(results)} of {len(paths)} chunks in "
+            f"{time.perf_counter() - started:.2f}s on {min(workers, max(len(todo), 1))} "
+            f"processes, {len(self.quarantined)} quarantined"
+        )
+        if self.profile is not None:
+            self.write_profile()
+
+        return [results[xml_path] for xml_path in paths if xml_path in results]
+
+    @property
+    def incomplete(self):
+        """
+        Chunks with records that did not reach the output: quarantined
+        chunks and chunks with invalid records.
+        """
+        return sorted(set(self.quarantined) | set(self.invalid))
+
+    def prepare_columns(self, input_path, chunk_paths=()):
+        """
+        Fixes the run's column schema before any chunk is converted and
+        points column_schema_file in self.settings at it, for the
+        converter and the workers of transform_many. A schema saved for
+        the same input, stylesheet and settings is reused.
+
+        "scan" samples up to column_schema_sample records spread over
+        chunk_paths, so it needs the chunks; "xsd" does not. Returns the
+        schema path, or None when column_schema is off, an EIB template
+        fixes the layout, or there is nothing to sample.
+        """
+        mode = self.settings.get("column_schema", "off")
+        if mode == "off" or self.settings.get("eib_template_path"):
+            return None
+        if mode not in ("scan", "xsd"):
+            raise ValueError(f"Unknown column_schema: {mode}")
+
+        sample = self.settings.get("column_schema_sample", 1000)
+        if mode == "scan" and not chunk_paths:
+            logger.info("No chunks to sample, so each workbook keeps its own columns")
+            return None
+        if mode == "xsd":
+            element = self.settings["column_schema_element"]
+            identity = {
+                "xsd_sha256": file_sha256(self.settings["xsd_path"]),
+                "element": element,
+            }
+        else:
+            identity = dict(run_identity(self.settings, input_path), sample=sample)
+        identity["column_schema"] = mode
+        identity["list_mode"] = self.settings.get("list_mode", "join")
+        identity["list_elements"] = self.settings.get("list_elements")
+
+        path = os.path.join(
+            self.settings["output_dir"], "column_schemas", schema_key(identity) + ".json"
+        )
+        if os.path.exists(path):
+            logger.info(f"Reusing column schema {path}")
+        elif mode == "xsd":
+            schema = ColumnSchema.from_xsd(self.settings["xsd_path"], element)
+            schema.save(path)
+            logger.info(f"Column schema of {len(schema.columns)} columns from {self.settings['xsd_path']}")
+        else:
+            sampled = self._sample_output(chunk_paths, sample)
+            if sampled is None:
+                logger.info("No records to sample, so each workbook keeps its own columns")
+                return None
+            with io.BytesIO(sampled) as f:
+                schema = ColumnSchema.from_records(
+                    iter_records(f), Flattener.from_settings(self.settings)
+                )
+            schema.save(path)
+            logger.info(f"Column schema of {len(schema.columns)} columns from a sample of the run")
+
+        self.settings = dict(self.settings, column_schema_file=path)
+        self._converter = None
+        return path
+
+    def _sample_output(self, chunk_paths, sample):
+        """
+        Transforms up to sample records, the first few of every chunk, and
+        returns the transformed XML, or None if the chunks have no records.
+        """
+        per_chunk = max(1, -(-sample // len(chunk_paths)))
+        ensure_dir(self.settings["temp_dir"])
+        # Batch inputs share temp_dir, so every sample gets a name of its own
+        fd, sample_path = tempfile.mkstemp(
+            prefix="column_sample_", suffix=".xml", dir=self.settings["temp_dir"]
+        )
+        os.close(fd)
+        writer = None
+
+        try:
+            for chunk_path in chunk_paths:
+                taken = 0
+                with open_input(chunk_path) as f:
+                    for _, elem in etree.iterparse(f, events=("end",), tag=self.record_tag):
+                        if writer is None:
+                            parent = elem.getparent()
+                            root_tag = parent.tag if parent is not None else elem.tag
+                            writer = ChunkWriter(sample_path, root_tag, elem.nsmap)
+                        writer.write(elem)
+                        prune_element(elem)
+                        taken += 1
+                        if taken >= per_chunk or writer.records >= sample:
+                            break
+                if writer is not None and writer.records >= sample:
+                    break
+
+            if writer is None:
+                return None
+            writer.close()
+
+            buffer = io.BytesIO()
+            self._run_engine(sample_path, buffer)
+            return buffer.getvalue()
+        finally:
+            if os.path.exists(sample_path):
+                os.remove(sample_path)
+
+    def transform_chunk(self, xml_path, convert=False):
+        """
+        Transforms one chunk, and with convert writes its workbook, without
+        touching the journal. Exceptions do not leave this method, so one
+        bad chunk cannot stop a run; pass the outcome to finish().
+
+        Unless keep_intermediate is set, a converted chunk is transformed
+        into a compact in-memory buffer that goes straight to the Excel
+        stage, and no _transformed.xml file is written.
+
+        Returns (transformed path or None, workbook path or None, seconds,
+        error log text or None, XSLTProfile or None, quarantine file of
+        invalid records or None).
+        """
+        started = time.perf_counter()
+        out_path = self.output_path(xml_path)
+        excel_path = None
+        self._start_chunk()
+
+        try:
+            if not convert or self.settings.get("keep_intermediate"):
+                self._transform_chunk(xml_path, out_path)
+                if convert:
+                    excel_path = self.converter.convert(out_path)
+            else:
+                buffer = io.BytesIO()
+                self._transform_chunk(xml_path, buffer)
+                # Named as if the transformed file existed; getbuffer()
+                # hands the XML over without copying it
+                excel_path = self.converter.convert(out_path, data=buffer.getbuffer())
+                out_path = None
+            return (
+                out_path, excel_path, time.perf_counter() - started, None,
+                self._chunk_profile, self._chunk_invalid
+            )
+
+        except Exception as e:
+            # Drop any partial output
+            if os.path.exists(self.output_path(xml_path)):
+                os.remove(self.output_path(xml_path))
+            return (
+                None, None, time.perf_counter() - started,
+                _error_log(e, self.transform), self._chunk_profile, None
+            )
+
+    def finished(self, xml_path, convert=False):
+        """
+        Returns the transformed path, or with convert the workbook path, of
+        a chunk the journal shows as done.
+        """
+        if self.journal is None:
+            return None
+
+        cid = chunk_id(xml_path)
+        transformed = self.journal.completed("transform", cid, xml_path)
+        if not convert:
+            return transformed["path"] if transformed else None
+
+        # The workbook's source is the transformed file, or the chunk
+        # itself when the transformed XML stayed in memory
+        source = transformed["path"] if transformed else xml_path
+        converted = self.journal.completed("excel", cid, source)
+        return converted["path"] if converted else None
+
+    def finish(self, xml_path, outcome):
+        """
+        Journals or quarantines the outcome of transform_chunk(). Returns
+        the workbook path, or the transformed path if there is no workbook,
+        or None for a quarantined chunk.
+        """
+        out_path, excel_path, seconds, error, profile, invalid = outcome
+        self.timings[xml_path] = seconds
+        if self.profile is not None and profile is not None:
+            self.profile.merge(profile)
+
+        if error is not None:
+            self.quarantined[xml_path] = self._quarantine(xml_path, error)
+            return None
+        if invalid is not None:
+            self.invalid[xml_path] = invalid
+
+        logger.info(f"Processed {xml_path} in {seconds:.2f}s")
+
+        if self.journal is not None:
+            cid = chunk_id(xml_path)
+            if out_path is not None:
+                self.journal.record("transform", cid, out_path, xml_path)
+            if excel_path is not None:
+                self.journal.record("excel", cid, excel_path, out_path or xml_path)
+
+        return excel_path or out_path
+
+    def write_profile(self):
+        """
+        Writes the XSLT profile of the run so far to output_dir.
+        """
+        path = self.profile.write(self.settings["output_dir"])
+        logger.info(f"XSLT profile of {self.profile.runs} transforms written to {path}")
+        return path
+
+    def _start_chunk(self):
+        self._chunk_profile = XSLTProfile() if self.profile is not None else None
+        self._chunk_invalid = None
+
+    def _run_stylesheet(self, doc):
+        if self._chunk_profile is None:
+            return self.transform(doc)
+        result = self.transform(doc, profile_run=True)
+        self._chunk_profile.add(result.xslt_profile, profile_baseline(self.transform))
+        return result
+
+    @property
+    def converter(self):
+        # Built on first use; only chunks that are converted need it
+        if self._converter is None:
+            if self.settings.get("excel_output") == "audit":
+                self._converter = XMLAudit(settings=self.settings)
+            else:
+                self._converter = XMLToExcel(settings=self.settings)
+        return self._converter
+
+    def _transform_chunk(self, xml_path, out):
+        """
+        Transforms xml_path into out, a path or an open binary file. With
+        xsd_path set, only records that pass the schema reach out.
+        """
+        if self.validator is None:
+            return self._run_engine(xml_path, out)
+
+        # The unvalidated result stays in memory
+        buffer = io.BytesIO()
+        self._run_engine(xml_path, buffer)
+        buffer.seek(0)
+
+        quarantine_dir = self._quarantine_dir()
+        ensure_dir(quarantine_dir)
+        name = os.path.basename(strip_compression_suffix(xml_path))
+        quarantine_path = os.path.join(quarantine_dir, name.replace(".xml", "_invalid.xml"))
+        if os.path.exists(quarantine_path):
+            os.remove(quarantine_path)
+
+        valid, invalid = self.validator.filter(buffer, out, quarantine_path)
+        if invalid:
+            logger.warning(
+                f"{invalid} of {valid + invalid} records in {xml_path} failed "
+                f"validation, quarantined to {quarantine_path}"
+            )
+            self._chunk_invalid = quarantine_path
+        return out
+
+    def _run_engine(self, xml_path, out):
+        """
+        Runs the field mapping or the stylesheet. Files are pretty printed;
+        buffers are kept compact.
+        """
+        if self.mapper is not None:
+            return self.mapper.map_file(xml_path, out)
+
+        # Picks up edits to the stylesheet; a cache hit otherwise
+        self.transform = get_stylesheet(self.xslt_path)
+        if self.mode == "record":
+            self._transform_records(xml_path, out)
+        else:
+            self._transform_document(xml_path, out)
+        return out
+
+    def _quarantine_dir(self):
+        return self.settings.get("quarantine_dir") or os.path.join(
+            self.settings["output_dir"], "quarantine"
+        )
+
+    def _quarantine(self, xml_path, error_log):
+        """
+        Copies a failed chunk to quarantine_dir and writes its error log
+        beside it. Returns the path of the copy.
+        """
+        quarantine_dir = self._quarantine_dir()
+        ensure_dir(quarantine_dir)
+
+        copy_path = os.path.join(quarantine_dir, os.path.basename(xml_path))
+        shutil.copy2(xml_path, copy_path)
+        with open(copy_path + ".error.log", "w", encoding="utf-8") as f:
+            f.write(error_log)
+
+        logger.error(
+            f"ERROR: Could not transform {xml_path}, quarantined to {copy_path}: "
+            f"{error_log.splitlines()[0]}"
+        )
+        return copy_path
+
+    def _transform_document(self, xml_path, out):
+        with open_input(xml_path) as f:
+            doc = etree.parse(f)
+        result = self._run_stylesheet(doc)
+
+        with output_stream(out) as f:
+            result.write(
+                f, pretty_print=isinstance(out, str), xml_declaration=True, encoding="UTF-8"
+            )
+
+    def _transform_records(self, xml_path, out):
+        """
+        Runs the stylesheet on each record and streams the results out.
+
+        Each record is copied into a document of its own before the
+        stylesheet sees it, so the stylesheet cannot reach other records.
+        The root of the first result becomes the output envelope; the
+        children of every result are written into it.
+        """
+        writer = None
+
+        try:
+            with open_input(xml_path) as f:
+                for _, elem in etree.iterparse(f, events=("end",), tag=self.record_tag):
+                    result = self._run_stylesheet(etree.ElementTree(copy.deepcopy(elem))).getroot()
+                    prune_element(elem)
+
+                    if result is None:
+                        raise ValueError(
+                            f"Stylesheet {self.xslt_path} produced no element for a record"
+                        )
+
+                    if writer is None:
+                        writer = ChunkWriter(out, result.tag, result.nsmap)
+
+                    for child in result:
+                        writer.write(child)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        # An empty chunk still gets the envelope the stylesheet produces
+        if writer is None:
+            self._transform_document(xml_path, out)
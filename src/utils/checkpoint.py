@@ -0,0 +1,231 @@
+"""
+*******************************************************************************
+ File: src/utils/checkpoint.py
+ Purpose: Checkpoint journal for resumable pipeline runs.
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Identity includes the transform engine and the field
+                    mapping hash. ECC - fendingers
+    10/18/2026      Identity includes the split pass cleanup settings.
+                    ECC - fendingers
+    10/18/2026      Identity includes the EIB template hash. ECC - fendingers
+    10/18/2026      Identity includes excel_output. ECC - fendingers
+    10/18/2026      Identity includes xslt_mode, the XSD hash, the partition
+                    and delta keys, list_mode and column_store.
+                    ECC - fendingers
+*******************************************************************************
+ file_sha256(): Hashes a file in blocks.
+ run_identity(): Describes the input and settings a journal belongs to.
+ chunk_id(): Journal id of a chunk or stage output, e.g. "chunk_3".
+ CheckpointJournal: Append-only JSON lines journal of finished work. Each
+ line is one finished unit (a split chunk, a transformed chunk, a workbook)
+ with its output path and SHA-256, so a resumed run can skip work whose
+ output is still on disk unchanged.
+*******************************************************************************
+"""
+
+import hashlib
+import json
+import os
+from utils.file_utils import strip_compression_suffix
+
+
+JOURNAL_FILE = ".checkpoint.jsonl"
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hashes a file in 1 MB blocks.
+    """
+    
+    digest = hashlib.sha256()
+    
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+            
+    return digest.hexdigest()
+
+
+def run_identity(settings: dict, input_path: str) -> dict:
+    """
+    Input file and settings that decide what a run produces. A journal is
+    only resumed when these match.
+    """
+    
+    stat = os.stat(input_path)
+    xslt_path = settings.get("xslt_path")
+    mapping_path = settings.get("field_mapping_path")
+    template_path = settings.get("eib_template_path")
+    xsd_path = settings.get("xsd_path")
+    
+    return {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "max_file_size_mb": settings.get("max_file_size_mb"),
+        "split_mode": settings.get("split_mode", "stream"),
+        "partitions": settings.get("partitions"),
+        "partition_key": settings.get("partition_key"),
+        "delta_key": settings.get("delta_key"),
+        "temp_compression": settings.get("temp_compression"),
+        "remove_empty_elements": settings.get("remove_empty_elements", False),
+        "namespace_mode": settings.get("namespace_mode", "keep"),
+        "namespace_prefixes": settings.get("namespace_prefixes"),
+        "xslt_sha256": (
+            file_sha256(xslt_path)
+            if xslt_path and os.path.exists(xslt_path) else None
+        ),
+        "xslt_mode": settings.get("xslt_mode", "document"),
+        "transform_engine": settings.get("transform_engine", "xslt"),
+        "field_mapping_sha256": (
+            file_sha256(mapping_path)
+            if mapping_path and os.path.exists(mapping_path) else None
+        ),
+        "xsd_sha256": (
+            file_sha256(xsd_path)
+            if xsd_path and os.path.exists(xsd_path) else None
+        ),
+        "list_mode": settings.get("list_mode", "join"),
+        "list_elements": settings.get("list_elements") or [],
+        "column_schema": settings.get("column_schema", "off"),
+        "column_schema_sample": settings.get("column_schema_sample", 1000),
+        "column_schema_element": settings.get("column_schema_element"),
+        "column_store": settings.get("column_store", False),
+        "excel_output": settings.get("excel_output", "workbook"),
+        "excel_engine": settings.get("excel_engine", "openpyxl"),
+        "audit_group_by": settings.get("audit_group_by"),
+        "audit_exact_distinct": settings.get("audit_exact_distinct", 1000),
+        "eib_template_sha256": (
+            file_sha256(template_path)
+            if template_path and os.path.exists(template_path) else None
+        ),
+    }
+
+
+def chunk_id(path: str) -> str:
+    """
+    Returns the chunk a path belongs to, e.g. chunk_3 for chunk_3.xml.gz
+    and chunk_3_transformed.xml.
+    """
+    
+    name = os.path.basename(strip_compression_suffix(path))
+    name = os.path.splitext(name)[0]
+    
+    return name.removesuffix("_transformed")
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of finished pipeline work in one output directory.
+    """
+    
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.resume = resume
+        self.entries = {}
+        
+        if resume and os.path.exists(path):
+            self._load()
+            
+    @classmethod
+    def for_output(cls, output_dir: str, resume: bool = False):
+        return cls(os.path.join(output_dir, JOURNAL_FILE), resume)
+    
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    
+                except json.JSONDecodeError:
+                    # A line cut short by a crash is the end of the journal
+                    break
+                
+                self.entries[(entry["stage"], entry["id"])] = entry
+                
+    def start(self, identity: dict) -> bool:
+        """
+        Begins a run. Returns True when resuming a journal of the same run;
+        otherwise the journal is started over.
+        """
+        
+        previous = self.entries.get(("run", "run"))
+        
+        if self.resume and previous and previous["identity"] == identity:
+            return True
+        
+        self.entries = {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        open(self.path, "w").close()
+        
+        self._append({"stage": "run", "id": "run", "identity": identity})
+        return False
+    
+    def record(
+        self, stage: str, item_id: str, path: str = None, source: str = None,
+        **extra
+    ):
+        """
+        Commits one finished unit of work. The line is flushed and synced
+        before returning, so it survives a crash right after.
+        
+        source is the file the work was made from; its hash is kept so the
+        work is redone if the source is rewritten.
+        """
+        
+        entry = {"stage": stage, "id": item_id, "path": path}
+        
+        if path is not None:
+            entry["sha256"] = file_sha256(path)
+            
+        if source is not None:
+            entry["source_sha256"] = file_sha256(source)
+            
+        entry.update(extra)
+        self._append(entry)
+        
+        return entry
+    
+    def completed(
+        self, stage: str, item_id: str, source: str = None
+    ) -> dict | None:
+        """
+        Returns the entry for finished work whose output is still on disk
+        and unchanged, and whose source (if given) is the one it was made
+        from. Returns None if the work has to be redone.
+        """
+        
+        entry = self.entries.get((stage, item_id))
+        
+        if entry is None:
+            return None
+        
+        if source is not None and (
+            not os.path.exists(source) or
+            file_sha256(source) != entry.get("source_sha256")
+        ):
+            return None
+        
+        path = entry.get("path")
+        
+        if path is not None and (
+            not os.path.exists(path) or file_sha256(path) != entry["sha256"]
+        ):
+            return None
+        
+        return entry
+    
+    def _append(self, entry: dict):
+        self.entries[(entry["stage"], entry["id"])] = entry
+        
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,9 +1,207 @@
 """
 File helpers.
+
+open_input() and open_output() read and write .gz, .zip and .zst files as
+binary streams, chosen by file suffix, so the pipeline stages never
+decompress to disk first. .zst needs the optional zstandard package.
+
+open_data() reads XML held in memory (bytes, or a BytesIO's getbuffer())
+as a stream without copying it first.
+
+file_lock() lets processes that share a file, such as batch workers and
+the size model in temp_dir, take turns updating it.
 """
 
+import gzip
 import os
+import time
+import zipfile
+from contextlib import contextmanager
+
+COMPRESSION_SUFFIXES = {".gz": "gz", ".zip": "zip", ".zst": "zst"}
+
+# Temp files are short-lived, so favour speed over ratio
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
 
 def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path)
+
+
+def compression_of(path):
+    """
+    Returns "gz", "zip", "zst" or None from the file suffix.
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(str(path))[1].lower())
+
+
+def strip_compression_suffix(path):
+    """
+    Returns the path without a compression suffix, e.g. a.xml.gz -> a.xml.
+    """
+    path = str(path)
+    if compression_of(path):
+        return os.path.splitext(path)[0]
+    return path
+
+
+def with_compression(path, compression):
+    """
+    Adds the suffix for compression ("gz", "zst" or None) to path.
+    """
+    if not compression or compression == "none":
+        return path
+    if compression not in ("gz", "zst"):
+        raise ValueError(f"Unsupported output compression: {compression}")
+    return f"{path}.{compression}"
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading or writing .zst files requires the zstandard package"
+        ) from None
+    return zstandard
+
+
+class _ZipMember:
+    """
+    Stream over the XML member of a .zip, closing the archive with it.
+    """
+
+    def __init__(self, path):
+        self._archive = zipfile.ZipFile(path)
+        names = [n for n in self._archive.namelist() if not n.endswith("/")]
+        xml_names = [n for n in names if n.lower().endswith(".xml")] or names
+
+        if not xml_names:
+            self._archive.close()
+            raise FileNotFoundError(f"No file found in archive {path}")
+
+        self._member = self._archive.open(xml_names[0])
+
+    def read(self, size=-1):
+        return self._member.read(size)
+
+    def close(self):
+        self._member.close()
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_input(path):
+    """
+    Opens path for binary reading, decompressing .gz, .zip and .zst on the
+    fly. A .zip is read from its first .xml member.
+    """
+    compression = compression_of(path)
+
+    if compression == "gz":
+        return gzip.open(path, "rb")
+    if compression == "zip":
+        return _ZipMember(path)
+    if compression == "zst":
+        return _zstandard().ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True
+        )
+    return open(path, "rb")
+
+
+class _BufferReader:
+    """
+    Binary stream over a bytes-like object. io.BytesIO copies anything but
+    bytes up front; this only copies the blocks that are read.
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def read(self, size=-1):
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(self._pos + size, end)
+        block = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return block
+
+    def close(self):
+        self._view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_data(data):
+    """
+    Opens XML held in memory for binary reading, without copying it.
+    """
+    return _BufferReader(data)
+
+
+def open_output(path):
+    """
+    Opens path for binary writing, compressing when it ends in .gz or .zst.
+    """
+    compression = compression_of(path)
+
+    if compression == "gz":
+        return gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    if compression == "zst":
+        return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            open(path, "wb"), closefd=True
+        )
+    if compression == "zip":
+        raise ValueError(f"Writing .zip output is not supported: {path}")
+    return open(path, "wb")
+
+
+@contextmanager
+def output_stream(target):
+    """
+    open_output() for a path. An open binary file (e.g. io.BytesIO) is
+    written as is and left open for the caller.
+    """
+    if hasattr(target, "write"):
+        yield target
+    else:
+        with open_output(target) as f:
+            yield f
+
+
+@contextmanager
+def file_lock(path, timeout=60, poll=0.05):
+    """
+    Holds the lock file path while the block runs, waiting up to timeout
+    seconds for another process to release it.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Could not lock {path} within {timeout}s; delete it if "
+                    "no other run is using it"
+                ) from None
+            time.sleep(poll)
+
+    os.close(fd)
+    try:
+        yield path
+    finally:
+        os.remove(path)
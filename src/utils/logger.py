@@ -13,6 +13,7 @@
     02/26/2026      Reformat 80 col. ECC - fendingers
     03/03/2026      Added log wiper. ECC - fendingers
     03/03/2026      Added term kill. ECC - fendingers
+    10/18/2026      No tail terminal in worker processes. ECC - fendingers
 *******************************************************************************
  get_logger(): Creates a new logger with the input name. 
  kill_logger(): Removes all of the handlers associated with a logger.
@@ -27,6 +28,7 @@
 import logging
 import logging.config
 import subprocess, re, sys, platform, os
+import multiprocessing
 import utils.path_utils as path_mod
 from pathlib import Path
 from threading import Lock
@@ -244,8 +246,11 @@ def _configure_logging():
         # Route warnings through logging
         logging.captureWarnings(True)
         
-        # Open terminal window and assign instance to _TAIL_TERMINAL
-        _TAIL_TERMINAL = _open_tail_terminal(log_path)
+        # Open terminal window and assign instance to _TAIL_TERMINAL. Worker
+        # processes share the parent's log file, so they must not open
+        # (and wipe) another one.
+        if multiprocessing.parent_process() is None:
+            _TAIL_TERMINAL = _open_tail_terminal(log_path)
         
         # Notify of logger configuration
         root_logger.info(
@@ -12,6 +12,7 @@
     02/27/2026      Initial Version. ECC - fendingers
     03/02/2026      Added logs dir.  ECC - fendingers
     03/13/2026      Updated project name. ECC - fendingers
+    10/18/2026      Added pipeline dirs. ECC - fendingers
 *******************************************************************************
  project_root(): Resolves the project root directory.
  get_dir_path(): Resolves the provided directory path against cached (enum).
@@ -39,6 +40,7 @@ class DirNames(StrEnum):
     EXCEL_DIR     = "excel"
     SPLITTING_DIR = "splitting"
     TRANSFORM_DIR = "transform"
+    PIPELINE_DIR  = "pipeline"
     UTILS_DIR     = "utils"
     TEST_TESTS    = "tests"
     TEST_DATA     = "test_data"
@@ -49,6 +51,7 @@ class DirNames(StrEnum):
     TEST_SPLITTING= "test_splitting"
     TEST_TRANSFORM= "test_transform"
     TEST_UTILS    = "test_utils"
+    TEST_PIPELINE = "test_pipeline"
     
 # Enum for configuration file names
 class ConfNames(StrEnum):
@@ -199,6 +202,11 @@ def get_dir_path(name: str) -> Path:
                 project_root() / DirNames.SRC_DIR / DirNames.UTILS_DIR
             )
             
+        case DirNames.PIPELINE_DIR:
+            dir_path = (
+                project_root() / DirNames.SRC_DIR / DirNames.PIPELINE_DIR
+            )
+            
         case DirNames.TEST_TESTS:
             dir_path = (
                 project_root() / DirNames.TEST_TESTS
@@ -247,6 +255,11 @@ def get_dir_path(name: str) -> Path:
                 project_root() / DirNames.TEST_TESTS / DirNames.TEST_UTILS
             )
             
+        case DirNames.TEST_PIPELINE:
+            dir_path = (
+                project_root() / DirNames.TEST_TESTS / DirNames.TEST_PIPELINE
+            )
+            
         case _:
             dir_path = _search_for_dir(name)
             
@@ -0,0 +1,76 @@
+"""
+*******************************************************************************
+ File: src/utils/perf_utils.py
+ Purpose: Process resource measurements for pipeline run reports.
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ peak_rss_bytes(): Returns the peak resident set size of this process.
+ _windows_peak_rss(): Reads PeakWorkingSetSize through the Win32 API.
+*******************************************************************************
+"""
+
+import sys
+
+
+def _windows_peak_rss() -> int | None:
+    """
+    Reads the peak working set of the current process on Windows.
+    """
+    
+    import ctypes
+    from ctypes import wintypes
+    
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+        
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    
+    ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.windll.kernel32.GetCurrentProcess(),
+        ctypes.byref(counters),
+        counters.cb
+    )
+    
+    return counters.PeakWorkingSetSize if ok else None
+
+
+def peak_rss_bytes() -> int | None:
+    """
+    Returns the peak resident set size of the current process in bytes, or
+    None if the platform does not report it.
+    
+    This is the high-water mark for the life of the process, so compare runs
+    that each start in a fresh process.
+    """
+    
+    try:
+        if sys.platform == "win32":
+            return _windows_peak_rss()
+        
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        
+        # Linux reports kilobytes, macOS reports bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    
+    except Exception:
+        return None
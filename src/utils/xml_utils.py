@@ -10,8 +10,12 @@
     MM-DD-YYYY     Provide a meaningful description of what you changed and why
 *******************************************************************************
     03/03/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added prune_element(), moved here from the splitter so
+                    the streaming transform can share it. ECC - fendingers
 *******************************************************************************
  get_settings(): Load settings file once and cache the result.
+ prune_element(): Clear a processed iterparse element and detach everything
+ parsed before it.
 *******************************************************************************
 """
 
@@ -52,3 +56,22 @@ def get_settings() -> yaml.safe_load:
         "at: " +
         str(yaml_path)
     )
+
+
+def prune_element(elem) -> None:
+    """
+    Clears a processed element and detaches everything parsed before it.
+    
+    elem.clear() alone leaves the emptied element attached to its parent, so
+    the tree still grows by one node per record. Deleting the preceding
+    siblings of the element and of each ancestor keeps the tree bounded.
+    """
+    
+    elem.clear(keep_tail=True)
+    
+    for node in (elem, *elem.iterancestors()):
+        parent = node.getparent()
+        if parent is None:
+            break
+        while node.getprevious() is not None:
+            del parent[0]
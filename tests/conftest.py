@@ -0,0 +1,120 @@
+"""
+*******************************************************************************
+ File: tests/conftest.py
+ Purpose: Shared fixtures for the splitting, transform, excel and pipeline
+ tests.
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added TEST_MAPPING, the field mapping equivalent of
+                    TEST_XSLT. ECC - fendingers
+*******************************************************************************
+ make_records(): Builds a small Get_Historical_Academic_Records document in
+ the Workday namespace.
+ settings(): Settings dict pointing every directory at tmp_path, with one
+ sample input file, a small test stylesheet and the equivalent field
+ mapping.
+*******************************************************************************
+"""
+
+import pytest
+
+
+WD_NS = "urn:com.workday/bsvc"
+
+TEST_XSLT = """<?xml version="1.0" encoding="UTF-8"?>
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:template match="/">
+    <Records>
+      <xsl:for-each select="//*[local-name()='Historical_Academic_Record']">
+        <Record>
+          <Student_ID>
+            <xsl:value-of select="*[local-name()='Student_ID']"/>
+          </Student_ID>
+          <Institution>
+            <xsl:value-of select="*[local-name()='Institution']"/>
+          </Institution>
+        </Record>
+      </xsl:for-each>
+    </Records>
+  </xsl:template>
+</xsl:stylesheet>
+"""
+
+TEST_MAPPING = f"""
+namespaces:
+  wd: "{WD_NS}"
+root: "Records"
+record: "Record"
+fields:
+  - source: "wd:Student_ID"
+    target: "Student_ID"
+  - source: "wd:Institution"
+    target: "Institution"
+"""
+
+
+def make_records(count: int = 5, students: int = None) -> bytes:
+    """
+    Builds a Get_Historical_Academic_Records style document with count
+    records. With students set, Student IDs repeat every students records.
+    """
+    
+    students = students or count
+    
+    records = "".join(
+        "<wd:Historical_Academic_Record>"
+        f"<wd:Student_ID>S{i % students:05d}</wd:Student_ID>"
+        f"<wd:Institution>INST_{i % 3}</wd:Institution>"
+        "</wd:Historical_Academic_Record>"
+        for i in range(count)
+    )
+    
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<wd:Get_Historical_Academic_Records_Response '
+        f'xmlns:wd="{WD_NS}"><wd:Response_Data>' +
+        records +
+        "</wd:Response_Data></wd:Get_Historical_Academic_Records_Response>"
+    ).encode("utf-8")
+
+
+@pytest.fixture
+def settings(tmp_path):
+    """
+    Settings dict with input, output and temp directories under tmp_path.
+    """
+    
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    temp_dir = tmp_path / "temp"
+    
+    for path in (input_dir, output_dir, temp_dir):
+        path.mkdir()
+        
+    (input_dir / "extract.xml").write_bytes(make_records())
+    
+    xslt_path = tmp_path / "transform.xslt"
+    xslt_path.write_text(TEST_XSLT, encoding="utf-8")
+    
+    mapping_path = tmp_path / "field_mapping.yaml"
+    mapping_path.write_text(TEST_MAPPING, encoding="utf-8")
+    
+    return {
+        "max_file_size_mb": 25,
+        "split_element": "Historical_Academic_Record",
+        "xslt_path": str(xslt_path),
+        "field_mapping_path": str(mapping_path),
+        "input_dir": str(input_dir),
+        "output_dir": str(output_dir),
+        "temp_dir": str(temp_dir),
+        "pipeline_mode": "serial",
+        "pipeline_workers": 2,
+        "pipeline_queue_depth": 2,
+    }
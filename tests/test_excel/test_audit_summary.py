@@ -0,0 +1,124 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_audit_summary.py
+ Purpose: Contain test functions for audit_summary.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_store_matches_xml_fields. ECC - fendingers
+*******************************************************************************
+ test_summary_of_chunks(): Two audited chunks merge into one summary with
+ fill rates, distinct counts, date ranges and group counts.
+ test_distinct_estimate(): Past the exact limit, distinct counts are
+ estimated, and estimates merge across chunks.
+ test_store_matches_xml_fields(): With or without column_store, every
+ list_mode gives the same fields and fill counts.
+*******************************************************************************
+"""
+
+import json
+import pytest
+from lxml import etree
+from openpyxl import load_workbook
+from excel.audit_summary import AuditSummary, XMLAudit, summarize
+
+
+def _chunk(records):
+    return (
+        "<Records>" +
+        "".join(
+            f"<Record><Student_ID>{student}</Student_ID><Institution>{institution}</Institution>"
+            + (f"<Received>{received}</Received>" if received else "")
+            + "</Record>"
+            for student, institution, received in records
+        ) +
+        "</Records>"
+    ).encode("utf-8")
+
+
+def test_summary_of_chunks(tmp_path):
+    """
+    Four records over two chunks, one without a date.
+    """
+    
+    settings = {"audit_group_by": ["Institution"], "output_dir": str(tmp_path)}
+    audit = XMLAudit(settings=settings)
+    first = audit.convert(
+        str(tmp_path / "chunk_1_transformed.xml"),
+        data=_chunk([("S1", "ECC", "2019-05-20"), ("S2", "ECC", "2021-12-01-05:00")])
+    )
+    second = tmp_path / "chunk_2_transformed.xml"
+    second.write_bytes(_chunk([("S3", "UB", None), ("S1", "ECC", "2018-01-15")]))
+    
+    excel_path, json_path = summarize(settings, [first, audit.convert(str(second))])
+    
+    with open(json_path, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+    
+    assert summary["records"] == 4
+    assert summary["chunks"] == 2
+    assert summary["fields"]["Student_ID"]["distinct"] == 3
+    assert summary["fields"]["Received"]["fill_rate"] == 0.75
+    assert summary["fields"]["Received"]["min_date"] == "2018-01-15"
+    assert summary["fields"]["Received"]["max_date"] == "2021-12-01"
+    assert summary["groups"] == {"Institution": {"ECC": 3, "UB": 1}}
+    assert summary["record_types"] == {"Record": 4}
+    
+    assert load_workbook(excel_path).sheetnames == ["Summary", "Fields", "Groups"]
+
+
+def test_distinct_estimate():
+    """
+    20000 distinct IDs in two halves with an exact limit of 100.
+    """
+    
+    halves = []
+    for start in (0, 10000):
+        half = AuditSummary(exact_limit=100)
+        for record in range(start, start + 10000):
+            half.add(etree.fromstring(f"<Record><Student_ID>S{record:07d}</Student_ID></Record>"))
+        halves.append(half)
+    
+    total = AuditSummary(exact_limit=100)
+    for half in halves:
+        total.merge(half)
+    
+    assert halves[0].fields["Student_ID"].hll is not None
+    assert abs(halves[0].fields["Student_ID"].distinct - 10000) < 500
+    assert abs(total.fields["Student_ID"].distinct - 20000) < 1000
+    assert total.fields["Student_ID"].filled == 20000
+
+
+@pytest.mark.parametrize("list_mode", ["join", "explode", "index", "child"])
+def test_store_matches_xml_fields(tmp_path, list_mode):
+    """
+    Two records with repeated Degree groups and Course leaves.
+    """
+    
+    data = (
+        b"<Records>"
+        b"<Record a='1'><ID>S1</ID>"
+        b"<Degree t='x'><Name>BA</Name><Year>2019</Year></Degree>"
+        b"<Degree t='y'><Name>MA</Name></Degree>"
+        b"<Course>C1</Course><Course>C2</Course></Record>"
+        b"<Record><ID>S2</ID><Degree><Name>AS</Name></Degree><Course>C3</Course></Record>"
+        b"</Records>"
+    )
+    fields = []
+    for column_store in (False, True):
+        settings = {
+            "list_mode": list_mode,
+            "list_elements": ["Degree", "Course"],
+            "column_store": column_store,
+        }
+        xml_path = tmp_path / f"chunk_{int(column_store) + 1}_transformed.xml"
+        with open(XMLAudit(settings=settings).convert(str(xml_path), data=data)) as f:
+            summary = AuditSummary.from_json(json.load(f))
+        fields.append({name: stats.filled for name, stats in summary.fields.items()})
+    
+    assert fields[0] == fields[1]
@@ -0,0 +1,159 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_column_schema.py
+ Purpose: Contain test functions for column_schema.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_xsd_group_refs for xs:group and
+                    xs:attributeGroup references. ECC - fendingers
+*******************************************************************************
+ test_xsd_columns(): The XSD gives every leaf and attribute path in schema
+ order, and workbooks with different records share that layout.
+ test_xsd_group_refs(): Columns declared in a named group and attribute
+ group are expanded where they are referenced.
+ test_scan_cached(): A scanned schema is used for every chunk of the run
+ and reused by the next run of the same input.
+*******************************************************************************
+"""
+
+import os
+import pandas as pd
+from excel.column_schema import ColumnSchema
+from excel.xml_to_excel import XMLToExcel
+from transform.xslt_transformer import XSLTTransformer
+from tests.conftest import make_records
+
+
+XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:complexType name="IDType">
+    <xs:simpleContent>
+      <xs:extension base="xs:string">
+        <xs:attribute name="type" type="xs:string"/>
+      </xs:extension>
+    </xs:simpleContent>
+  </xs:complexType>
+  <xs:complexType name="InstitutionType">
+    <xs:sequence>
+      <xs:element name="ID" type="IDType"/>
+      <xs:element name="Name" type="xs:string" minOccurs="0"/>
+    </xs:sequence>
+  </xs:complexType>
+  <xs:element name="Note" type="xs:string"/>
+  <xs:element name="Record">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="Student_ID" type="xs:string"/>
+        <xs:element name="Institution" type="InstitutionType"/>
+        <xs:element ref="Note" minOccurs="0"/>
+      </xs:sequence>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+def test_xsd_columns(tmp_path):
+    """
+    Two files whose records have different fields.
+    """
+    
+    xsd_path = tmp_path / "records.xsd"
+    xsd_path.write_text(XSD, encoding="utf-8")
+    schema = ColumnSchema.from_xsd(str(xsd_path), "Record")
+    
+    assert schema.columns == [
+        "Student_ID", "Institution.ID@type", "Institution.ID", "Institution.Name", "Note"
+    ]
+    
+    schema_path = str(tmp_path / "columns.json")
+    schema.save(schema_path)
+    converter = XMLToExcel(settings={"column_schema_file": schema_path})
+    
+    first = tmp_path / "chunk_1_transformed.xml"
+    first.write_bytes(
+        b"<Records><Record><Student_ID>S1</Student_ID><Note>late</Note>"
+        b"<Extra>x</Extra></Record></Records>"
+    )
+    second = tmp_path / "chunk_2_transformed.xml"
+    second.write_bytes(
+        b'<Records><Record><Student_ID>S2</Student_ID><Institution>'
+        b'<ID type="College">I2</ID></Institution></Record></Records>'
+    )
+    
+    frames = [pd.read_excel(converter.convert(str(path)), dtype=str) for path in (first, second)]
+    
+    assert list(frames[0].columns) == schema.columns
+    assert list(frames[1].columns) == schema.columns
+    assert frames[0].loc[0, "Note"] == "late"
+    assert frames[1].loc[0, "Institution.ID"] == "I2"
+    assert frames[1].loc[0, "Institution.ID@type"] == "College"
+
+
+GROUP_XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:attributeGroup name="Audit">
+    <xs:attribute name="updated" type="xs:date"/>
+  </xs:attributeGroup>
+  <xs:group name="Degree">
+    <xs:sequence>
+      <xs:element name="Degree" type="xs:string"/>
+      <xs:element name="Awarded" type="xs:date" minOccurs="0"/>
+    </xs:sequence>
+  </xs:group>
+  <xs:element name="Record">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="Student_ID" type="xs:string"/>
+        <xs:group ref="Degree"/>
+      </xs:sequence>
+      <xs:attributeGroup ref="Audit"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+def test_xsd_group_refs(tmp_path):
+    """
+    The group's elements come in its place; the attribute group's first.
+    """
+    
+    xsd_path = tmp_path / "groups.xsd"
+    xsd_path.write_text(GROUP_XSD, encoding="utf-8")
+    
+    assert ColumnSchema.from_xsd(str(xsd_path), "Record").columns == [
+        "@updated", "Student_ID", "Degree", "Awarded"
+    ]
+
+
+def test_scan_cached(settings, tmp_path):
+    """
+    Two chunks, scanned once; a second transformer finds the saved schema.
+    """
+    
+    settings = dict(settings, column_schema="scan", transform_workers=1)
+    input_path = os.path.join(settings["input_dir"], "extract.xml")
+    chunks = []
+    for idx in range(1, 3):
+        chunk_path = tmp_path / "output" / f"chunk_{idx}.xml"
+        chunk_path.write_bytes(make_records(3))
+        chunks.append(str(chunk_path))
+    
+    transformer = XSLTTransformer(settings)
+    schema_path = transformer.prepare_columns(input_path, chunks)
+    
+    assert ColumnSchema.load(schema_path).columns == ["Student_ID", "Institution"]
+    
+    for excel_path in transformer.transform_many(chunks, convert=True):
+        assert list(pd.read_excel(excel_path).columns) == ["Student_ID", "Institution"]
+    
+    modified = os.stat(schema_path).st_mtime_ns
+    assert XSLTTransformer(settings).prepare_columns(input_path, chunks) == schema_path
+    assert os.stat(schema_path).st_mtime_ns == modified
@@ -0,0 +1,122 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_column_store.py
+ Purpose: Contain test functions for column_store.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_store_built_in_batches: columns are written
+                    to disk as the store is built. ECC - fendingers
+*******************************************************************************
+ test_workbook_from_store(): Workbooks written from the store match the
+ ones written from the XML, and the store is reused once the XML is gone.
+ test_audit_from_store(): The audit summary of a store matches the one
+ of the XML.
+ test_store_built_in_batches(): A store flushed every two rows holds the
+ same values, including a column first seen after several flushes.
+*******************************************************************************
+"""
+
+import io
+import json
+import os
+from openpyxl import load_workbook
+import excel.column_store as store_mod
+from excel.audit_summary import XMLAudit, summarize
+from excel.column_store import ColumnStore, column_store_path, MANIFEST
+from excel.flatten import Flattener
+from excel.xml_to_excel import XMLToExcel, iter_records
+
+
+TRANSFORMED = b"""<Records>
+  <Record>
+    <Student_ID>S1</Student_ID>
+    <Education>
+      <Degree type="Associate"><ID>AS</ID><Received>2019-05-20</Received></Degree>
+      <Degree><ID>BS</ID><Received>2021-05-18</Received></Degree>
+    </Education>
+  </Record>
+  <Record>
+    <Student_ID>S2</Student_ID>
+    <Note>late</Note>
+  </Record>
+  <Record>
+    <Institution>ECC</Institution>
+  </Record>
+</Records>
+"""
+
+
+def _sheets(excel_path):
+    wb = load_workbook(excel_path)
+    return {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in wb}
+
+
+def test_workbook_from_store(tmp_path):
+    """
+    Every list_mode, with and without the store.
+    """
+    
+    for list_mode in ("join", "explode", "index", "child"):
+        xml_path = tmp_path / f"chunk_{list_mode}_transformed.xml"
+        xml_path.write_bytes(TRANSFORMED)
+        
+        expected = _sheets(XMLToExcel(settings={"list_mode": list_mode}).convert(str(xml_path)))
+        converter = XMLToExcel(settings={"list_mode": list_mode, "column_store": True})
+        assert _sheets(converter.convert(str(xml_path))) == expected
+        
+        manifest = os.path.join(column_store_path(str(xml_path)), MANIFEST)
+        built = os.stat(manifest).st_mtime_ns
+        os.remove(xml_path)
+        assert _sheets(converter.convert(str(xml_path))) == expected
+        assert os.stat(manifest).st_mtime_ns == built
+
+
+def test_audit_from_store(tmp_path):
+    """
+    Handed over in memory, as the transform stage does. With list_mode
+    "child", each degree is a value of its own in the store too.
+    """
+    
+    settings = {"audit_group_by": ["Institution"], "list_mode": "child"}
+    data = TRANSFORMED
+    
+    summaries = []
+    for column_store in (False, True):
+        output_dir = tmp_path / str(column_store)
+        output_dir.mkdir()
+        audit = XMLAudit(settings=dict(settings, column_store=column_store))
+        audit_path = audit.convert(str(output_dir / "chunk_1_transformed.xml"), data=data)
+        _, json_path = summarize(settings, [audit_path], str(output_dir))
+        with open(json_path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+        summary.pop("generated")
+        summaries.append(summary)
+    
+    assert summaries[1] == summaries[0]
+    assert summaries[1]["fields"]["Education.Degree.ID"]["filled"] == 1
+    assert summaries[1]["fields"]["Education.Degree.ID"]["distinct"] == 2
+    assert summaries[1]["groups"] == {"Institution": {"ECC": 1, "": 2}}
+
+
+def test_store_built_in_batches(tmp_path, monkeypatch):
+    """
+    Seven records, the last with a Note, flushed two rows at a time.
+    """
+    
+    monkeypatch.setattr(store_mod, "BATCH_ROWS", 2)
+    records = b"".join(b"<Record><ID>%d</ID></Record>" % i for i in range(6))
+    data = b"<Records>" + records + b"<Record><Note>late</Note></Record></Records>"
+    
+    with io.BytesIO(data) as f:
+        store = ColumnStore.build(iter_records(f), str(tmp_path / "chunk.columns"), Flattener())
+        
+    assert store.columns() == ["ID", "Note"]
+    assert store.column("ID").values(0, 7) == ["0", "1", "2", "3", "4", "5", None]
+    assert store.column("Note").values(0, 7) == [None] * 6 + ["late"]
+    assert store.record_numbers().tolist() == list(range(1, 8))
@@ -0,0 +1,83 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_eib_writer.py
+ Purpose: Contain test functions for eib_writer.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_child_sheets_linked(): Repeating elements go to their own sheet,
+ linked to the parent row by Spreadsheet Key and numbered by Row ID.
+*******************************************************************************
+"""
+
+from openpyxl import load_workbook
+from excel.xml_to_excel import XMLToExcel
+
+
+TEMPLATE = """
+sheets:
+  - name: "Parent"
+    title_rows:
+      - ["Put Historical Academic Record"]
+    columns:
+      - header: "Student*"
+        path: "Student_ID"
+  - name: "Degrees"
+    group: "Degree"
+    columns:
+      - header: "Degree*"
+        path: "ID"
+      - header: "Type"
+        path: "ID/@type"
+"""
+
+TRANSFORMED = b"""<Records xmlns:wd="urn:com.workday/bsvc">
+  <wd:Record><wd:Student_ID>S1</wd:Student_ID>
+    <wd:Degree><wd:ID wd:type="Degree_ID">AS</wd:ID></wd:Degree>
+    <wd:Degree><wd:ID wd:type="Degree_ID">BS</wd:ID></wd:Degree>
+  </wd:Record>
+  <wd:Record><wd:Student_ID>S2</wd:Student_ID></wd:Record>
+  <wd:Record><wd:Student_ID>S3</wd:Student_ID>
+    <wd:Degree><wd:ID>MS</wd:ID></wd:Degree>
+  </wd:Record>
+</Records>
+"""
+
+
+def _rows(ws):
+    return [list(row) for row in ws.iter_rows(values_only=True)]
+
+
+def test_child_sheets_linked(tmp_path):
+    """
+    Three records with two, zero and one degrees.
+    """
+    
+    template_path = tmp_path / "eib_template.yaml"
+    template_path.write_text(TEMPLATE, encoding="utf-8")
+    xml_path = tmp_path / "chunk_1_transformed.xml"
+    xml_path.write_bytes(TRANSFORMED)
+    
+    converter = XMLToExcel(settings={"eib_template_path": str(template_path)})
+    wb = load_workbook(converter.convert(str(xml_path)))
+    
+    assert wb.sheetnames == ["Parent", "Degrees"]
+    assert _rows(wb["Parent"]) == [
+        ["Put Historical Academic Record", None],
+        ["Spreadsheet Key*", "Student*"],
+        [1, "S1"],
+        [2, "S2"],
+        [3, "S3"],
+    ]
+    assert _rows(wb["Degrees"]) == [
+        ["Spreadsheet Key*", "Row ID*", "Degree*", "Type"],
+        [1, 1, "AS", "Degree_ID"],
+        [1, 2, "BS", "Degree_ID"],
+        [3, 1, "MS", None],
+    ]
@@ -0,0 +1,106 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_flatten.py
+ Purpose: Contain test functions for flatten.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_list_modes(): A record with two degrees, flattened with every
+ list_mode.
+ test_child_sheets(): With list_mode "child", each repeating group gets a
+ sheet linked to the main sheet by Spreadsheet Key.
+*******************************************************************************
+"""
+
+from lxml import etree
+from openpyxl import load_workbook
+from excel.flatten import Flattener
+from excel.xml_to_excel import XMLToExcel
+
+
+RECORD = b"""<wd:Record xmlns:wd="urn:com.workday/bsvc">
+  <wd:Student_ID>S1</wd:Student_ID>
+  <wd:Education>
+    <wd:Degree wd:type="Associate"><wd:ID>AS</wd:ID><wd:Year>2019</wd:Year></wd:Degree>
+    <wd:Degree><wd:ID>BS</wd:ID></wd:Degree>
+  </wd:Education>
+  <wd:Honor>Dean's List</wd:Honor>
+</wd:Record>
+"""
+
+
+def test_list_modes():
+    """
+    Every mode agrees on the fields that do not repeat.
+    """
+    
+    record = etree.fromstring(RECORD)
+    
+    rows, children = Flattener("join").flatten(record)
+    assert rows == [{
+        "Student_ID": "S1",
+        "Education.Degree@type": "Associate",
+        "Education.Degree.ID": "AS; BS",
+        "Education.Degree.Year": "2019",
+        "Honor": "Dean's List",
+    }]
+    assert children == {}
+    
+    rows, _ = Flattener("index").flatten(record)
+    assert rows == [{
+        "Student_ID": "S1",
+        "Education.Degree[1]@type": "Associate",
+        "Education.Degree[1].ID": "AS",
+        "Education.Degree[1].Year": "2019",
+        "Education.Degree[2].ID": "BS",
+        "Honor": "Dean's List",
+    }]
+    
+    rows, _ = Flattener("explode").flatten(record)
+    assert [row["Education.Degree.ID"] for row in rows] == ["AS", "BS"]
+    assert [row["Honor"] for row in rows] == ["Dean's List", "Dean's List"]
+    assert "Education.Degree.Year" not in rows[1]
+    
+    rows, children = Flattener("child", list_elements=["Honor"]).flatten(record)
+    assert rows == [{"Student_ID": "S1"}]
+    assert children == {
+        "Education.Degree": [
+            {"@type": "Associate", "ID": "AS", "Year": "2019"},
+            {"ID": "BS"},
+        ],
+        "Honor": [{"Honor": "Dean's List"}],
+    }
+
+
+def test_child_sheets(tmp_path):
+    """
+    Two records; the second has no degrees.
+    """
+    
+    xml_path = tmp_path / "chunk_1_transformed.xml"
+    xml_path.write_bytes(
+        b"<Records>" + RECORD +
+        b'<wd:Record xmlns:wd="urn:com.workday/bsvc"><wd:Student_ID>S2</wd:Student_ID></wd:Record>'
+        b"</Records>"
+    )
+    
+    converter = XMLToExcel(settings={"list_mode": "child"})
+    wb = load_workbook(converter.convert(str(xml_path)))
+    
+    assert wb.sheetnames == ["Sheet", "Education.Degree"]
+    assert [list(row) for row in wb["Sheet"].iter_rows(values_only=True)] == [
+        ["Spreadsheet Key", "Student_ID", "Honor"],
+        [1, "S1", "Dean's List"],
+        [2, "S2", None],
+    ]
+    assert [list(row) for row in wb["Education.Degree"].iter_rows(values_only=True)] == [
+        ["Spreadsheet Key", "Row ID", "@type", "ID", "Year"],
+        [1, 1, "Associate", "AS", "2019"],
+        [1, 2, None, "BS", None],
+    ]
@@ -0,0 +1,108 @@
+"""
+*******************************************************************************
+ File: tests/test_excel/test_xml_to_excel.py
+ Purpose: Contain test functions for xml_to_excel.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_convert_many. ECC - fendingers
+    10/18/2026      Added test_xlsxwriter_engine, skipped without the
+                    optional xlsxwriter package. ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+*******************************************************************************
+ test_one_row_per_record(): Every record becomes a row, with nested,
+ attribute and missing fields in their own columns.
+ test_convert_many(): Files converted in a process pool come back in input
+ order, each with its own rows.
+ test_xlsxwriter_engine(): The xlsxwriter engine writes a workbook that
+ reads back the same as the openpyxl one.
+*******************************************************************************
+"""
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from excel.xml_to_excel import XMLToExcel
+
+
+TRANSFORMED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Records>
+  <Record>
+    <Student_ID>S00001</Student_ID>
+    <Institution type="College"><ID>I1</ID><Name>ECC</Name></Institution>
+  </Record>
+  <Record>
+    <Student_ID>S00002</Student_ID>
+    <Institution><ID>I2</ID></Institution>
+    <Note>late</Note>
+  </Record>
+</Records>
+"""
+
+
+def test_one_row_per_record(settings, tmp_path):
+    """
+    Two records give two rows; columns are the union in first-seen order.
+    """
+    
+    xml_path = tmp_path / "chunk_1_transformed.xml"
+    xml_path.write_bytes(TRANSFORMED)
+    
+    from_file = XMLToExcel(settings=settings).convert(str(xml_path))
+    df = pd.read_excel(from_file, dtype=str)
+    
+    assert list(df.columns) == [
+        "Student_ID", "Institution@type", "Institution.ID", "Institution.Name", "Note"
+    ]
+    assert df["Student_ID"].tolist() == ["S00001", "S00002"]
+    assert df["Institution.Name"].isna().tolist() == [False, True]
+    assert df["Note"].tolist()[1] == "late"
+    
+    # Handed over in memory, the workbook is the same
+    in_memory = XMLToExcel(settings=settings).convert(str(tmp_path / "chunk_2_transformed.xml"), data=TRANSFORMED)
+    pd.testing.assert_frame_equal(df, pd.read_excel(in_memory, dtype=str))
+
+
+def test_convert_many(tmp_path):
+    """
+    Three files on two processes.
+    """
+    
+    paths = []
+    for idx in range(1, 4):
+        xml_path = tmp_path / f"chunk_{idx}_transformed.xml"
+        xml_path.write_bytes(TRANSFORMED.replace(b"S0000", f"S{idx}".encode()))
+        paths.append(str(xml_path))
+    
+    converter = XMLToExcel(settings={"excel_workers": 2})
+    excel_paths = converter.convert_many(paths)
+    
+    assert excel_paths == [path.replace(".xml", ".xlsx") for path in paths]
+    for idx, excel_path in enumerate(excel_paths, 1):
+        df = pd.read_excel(excel_path, dtype=str)
+        assert df["Student_ID"].tolist() == [f"S{idx}1", f"S{idx}2"]
+
+
+def test_xlsxwriter_engine(tmp_path):
+    """
+    Same rows from both engines, read back with openpyxl.
+    """
+    
+    pytest.importorskip("xlsxwriter")
+    
+    sheets = []
+    for engine in ("openpyxl", "xlsxwriter"):
+        excel_path = XMLToExcel(settings={"excel_engine": engine}).convert(
+            str(tmp_path / f"chunk_{engine}_transformed.xml"), data=TRANSFORMED
+        )
+        wb = load_workbook(excel_path)
+        sheets.append([list(row) for row in wb.active.iter_rows(values_only=True)])
+        
+    assert sheets[1] == sheets[0]
+    assert sheets[1][2] == ["S00002", None, "I2", None, "late"]
@@ -0,0 +1 @@
+# Makes the test_pipeline package importable.
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+*******************************************************************************
+ File: tests/test_pipeline/test_batch.py
+ Purpose: Contain test functions for batch.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_mapping_engine_skips_stylesheet.
+                    ECC - fendingers
+    10/18/2026      Added test_inputs_sharing_a_folder. ECC - fendingers
+*******************************************************************************
+ test_batch_processes_every_input(): Runs three inputs, one of them broken,
+ and checks the per-input folders and the run summary.
+ test_mapping_engine_skips_stylesheet(): Workers only compile the stylesheet
+ for the XSLT engine.
+ test_inputs_sharing_a_folder(): a.xml and a.xml.gz are refused before any
+ work starts.
+*******************************************************************************
+"""
+
+import gzip
+import json
+import os
+import pytest
+import pipeline.batch as batch
+from pipeline.batch import run_batch, SUMMARY_FILE
+from tests.conftest import make_records
+
+
+def test_batch_processes_every_input(settings):
+    """
+    Two good inputs finish in their own folders; the broken one is reported
+    as failed without stopping the run.
+    """
+    
+    input_dir = settings["input_dir"]
+    with open(os.path.join(input_dir, "second.xml"), "wb") as f:
+        f.write(make_records(3))
+    with open(os.path.join(input_dir, "broken.xml"), "wb") as f:
+        f.write(b"<not closed")
+        
+    settings["batch_max_workers"] = 2
+    settings["batch_max_memory_mb"] = 1024
+    settings["batch_job_memory_mb"] = 512
+    
+    summary = run_batch(settings)
+    status = {os.path.basename(job["input"]): job for job in summary}
+    
+    assert status["broken.xml"]["status"] == "failed"
+    assert status["extract.xml"]["status"] == "complete"
+    assert status["extract.xml"]["records"] == 5
+    assert status["second.xml"]["records"] == 3
+    
+    for name in ("extract", "second"):
+        excel_files = status[name + ".xml"]["excel_files"]
+        
+        assert excel_files
+        assert all(
+            os.path.dirname(f) == os.path.join(settings["output_dir"], name)
+            for f in excel_files
+        )
+        
+    with open(os.path.join(settings["output_dir"], SUMMARY_FILE)) as f:
+        report = json.load(f)
+        
+    assert report["inputs"] == 3
+    assert report["failed"] == 1
+    assert report["records"] == 8
+
+
+def test_mapping_engine_skips_stylesheet(settings, monkeypatch):
+    """
+    _init_worker compiles xslt_path for the XSLT engine only.
+    """
+    
+    compiled = []
+    monkeypatch.setattr(batch, "get_stylesheet", compiled.append)
+    
+    batch._init_worker(dict(settings, transform_engine="mapping"))
+    
+    assert compiled == []
+    
+    batch._init_worker(settings)
+    
+    assert compiled == [settings["xslt_path"]]
+
+
+def test_inputs_sharing_a_folder(settings):
+    """
+    extract.xml.gz next to extract.xml would reuse its folder and journal.
+    """
+    
+    with gzip.open(os.path.join(settings["input_dir"], "extract.xml.gz"), "wb") as f:
+        f.write(make_records(3))
+        
+    with pytest.raises(ValueError, match="share the output folder"):
+        run_batch(settings)
+        
+    assert not os.listdir(settings["output_dir"])
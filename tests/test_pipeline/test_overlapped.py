@@ -0,0 +1,51 @@
+"""
+*******************************************************************************
+ File: tests/test_pipeline/test_overlapped.py
+ Purpose: Contain test functions for overlapped.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+*******************************************************************************
+ test_overlapped_matches_serial(): Runs the serial stages and the overlapped
+ pipeline on the same input and compares the Excel output.
+*******************************************************************************
+"""
+
+import pandas as pd
+from pipeline.overlapped import run_overlapped
+from splitting.splitter import XMLSplitter
+from transform.xslt_transformer import XSLTTransformer
+from excel.xml_to_excel import XMLToExcel
+
+
+def test_overlapped_matches_serial(settings):
+    """
+    Splits one record per chunk so several chunks are in flight, then checks
+    that both modes give the same workbooks in the same order.
+    """
+    
+    # Roughly 100 bytes, so every record closes a chunk
+    settings["max_file_size_mb"] = 0.0001
+    
+    chunk_files = XMLSplitter(settings).split()
+    transformer = XSLTTransformer(settings)
+    converter = XMLToExcel(settings=settings)
+    serial = [
+        pd.read_excel(converter.convert(transformer.apply_xslt(f)))
+        for f in chunk_files
+    ]
+    
+    overlapped_files = run_overlapped(settings)
+    
+    assert len(chunk_files) > 1
+    assert len(overlapped_files) == len(serial)
+    
+    for expected, path in zip(serial, overlapped_files):
+        pd.testing.assert_frame_equal(expected, pd.read_excel(path))
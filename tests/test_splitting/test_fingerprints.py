@@ -0,0 +1,177 @@
+"""
+*******************************************************************************
+ File: tests/test_splitting/test_fingerprints.py
+ Purpose: Contain test functions for fingerprints.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_quarantined_records_are_emitted_again: a run
+                    with a quarantined chunk must not move the baseline.
+                    ECC - fendingers
+    10/18/2026      Added test_pool_quarantine_keeps_baseline for chunks that
+                    fail in worker processes. ECC - fendingers
+    10/18/2026      Added test_delta_key_must_be_unique: delta_key no longer
+                    falls back to partition_key. ECC - fendingers
+*******************************************************************************
+ test_delta_between_runs(): Runs delta mode on two extracts and checks that
+ the second run writes only new and changed records and lists the removed
+ keys.
+ test_quarantined_records_are_emitted_again(): Quarantines a chunk in a
+ delta run and checks its records are emitted by the next run.
+ test_pool_quarantine_keeps_baseline(): The same through run_pipeline, with
+ the chunk failing in a transform pool worker or a batch worker.
+ test_delta_key_must_be_unique(): Delta mode without delta_key, or with a
+ key shared by two records, stops with an error.
+*******************************************************************************
+"""
+
+import os
+import pandas as pd
+import pytest
+from lxml import etree
+import main
+import utils.xml_utils as xml_mod
+from splitting.splitter import XMLSplitter
+from splitting.fingerprints import REMOVED_KEYS_FILE
+from pipeline.overlapped import run_overlapped
+from tests.conftest import make_records, TEST_XSLT
+
+
+def _delta_run(settings):
+    splitter = XMLSplitter(settings)
+    chunk_files = splitter.split()
+    splitter.commit_fingerprints()
+    
+    ids = [
+        record[0].text
+        for path in chunk_files
+        for record in etree.parse(path).getroot()
+    ]
+    
+    with open(os.path.join(settings["output_dir"], REMOVED_KEYS_FILE)) as f:
+        removed = f.read().split()
+        
+    return ids, removed, splitter.delta.counts
+
+
+def test_delta_between_runs(settings):
+    """
+    Night 1 loads everything. Night 2 drops S00000, changes S00002 and adds
+    S00005, so only S00002 and S00005 are written.
+    """
+    
+    settings["split_mode"] = "delta"
+    settings["delta_key"] = "wd:Student_ID"
+    input_path = os.path.join(settings["input_dir"], "extract.xml")
+    
+    ids, removed, counts = _delta_run(settings)
+    
+    assert ids == ["S00000", "S00001", "S00002", "S00003", "S00004"]
+    assert removed == []
+    
+    night_2 = make_records(6)
+    end_tag = b"</wd:Historical_Academic_Record>"
+    first_start = night_2.index(b"<wd:Historical_Academic_Record>")
+    first_end = night_2.index(end_tag) + len(end_tag)
+    night_2 = night_2[:first_start] + night_2[first_end:]
+    night_2 = night_2.replace(b"INST_2</wd:Institution>", b"INST_9</wd:Institution>", 1)
+    with open(input_path, "wb") as f:
+        f.write(night_2)
+        
+    ids, removed, counts = _delta_run(settings)
+    
+    assert ids == ["S00002", "S00005"]
+    assert removed == ["S00000"]
+    assert counts == {"new": 1, "changed": 1, "unchanged": 3, "removed": 1}
+
+
+def _stop_on(settings, student_id):
+    """
+    Makes the test stylesheet terminate on student_id.
+    """
+    
+    broken = TEST_XSLT.replace(
+        "<Record>",
+        "<Record><xsl:if test=\"*[local-name()='Student_ID'] = "
+        f"'{student_id}'\"><xsl:message terminate=\"yes\">bad record"
+        "</xsl:message></xsl:if>",
+        1
+    )
+    with open(settings["xslt_path"], "w", encoding="utf-8") as f:
+        f.write(broken)
+
+
+def test_quarantined_records_are_emitted_again(settings):
+    """
+    The stylesheet stops on S00002, so the only chunk is quarantined. Once
+    it is fixed, the next delta run still emits every record.
+    """
+    
+    settings["split_mode"] = "delta"
+    settings["delta_key"] = "wd:Student_ID"
+    settings["transform_workers"] = 1
+    
+    _stop_on(settings, "S00002")
+    
+    assert run_overlapped(settings) == []
+    assert os.listdir(os.path.join(settings["output_dir"], "quarantine"))
+    
+    with open(settings["xslt_path"], "w", encoding="utf-8") as f:
+        f.write(TEST_XSLT)
+        
+    excel_files = run_overlapped(settings)
+    
+    assert len(excel_files) == 1
+    assert len(pd.read_excel(excel_files[0])) == 5
+
+
+@pytest.mark.parametrize("mode", ["serial", "batch"])
+def test_pool_quarantine_keeps_baseline(settings, monkeypatch, mode):
+    """
+    One record per chunk, transformed on two workers in serial mode; the
+    chunk of S00002 fails. The next run emits all five records.
+    """
+    
+    settings.update(
+        pipeline_mode=mode,
+        split_mode="delta",
+        delta_key="wd:Student_ID",
+        max_file_size_mb=0.0001,
+        transform_workers=2,
+        batch_max_workers=1,
+    )
+    monkeypatch.setattr(xml_mod, "get_settings", lambda: settings)
+    _stop_on(settings, "S00002")
+    
+    assert len(main.run_pipeline()) == 4
+    
+    with open(settings["xslt_path"], "w", encoding="utf-8") as f:
+        f.write(TEST_XSLT)
+        
+    excel_files = main.run_pipeline()
+    
+    assert sum(len(pd.read_excel(path)) for path in excel_files) == 5
+
+
+def test_delta_key_must_be_unique(settings):
+    """
+    Student IDs repeat every two records, so they cannot key a record.
+    """
+    
+    settings["split_mode"] = "delta"
+    settings["partition_key"] = "wd:Student_ID"
+    
+    with pytest.raises(ValueError, match="needs delta_key"):
+        XMLSplitter(settings).split()
+        
+    settings["delta_key"] = "wd:Student_ID"
+    with open(os.path.join(settings["input_dir"], "extract.xml"), "wb") as f:
+        f.write(make_records(5, students=2))
+        
+    with pytest.raises(ValueError, match="S00000 occurs on more than one record"):
+        XMLSplitter(settings).split()
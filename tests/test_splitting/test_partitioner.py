@@ -0,0 +1,73 @@
+"""
+*******************************************************************************
+ File: tests/test_splitting/test_partitioner.py
+ Purpose: Contain test functions for partitioner.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_partitioner_keeps_keys_together(): Same key, same partition, and
+ records without a key still get placed.
+ test_partition_split(): Splits a sample with repeating Student IDs into
+ balanced partitions with no student in two files.
+*******************************************************************************
+"""
+
+import os
+from lxml import etree
+from splitting.partitioner import HashPartitioner
+from splitting.splitter import XMLSplitter
+from tests.conftest import make_records
+
+
+def test_partitioner_keeps_keys_together():
+    """
+    A key keeps its partition even after loads shift.
+    """
+    
+    partitioner = HashPartitioner(4)
+    first = partitioner.assign("S00001")
+    partitioner.add(first, 10_000)
+    
+    assert partitioner.assign("S00001") == first
+    assert partitioner.assign(None) != first
+    assert partitioner.missing_keys == 1
+
+
+def test_partition_split(settings):
+    """
+    Every student appears in exactly one partition, and partitions are
+    within 25% of the mean size.
+    """
+    
+    input_path = os.path.join(settings["input_dir"], "extract.xml")
+    with open(input_path, "wb") as f:
+        f.write(make_records(2000, students=400))
+        
+    settings["split_mode"] = "partition"
+    settings["partitions"] = 4
+    settings["partition_key"] = "wd:Student_ID"
+    
+    part_files = XMLSplitter(settings).split()
+    
+    assert [os.path.basename(p) for p in part_files] == [
+        "part_1.xml", "part_2.xml", "part_3.xml", "part_4.xml"
+    ]
+    
+    owner = {}
+    sizes = []
+    for path in part_files:
+        root = etree.parse(path).getroot()
+        sizes.append(len(root))
+        
+        for record in root:
+            student = record[0].text
+            assert owner.setdefault(student, path) == path
+            
+    assert sum(sizes) == 2000
+    assert max(sizes) <= 1.25 * sum(sizes) / len(sizes)
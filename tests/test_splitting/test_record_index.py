@@ -0,0 +1,70 @@
+"""
+*******************************************************************************
+ File: tests/test_splitting/test_record_index.py
+ Purpose: Contain test functions for record_index.py
+ Source: tests/conftest.py provides the sample input
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_build_finds_records(): Checks that every offset pair frames one record.
+ test_sidecar_is_reused(): Saves the index, loads it back, and checks that a
+ changed input makes it stale.
+*******************************************************************************
+"""
+
+import os
+from lxml import etree
+from splitting.record_index import RecordIndex
+from tests.conftest import make_records
+
+
+def test_build_finds_records(tmp_path):
+    """
+    Builds an index and reads records back by number.
+    """
+    
+    input_path = tmp_path / "extract.xml"
+    input_path.write_bytes(make_records(7))
+    
+    index = RecordIndex.build(str(input_path), "Historical_Academic_Record")
+    
+    assert len(index) == 7
+    assert index.contiguous
+    
+    record = index.read_record(3)
+    
+    assert record.startswith(b"<wd:Historical_Academic_Record>")
+    assert record.endswith(b"</wd:Historical_Academic_Record>")
+    assert b"S00003" in record
+    
+    # Header and trailer around one record make a parseable document
+    doc = etree.fromstring(index.header() + record + index.trailer())
+    
+    assert len(doc[0]) == 1
+
+
+def test_sidecar_is_reused(tmp_path):
+    """
+    Loads a saved index and rejects it once the input changes.
+    """
+    
+    input_path = tmp_path / "extract.xml"
+    input_path.write_bytes(make_records(4))
+    
+    built = RecordIndex.load_or_build(str(input_path), "Historical_Academic_Record")
+    
+    assert os.path.exists(RecordIndex.sidecar_path(str(input_path)))
+    
+    loaded = RecordIndex.load(str(input_path), "Historical_Academic_Record")
+    
+    assert list(loaded.starts) == list(built.starts)
+    assert list(loaded.ends) == list(built.ends)
+    
+    input_path.write_bytes(make_records(6))
+    
+    assert RecordIndex.load(str(input_path), "Historical_Academic_Record") is None
@@ -0,0 +1,134 @@
+"""
+*******************************************************************************
+ File: tests/test_splitting/test_size_model.py
+ Purpose: Contain test functions for size_model.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_concurrent_record_outputs for batch workers
+                    sharing temp_dir. ECC - fendingers
+    10/18/2026      Added test_workbook_rows_eib_template: only main sheet
+                    data rows count. ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+*******************************************************************************
+ test_max_chunk_bytes(): Checks how EIB targets become a chunk byte limit.
+ test_calibrate_and_record(): Calibrates on the sample input, splits to a
+ workbook target, and saves the run's stats.
+ test_concurrent_record_outputs(): Processes recording runs at the same time
+ lose no update.
+ test_workbook_rows_eib_template(): Title rows and child sheets of an EIB
+ template workbook are not counted as rows.
+*******************************************************************************
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from splitting.size_model import SizeModel, record_outputs, header_rows, workbook_rows
+from splitting.splitter import XMLSplitter
+from transform.xslt_transformer import XSLTTransformer
+from excel.xml_to_excel import XMLToExcel
+
+
+def test_max_chunk_bytes():
+    """
+    1000 XML bytes made 10 rows and 500 xlsx bytes, so 5 rows fit in 500
+    XML bytes and 100 xlsx bytes fit in 200.
+    """
+    
+    model = SizeModel(xml_bytes=1000, rows=10, xlsx_bytes=500, chunks=1)
+    
+    assert model.predict(100) == (1, 50)
+    assert model.max_chunk_bytes(10_000, max_rows=5) == 500
+    assert model.max_chunk_bytes(10_000, max_rows=5, max_xlsx_bytes=100) == 200
+    assert model.max_chunk_bytes(150, max_rows=5) == 150
+    assert SizeModel().max_chunk_bytes(10_000, max_rows=5) == 10_000
+
+
+def test_calibrate_and_record(settings):
+    """
+    With no saved stats the splitter calibrates on a sample; the run's
+    output is then saved for the next run.
+    """
+    
+    settings["size_model_sample_records"] = 2
+    settings["eib_max_workbook_mb"] = 1
+    
+    chunk_files = XMLSplitter(settings).split()
+    
+    assert not os.path.exists(SizeModel.model_path(settings))
+    
+    transformer = XSLTTransformer(settings)
+    converter = XMLToExcel(settings=settings)
+    excel_files = [converter.convert(transformer.apply_xslt(f)) for f in chunk_files]
+    
+    record_outputs(settings, chunk_files, excel_files)
+    model = SizeModel.load(settings)
+    
+    assert model.calibrated
+    assert model.chunks == len(chunk_files)
+    assert model.rows >= len(chunk_files)
+
+
+def test_concurrent_record_outputs(settings):
+    """
+    Eight one-chunk runs recorded on four processes add up to 8 chunks.
+    """
+    
+    settings["eib_max_rows"] = 1000
+    chunk_files = XMLSplitter(settings).split()
+    excel_files = [
+        XMLToExcel(settings=settings).convert(XSLTTransformer(settings).apply_xslt(f))
+        for f in chunk_files
+    ]
+    
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(record_outputs, repeat(settings, 8), repeat(chunk_files, 8), repeat(excel_files, 8)))
+        
+    model = SizeModel.load(settings)
+    
+    assert model.chunks == 8 * len(chunk_files)
+    assert os.listdir(settings["temp_dir"]) == ["size_model.json"]
+
+
+TEMPLATE = """
+sheets:
+  - name: "Parent"
+    title_rows:
+      - ["Put Historical Academic Record"]
+      - ["Area", "Historical Academic Record Data"]
+    columns:
+      - header: "Student*"
+        path: "Student_ID"
+  - name: "Degrees"
+    group: "Degree"
+    columns:
+      - header: "Degree*"
+        path: "ID"
+"""
+
+
+def test_workbook_rows_eib_template(tmp_path):
+    """
+    Two records with three degrees: two rows, not the five of all sheets.
+    """
+    
+    template_path = tmp_path / "eib_template.yaml"
+    template_path.write_text(TEMPLATE, encoding="utf-8")
+    settings = {"eib_template_path": str(template_path)}
+    
+    excel_path = XMLToExcel(settings=settings).convert(
+        str(tmp_path / "chunk_1_transformed.xml"),
+        data=b"<Records><Record><Student_ID>S1</Student_ID><Degree><ID>AS</ID></Degree>"
+             b"<Degree><ID>BS</ID></Degree></Record><Record><Student_ID>S2</Student_ID>"
+             b"<Degree><ID>MS</ID></Degree></Record></Records>"
+    )
+    
+    assert header_rows(settings) == 3
+    assert workbook_rows(excel_path, header_rows(settings)) == 2
@@ -1,2 +1,172 @@
+"""
+*******************************************************************************
+ File: tests/test_splitting/test_splitter.py
+ Purpose: Contain test functions for splitter.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+    10/18/2026      Added test_uneven_records_stay_under_cap.
+                    ECC - fendingers
+*******************************************************************************
+ test_splitter_runs(): Placeholder.
+ test_prune_keeps_tree_bounded(): Checks that pruned records do not stay
+ attached to the parse tree.
+ test_split_reports_stats(): Checks the throughput and memory report.
+ test_chunks_have_envelope(): Checks that every chunk parses on its own and
+ keeps the Workday namespace.
+ test_indexed_matches_stream(): Checks that the indexed parallel split writes
+ the same records as the streaming split.
+ test_compressed_input_and_chunks(): Splits a .gz input into .gz chunks and
+ runs them through the transform and Excel stages.
+ test_uneven_records_stay_under_cap(): Small records followed by large ones,
+ and random sizes, never push a chunk over max_file_size_mb.
+*******************************************************************************
+"""
+
+import gzip
+import io
+import os
+import random
+import re
+from lxml import etree
+from splitting.splitter import XMLSplitter
+from utils.xml_utils import prune_element
+from transform.xslt_transformer import XSLTTransformer
+from excel.xml_to_excel import XMLToExcel
+from tests.conftest import make_records, WD_NS
+
+
 def test_splitter_runs():
     assert True  # placeholder
+
+
+def test_prune_keeps_tree_bounded():
+    """
+    After every record is pruned, only the last one is left in the tree.
+    """
+    
+    context = etree.iterparse(
+        io.BytesIO(make_records(50)),
+        events=("end",),
+        tag="{*}Historical_Academic_Record"
+    )
+    
+    for _, elem in context:
+        prune_element(elem)
+        
+    records = context.root.find("{*}Response_Data")
+    
+    assert len(records) == 1
+
+
+def test_split_reports_stats(settings):
+    """
+    Splits the sample input and checks the stats left on the splitter.
+    """
+    
+    splitter = XMLSplitter(settings)
+    chunk_files = splitter.split()
+    
+    assert splitter.stats["records"] == 5
+    assert splitter.stats["chunks"] == len(chunk_files)
+    assert splitter.stats["records_per_second"] > 0
+
+
+def test_chunks_have_envelope(settings):
+    """
+    Splits into several chunks and parses each one as a full document.
+    """
+    
+    settings["max_file_size_mb"] = 0.0003
+    chunk_files = XMLSplitter(settings).split()
+    
+    assert len(chunk_files) > 1
+    
+    total = 0
+    for path in chunk_files:
+        root = etree.parse(path).getroot()
+        
+        assert root.tag == "{" + WD_NS + "}Response_Data"
+        assert root.nsmap["wd"] == WD_NS
+        assert os.path.getsize(path) <= 0.0003 * 1024 * 1024
+        total += len(root)
+        
+    assert total == 5
+
+
+def test_indexed_matches_stream(settings):
+    """
+    Splits the same input in both modes and compares the records.
+    """
+    
+    settings["max_file_size_mb"] = 0.0005
+    stream_files = XMLSplitter(settings).split()
+    stream = [etree.tostring(r) for p in stream_files for r in etree.parse(p).getroot()]
+    
+    settings["split_mode"] = "indexed"
+    settings["split_workers"] = 2
+    indexed_files = XMLSplitter(settings).split()
+    indexed = [etree.tostring(r) for p in indexed_files for r in etree.parse(p).getroot()]
+    
+    assert len(indexed_files) > 1
+    assert indexed == stream
+
+
+def test_compressed_input_and_chunks(settings):
+    """
+    No stage needs the input or the chunks decompressed on disk.
+    """
+    
+    input_dir = settings["input_dir"]
+    os.remove(os.path.join(input_dir, "extract.xml"))
+    with gzip.open(os.path.join(input_dir, "extract.xml.gz"), "wb") as f:
+        f.write(make_records())
+        
+    settings["temp_compression"] = "gz"
+    chunk_files = XMLSplitter(settings).split()
+    
+    assert all(path.endswith(".xml.gz") for path in chunk_files)
+    
+    transformed = XSLTTransformer(settings).apply_xslt(chunk_files[0])
+    excel_path = XMLToExcel(settings=settings).convert(transformed)
+    
+    assert transformed.endswith("_transformed.xml.gz")
+    assert excel_path.endswith("_transformed.xlsx")
+    assert os.path.exists(excel_path)
+
+
+def test_uneven_records_stay_under_cap(settings):
+    """
+    A record is only added to the open chunk when it and the closing tag
+    still fit, whatever the records before it looked like.
+    """
+    
+    cap = 8000
+    settings["max_file_size_mb"] = cap / (1024 * 1024)
+    input_path = os.path.join(settings["input_dir"], "extract.xml")
+    rng = random.Random(7)
+    
+    for sizes in ([10] * 30 + [6000] * 6, [rng.randint(10, 3000) for _ in range(60)]):
+        notes = iter(sizes)
+        records = re.sub(
+            b"</wd:Institution>",
+            lambda m: m.group(0) + b"<wd:Note>" + b"x" * next(notes) + b"</wd:Note>",
+            make_records(len(sizes))
+        )
+        with open(input_path, "wb") as f:
+            f.write(records)
+        
+        chunk_files = XMLSplitter(settings).split(input_path)
+        
+        assert max(os.path.getsize(path) for path in chunk_files) <= cap
+        assert sum(len(etree.parse(path).getroot()) for path in chunk_files) == len(sizes)
+        
+        for path in chunk_files:
+            os.remove(path)
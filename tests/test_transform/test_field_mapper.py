@@ -0,0 +1,81 @@
+"""
+*******************************************************************************
+ File: tests/test_transform/test_field_mapper.py
+ Purpose: Contain test functions for field_mapper.py
+ Source: tests/conftest.py provides the sample records, stylesheet and mapping
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_mapping_matches_xslt(): The mapping engine gives the same output as the
+ equivalent stylesheet.
+ test_mapping_nested_targets(): Predicates, attributes, nested targets and
+ missing sources.
+*******************************************************************************
+"""
+
+from lxml import etree
+from tests.conftest import make_records, WD_NS
+from transform.field_mapper import FieldMapper
+from transform.xslt_transformer import XSLTTransformer
+
+
+def _canonical(path):
+    parser = etree.XMLParser(remove_blank_text=True)
+    return etree.tostring(etree.parse(path, parser), method="c14n")
+
+
+def test_mapping_matches_xslt(settings, tmp_path):
+    """
+    transform_engine "mapping" and "xslt" produce the same document.
+    """
+    
+    results = {}
+    
+    for engine in ("xslt", "mapping"):
+        chunk = tmp_path / f"{engine}.xml"
+        chunk.write_bytes(make_records(25))
+        
+        transformer = XSLTTransformer({**settings, "transform_engine": engine})
+        results[engine] = _canonical(transformer.apply_xslt(str(chunk)))
+        
+    assert results["mapping"] == results["xslt"]
+    assert results["mapping"].count(b"<Record>") == 25
+
+
+def test_mapping_nested_targets(tmp_path):
+    """
+    Values land under nested targets; a missing source gives an empty element.
+    """
+    
+    mapper = FieldMapper({
+        "namespaces": {"wd": WD_NS},
+        "record": "wd:Record",
+        "fields": [
+            {"source": "wd:Ref/wd:ID[@wd:type='Student_ID']", "target": "wd:Student/wd:ID"},
+            {"source": "wd:Note", "target": "wd:Note"},
+            {"source": "wd:Ref/wd:ID/@wd:type", "target": "wd:Student/wd:Type"},
+        ],
+    }, "Historical_Academic_Record")
+    
+    chunk = tmp_path / "chunk.xml"
+    chunk.write_text(
+        f'<wd:Records xmlns:wd="{WD_NS}"><wd:Historical_Academic_Record><wd:Ref>'
+        '<wd:ID wd:type="WID">abc</wd:ID><wd:ID wd:type="Student_ID">S&amp;1</wd:ID>'
+        "</wd:Ref></wd:Historical_Academic_Record></wd:Records>",
+        encoding="utf-8"
+    )
+    
+    out = etree.parse(mapper.map_file(str(chunk), str(tmp_path / "out.xml"))).getroot()
+    record = out[0]
+    
+    assert out.tag == "Records"
+    assert record.tag == f"{{{WD_NS}}}Record"
+    assert [child.tag.split("}")[1] for child in record] == ["Student", "Note"]
+    assert record.findtext(f"{{{WD_NS}}}Student/{{{WD_NS}}}ID") == "S&1"
+    assert record.findtext(f"{{{WD_NS}}}Student/{{{WD_NS}}}Type") == "WID"
+    assert record.find(f"{{{WD_NS}}}Note").text is None
@@ -0,0 +1,71 @@
+"""
+*******************************************************************************
+ File: tests/test_transform/test_schema_validator.py
+ Purpose: Contain test functions for schema_validator.py
+ Source: tests/conftest.py provides the sample records and stylesheet; the
+ schema is coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_invalid_records_quarantined(): Invalid records go to the quarantine
+ file with their errors; valid records go on to the next stage.
+*******************************************************************************
+"""
+
+import os
+from lxml import etree
+from tests.conftest import make_records
+from transform.xslt_transformer import XSLTTransformer
+
+
+RECORD_XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="Record">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="Student_ID">
+          <xs:simpleType>
+            <xs:restriction base="xs:string">
+              <xs:pattern value="S[0-9]{5}"/>
+            </xs:restriction>
+          </xs:simpleType>
+        </xs:element>
+        <xs:element name="Institution" type="xs:string"/>
+      </xs:sequence>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+def test_invalid_records_quarantined(settings, tmp_path):
+    """
+    One bad Student_ID in six records: five records pass, one is quarantined.
+    """
+    
+    xsd_path = tmp_path / "record.xsd"
+    xsd_path.write_text(RECORD_XSD, encoding="utf-8")
+    
+    chunk = tmp_path / "chunk_1.xml"
+    chunk.write_bytes(make_records(6).replace(b"S00002", b"BAD-2"))
+    
+    transformer = XSLTTransformer({**settings, "xsd_path": str(xsd_path)})
+    transformed = transformer.transform_many([str(chunk)])
+    
+    records = etree.parse(transformed[0]).getroot()
+    assert records.tag == "Records"
+    assert [rec.findtext("Student_ID") for rec in records] == [
+        "S00000", "S00001", "S00003", "S00004", "S00005"
+    ]
+    
+    quarantine_path = os.path.join(settings["output_dir"], "quarantine", "chunk_1_invalid.xml")
+    invalid = etree.parse(quarantine_path).getroot()
+    
+    assert len(invalid) == 1
+    assert invalid[0].findtext("Record/Student_ID") == "BAD-2"
+    assert "S[0-9]{5}" in invalid[0].findtext("Errors/Error")
@@ -0,0 +1,45 @@
+"""
+*******************************************************************************
+ File: tests/test_transform/test_stylesheet_cache.py
+ Purpose: Contain test functions for stylesheet_cache.py
+ Source: tests/conftest.py provides the test stylesheet
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_cache_recompiles_on_change(): Same content gives the same compiled
+ stylesheet, even after a touch; new content is recompiled.
+*******************************************************************************
+"""
+
+import os
+import transform.stylesheet_cache as cache_mod
+from transform.xslt_transformer import XSLTTransformer
+
+
+def test_cache_recompiles_on_change(settings):
+    """
+    Two transformers share one compiled stylesheet until the file changes.
+    """
+    
+    cache_mod.clear()
+    xslt_path = settings["xslt_path"]
+    
+    first = XSLTTransformer(settings).transform
+    
+    assert XSLTTransformer(settings).transform is first
+    
+    # A touch alone is not a change
+    stat = os.stat(xslt_path)
+    os.utime(xslt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    assert cache_mod.get_stylesheet(xslt_path) is first
+    
+    with open(xslt_path, "a", encoding="utf-8") as f:
+        f.write("<!-- edited -->\n")
+        
+    assert cache_mod.get_stylesheet(xslt_path) is not first
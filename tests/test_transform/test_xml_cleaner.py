@@ -0,0 +1,83 @@
+"""
+*******************************************************************************
+ File: tests/test_transform/test_xml_cleaner.py
+ Purpose: Contain test functions for xml_cleaner.py
+ Source: tests/conftest.py provides the sample records and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_remove_empty_elements_deep(): Deeper than the recursion limit, and
+ parents left empty are removed too.
+ test_normalize_namespaces(): One wd: declaration per record.
+ test_split_cleans_records(): The splitter strips namespaces and empty
+ elements in the split pass.
+*******************************************************************************
+"""
+
+import sys
+from lxml import etree
+from tests.conftest import make_records, WD_NS
+from splitting.splitter import XMLSplitter
+from transform.xml_cleaner import remove_empty_elements, normalize_namespaces
+
+
+def test_remove_empty_elements_deep():
+    """
+    A chain of empty elements deeper than the recursion limit is removed.
+    """
+    
+    depth = sys.getrecursionlimit() + 100
+    root = etree.fromstring("<r><keep>x</keep></r>")
+    node = root
+    for _ in range(depth):
+        node = etree.SubElement(node, "e")
+        
+    remove_empty_elements(root)
+    
+    assert etree.tostring(root) == b"<r><keep>x</keep></r>"
+
+
+def test_normalize_namespaces():
+    """
+    Records with their own prefix and repeated declarations come out with
+    a single wd: declaration.
+    """
+    
+    doc = etree.fromstring(
+        f'<ns0:Data xmlns:ns0="{WD_NS}" xmlns:x="urn:unused">'
+        f'<ns0:Rec><ns0:A xmlns:ns0="{WD_NS}" ns0:type="t">1</ns0:A></ns0:Rec>'
+        "</ns0:Data>"
+    )
+    
+    record = normalize_namespaces(doc[0])
+    
+    assert etree.tostring(record) == (
+        f'<wd:Rec xmlns:wd="{WD_NS}"><wd:A wd:type="t">1</wd:A></wd:Rec>'.encode()
+    )
+
+
+def test_split_cleans_records(settings, tmp_path):
+    """
+    namespace_mode "strip" and remove_empty_elements apply to every chunk.
+    """
+    
+    data = make_records(4).replace(
+        b"</wd:Institution>", b"</wd:Institution><wd:Empty><wd:Inner/></wd:Empty>"
+    )
+    input_path = tmp_path / "input" / "extract.xml"
+    input_path.write_bytes(data)
+    
+    settings.update(remove_empty_elements=True, namespace_mode="strip")
+    chunk_files = XMLSplitter(settings).split(str(input_path))
+    
+    chunk = etree.parse(chunk_files[0]).getroot()
+    
+    assert chunk.tag == "Response_Data"
+    assert [rec.tag for rec in chunk] == ["Historical_Academic_Record"] * 4
+    assert [child.tag for child in chunk[0]] == ["Student_ID", "Institution"]
+    assert b"xmlns" not in open(chunk_files[0], "rb").read()
@@ -0,0 +1,158 @@
+"""
+*******************************************************************************
+ File: tests/test_transform/test_xslt_transformer.py
+ Purpose: Contain test functions for xslt_transformer.py
+ Source: tests/conftest.py provides the sample records and stylesheet
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_profile_per_transformer: the cached stylesheet
+                    keeps counting across transformers. ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+*******************************************************************************
+ test_record_mode_matches_document_mode(): The streaming per-record mode
+ gives the same records as transforming the whole chunk.
+ test_transform_many_quarantines(): A malformed chunk is quarantined and
+ the other chunks are transformed in order.
+ test_in_memory_handoff(): Converting in memory gives the same workbook as
+ going through a _transformed.xml file, without writing the file.
+ test_profile_report(): Template profiles are combined across chunks and
+ worker processes.
+ test_profile_per_transformer(): Transformers built one after another in a
+ process, as batch workers do, each report only their own calls.
+*******************************************************************************
+"""
+
+import os
+import pandas as pd
+from lxml import etree
+from tests.conftest import make_records
+from transform.xslt_transformer import XSLTTransformer
+from excel.xml_to_excel import XMLToExcel
+from transform.xslt_profile import PROFILE_FILE
+
+
+def _records(path):
+    # Document mode pretty prints, record mode does not
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.parse(path, parser).getroot()
+    return root.tag, [etree.tostring(rec) for rec in root]
+
+
+def test_record_mode_matches_document_mode(settings, tmp_path):
+    """
+    Both xslt_mode values produce the same envelope and records.
+    """
+    
+    results = {}
+    
+    for mode in ("document", "record"):
+        chunk = tmp_path / f"{mode}.xml"
+        chunk.write_bytes(make_records(20))
+        
+        out_path = XSLTTransformer({**settings, "xslt_mode": mode}).apply_xslt(str(chunk))
+        results[mode] = _records(out_path)
+        
+    tag, records = results["record"]
+    
+    assert tag == "Records"
+    assert len(records) == 20
+    assert results["record"] == results["document"]
+
+
+def test_transform_many_quarantines(settings, tmp_path):
+    """
+    transform_many keeps input order and quarantines the bad chunk.
+    """
+    
+    paths = []
+    for idx in range(4):
+        chunk = tmp_path / f"chunk_{idx}.xml"
+        chunk.write_bytes(make_records(idx + 1))
+        paths.append(str(chunk))
+        
+    # Truncated chunk
+    (tmp_path / "chunk_1.xml").write_bytes(make_records(2)[:-40])
+    
+    transformer = XSLTTransformer({**settings, "transform_workers": 2})
+    transformed = transformer.transform_many(paths)
+    
+    assert transformed == [
+        transformer.output_path(paths[idx]) for idx in (0, 2, 3)
+    ]
+    assert [len(_records(path)[1]) for path in transformed] == [1, 3, 4]
+    assert set(transformer.timings) == set(paths)
+    
+    copy_path = transformer.quarantined[paths[1]]
+    assert copy_path == os.path.join(settings["output_dir"], "quarantine", "chunk_1.xml")
+    
+    with open(copy_path + ".error.log", encoding="utf-8") as f:
+        assert f.readline().startswith("XMLSyntaxError")
+        
+    assert not os.path.exists(transformer.output_path(paths[1]))
+
+
+def test_in_memory_handoff(settings, tmp_path):
+    """
+    transform_many(convert=True) only keeps the intermediate file when
+    keep_intermediate is set.
+    """
+    
+    chunk = tmp_path / "chunk_0.xml"
+    chunk.write_bytes(make_records(6))
+    transformer = XSLTTransformer({**settings, "transform_workers": 1})
+    
+    expected = pd.read_excel(XMLToExcel(settings=settings).convert(transformer.apply_xslt(str(chunk))))
+    os.remove(transformer.output_path(str(chunk)))
+    
+    for keep in (False, True):
+        transformer.settings["keep_intermediate"] = keep
+        excel_files = transformer.transform_many([str(chunk)], convert=True)
+        
+        assert excel_files == [str(tmp_path / "chunk_0_transformed.xlsx")]
+        assert os.path.exists(transformer.output_path(str(chunk))) == keep
+        pd.testing.assert_frame_equal(expected, pd.read_excel(excel_files[0]))
+
+
+def test_profile_report(settings, tmp_path):
+    """
+    Three chunks on two workers give one "/" template entry with 3 calls.
+    """
+    
+    paths = []
+    for idx in range(3):
+        chunk = tmp_path / f"chunk_{idx}.xml"
+        chunk.write_bytes(make_records(5))
+        paths.append(str(chunk))
+        
+    transformer = XSLTTransformer({**settings, "xslt_profile": True, "transform_workers": 2})
+    transformer.transform_many(paths)
+    
+    assert transformer.profile.runs == 3
+    assert [row[:4] for row in transformer.profile.rows()] == [("/", "", "", 3)]
+    
+    with open(os.path.join(settings["output_dir"], PROFILE_FILE), encoding="utf-8") as f:
+        report = f.read()
+        
+    assert report.startswith("XSLT profile: 3 transforms, 1 templates")
+    assert 'match="/"' in report
+
+
+def test_profile_per_transformer(settings, tmp_path):
+    """
+    Three transformers share the cached stylesheet; each profiles one call.
+    """
+    
+    for idx in range(3):
+        chunk = tmp_path / f"chunk_{idx}.xml"
+        chunk.write_bytes(make_records(2))
+        
+        transformer = XSLTTransformer({**settings, "xslt_profile": True, "transform_workers": 1})
+        transformer.transform_many([str(chunk)])
+        
+        assert [row[3] for row in transformer.profile.rows()] == [1]
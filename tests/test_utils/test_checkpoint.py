@@ -0,0 +1,132 @@
+"""
+*******************************************************************************
+ File: tests/test_utils/test_checkpoint.py
+ Purpose: Contain test functions for checkpoint.py
+ Source: tests/conftest.py provides the sample input and settings
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+    10/18/2026      Added test_identity_covers_output_settings.
+                    ECC - fendingers
+    10/18/2026      Pass the settings fixture instead of reading
+                    config/settings.yaml. ECC - fendingers
+    10/18/2026      test_identity_covers_output_settings covers the column
+                    schema, engine, audit and prefix settings.
+                    ECC - fendingers
+*******************************************************************************
+ test_journal_detects_changes(): Changed outputs and sources, a torn last
+ line, and a different run all mean the work is redone.
+ test_resume_skips_finished_work(): Runs the stages, loses some output, and
+ checks that a resumed run redoes only that.
+ test_identity_covers_output_settings(): Changing any setting that changes
+ the output gives another run identity.
+*******************************************************************************
+"""
+
+import os
+from utils.checkpoint import CheckpointJournal, chunk_id, run_identity
+from splitting.splitter import XMLSplitter
+from transform.xslt_transformer import XSLTTransformer
+from excel.xml_to_excel import XMLToExcel
+
+
+def test_journal_detects_changes(tmp_path):
+    """
+    completed() only trusts entries whose files still match.
+    """
+    
+    source = tmp_path / "chunk_1.xml"
+    output = tmp_path / "chunk_1_transformed.xml"
+    source.write_text("<a/>")
+    output.write_text("<b/>")
+    
+    journal = CheckpointJournal.for_output(str(tmp_path))
+    journal.start({"input": "x"})
+    journal.record("transform", "chunk_1", str(output), str(source))
+    
+    # A crash mid-write leaves a torn last line
+    with open(journal.path, "a") as f:
+        f.write('{"stage": "excel", "id"')
+        
+    resumed = CheckpointJournal.for_output(str(tmp_path), resume=True)
+    
+    assert resumed.start({"input": "x"})
+    assert resumed.completed("transform", "chunk_1", str(source))
+    
+    source.write_text("<changed/>")
+    
+    assert resumed.completed("transform", "chunk_1", str(source)) is None
+    
+    other_run = CheckpointJournal.for_output(str(tmp_path), resume=True)
+    
+    assert not other_run.start({"input": "y"})
+    assert other_run.completed("transform", "chunk_1") is None
+    assert chunk_id("out/chunk_12_transformed.xml.gz") == "chunk_12"
+
+
+def _run(settings, resume):
+    journal = CheckpointJournal.for_output(settings["output_dir"], resume)
+    chunk_files = XMLSplitter(settings, journal).split()
+    transformer = XSLTTransformer(settings, journal)
+    converter = XMLToExcel(journal, settings=settings)
+    
+    return [converter.convert(transformer.apply_xslt(f)) for f in chunk_files]
+
+
+def test_resume_skips_finished_work(settings):
+    """
+    Lost chunks and workbooks are rebuilt; everything else is left alone.
+    A re-split chunk with the same content does not redo its later stages.
+    """
+    
+    settings["max_file_size_mb"] = 0.0003
+    excel_files = _run(settings, resume=False)
+    
+    assert len(excel_files) == 5
+    
+    mtimes = [os.stat(f).st_mtime_ns for f in excel_files]
+    os.remove(excel_files[1])
+    os.remove(os.path.join(settings["output_dir"], "chunk_4.xml"))
+    
+    resumed = _run(settings, resume=True)
+    
+    assert resumed == excel_files
+    assert all(os.path.exists(f) for f in resumed)
+    assert os.stat(resumed[0]).st_mtime_ns == mtimes[0]
+    assert os.stat(resumed[2]).st_mtime_ns == mtimes[2]
+    assert os.stat(resumed[3]).st_mtime_ns == mtimes[3]
+    assert os.path.exists(os.path.join(settings["output_dir"], "chunk_4.xml"))
+
+
+def test_identity_covers_output_settings(settings, tmp_path):
+    """
+    A resume after any of these changes must not reuse the old outputs.
+    """
+    
+    input_path = os.path.join(settings["input_dir"], "extract.xml")
+    xsd_path = tmp_path / "records.xsd"
+    xsd_path.write_text("<xs:schema xmlns:xs='http://www.w3.org/2001/XMLSchema'/>")
+    identity = run_identity(settings, input_path)
+    
+    for name, value in (
+        ("xslt_mode", "record"),
+        ("xsd_path", str(xsd_path)),
+        ("partition_key", "wd:Institution"),
+        ("delta_key", "wd:Student_ID"),
+        ("list_mode", "child"),
+        ("list_elements", ["Degree"]),
+        ("excel_output", "audit"),
+        ("column_store", True),
+        ("column_schema", "scan"),
+        ("column_schema_sample", 10),
+        ("column_schema_element", "Historical_Academic_Record"),
+        ("excel_engine", "xlsxwriter"),
+        ("audit_group_by", ["Student_ID"]),
+        ("audit_exact_distinct", 10),
+        ("namespace_prefixes", {"w": "urn:example"}),
+    ):
+        assert run_identity({**settings, name: value}, input_path) != identity, name
@@ -0,0 +1,65 @@
+"""
+*******************************************************************************
+ File: tests/test_utils/test_file_utils.py
+ Purpose: Contain test functions for file_utils.py
+ Source: N/A - Values are coded in this file.
+ Author: fendingers (ITS) | Contact: fendingers@ecc.edu | 716-851-1828
+ Version: 1.0 | Date: 2026-10-18
+*******************************************************************************
+    Date           Change Description
+    MM-DD-YYYY     Provide a meaningful description of what you changed and why
+*******************************************************************************
+    10/18/2026      Initial Version. ECC - fendingers
+*******************************************************************************
+ test_gzip_round_trip(): Writes and reads back a .gz file.
+ test_zip_input(): Reads the XML member of a .zip archive.
+ test_suffix_helpers(): Checks compression_of() and friends.
+*******************************************************************************
+"""
+
+import zipfile
+import utils.file_utils as file_mod
+
+
+def test_gzip_round_trip(tmp_path):
+    """
+    open_output() compresses by suffix and open_input() reads it back.
+    """
+    
+    path = str(tmp_path / "chunk_1.xml.gz")
+    
+    with file_mod.open_output(path) as f:
+        f.write(b"<root/>")
+        
+    with open(path, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+        
+    with file_mod.open_input(path) as f:
+        assert f.read() == b"<root/>"
+
+
+def test_zip_input(tmp_path):
+    """
+    A .zip is read from its .xml member, whatever else it contains.
+    """
+    
+    path = str(tmp_path / "extract.zip")
+    
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("readme.txt", "not this one")
+        archive.writestr("extract.xml", "<root/>")
+        
+    with file_mod.open_input(path) as f:
+        assert f.read() == b"<root/>"
+
+
+def test_suffix_helpers():
+    """
+    Suffix helpers agree on which files are compressed.
+    """
+    
+    assert file_mod.compression_of("a.xml.gz") == "gz"
+    assert file_mod.compression_of("a.xml") is None
+    assert file_mod.strip_compression_suffix("a.xml.zst") == "a.xml"
+    assert file_mod.with_compression("a.xml", "gz") == "a.xml.gz"
+    assert file_mod.with_compression("a.xml", "none") == "a.xml"